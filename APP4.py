@@ -1,11 +1,28 @@
 import datetime
+import functools
 import urllib.parse
 import os
+import uuid
+from contextlib import nullcontext
 from typing import List, Dict
+import numpy as np
 import pandas as pd
 import streamlit as st
-from fpdf import FPDF
-import altair as alt
+
+from neozinc.almacen import almacen
+from neozinc.busqueda import indice_busqueda
+from neozinc.canasta import Canasta
+from neozinc.catalogo import ConflictoEdicion, editable, store_recursos, store_roles
+from neozinc.deshacer import Historia
+from neozinc.historial import DIMENSIONES, fila_cotizacion, historial
+from neozinc.importacion import aplicar_diferencias, calcular_diferencias, leer_bloques
+from neozinc.indice import etiqueta_recurso, indice_catalogo, posiciones_catalogo
+from neozinc.perfil import Perfil, perfil_activo
+from neozinc.precios import TIPOS, formatear_moneda, sensibilidad
+from neozinc.reprecio import indice_reprecio
+# altair (neozinc.graficos) y fpdf (neozinc.pdf, neozinc.lote) se importan recién
+# cuando se abre su pestaña: son ~0.4 s del arranque en frío y la mayoría de las
+# sesiones solo cotiza
 
 # ------------------------------------------------------
 # 1. CONFIGURACIÓN VISUAL (DISEÑO PREMIUM)
@@ -17,8 +34,35 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# --- PERFIL POR RERUN (NEOZINC_PERFIL=1 o ?perfil=1, ver neozinc/perfil.py) ---
+def tamanos_perfil():
+    canasta, cat = st.session_state.get("canasta"), st.session_state.get("cat_recursos")
+    return (len(canasta.lineas) if canasta is not None else 0, len(cat.df) if cat is not None else 0)
+
+if perfil_activo(st.query_params.get("perfil")):
+    if "perfil" not in st.session_state:
+        st.session_state.perfil = Perfil(uuid.uuid4().hex[:12], tamanos_perfil)
+    st.session_state.perfil.nuevo_rerun()
+else:
+    st.session_state.pop("perfil", None)
+
+def medir(seccion):
+    perfil = st.session_state.get("perfil")
+    return perfil.medir(seccion) if perfil is not None else nullcontext()
+
+def medido(seccion):
+    # Para fragmentos: se miden también cuando se re-ejecutan solos
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            with medir(seccion):
+                return funcion(*args, **kwargs)
+        return envuelta
+    return decorador
+
 # --- CSS AVANZADO PARA EFECTO CRISTAL Y FONDO PROFESIONAL ---
-st.markdown("""
+with medir("css"):
+    st.markdown("""
     <style>
     /* 1. FONDO DEGRADADO TECH */
     .stApp {
@@ -88,288 +132,478 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # ------------------------------------------------------
-# 2. CLASE PDF (REPORTE COMPLETO)
+# 2. DATOS Y LÓGICA
 # ------------------------------------------------------
-class PDF(FPDF):
-    def header(self):
-        if os.path.exists("logo.png"):
-            self.image('logo.png', 10, 8, 25)
-            self.set_font('Arial', 'B', 15)
-            self.cell(35) 
-            self.cell(0, 8, 'NEOZINC SYSTEMS', 0, 1, 'L')
-            self.set_font('Arial', 'I', 9)
-            self.cell(35)
-            self.cell(0, 5, 'Ingeniería - Detección y Extinción de Incendios', 0, 1, 'L')
-            self.set_font('Arial', 'B', 9)
-            self.cell(35)
-            self.cell(0, 5, 'Contacto: 925 940 657', 0, 1, 'L') 
-        else:
-            self.set_font('Arial', 'B', 16)
-            self.cell(0, 10, 'NEOZINC SYSTEMS', 0, 1, 'C')
-        
-        self.ln(8)
-        self.set_draw_color(0, 229, 255) # Cyan Neón
-        self.line(10, 35, 200, 35)
-        self.set_draw_color(0, 0, 0)
-        self.ln(5)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()} - Generado por Neozinc Systems', 0, 0, 'C')
-
-def generar_pdf_bytes(cliente, fecha, area, servicio, materiales, mano_obra, gg, margen, total):
-    pdf = PDF()
-    pdf.add_page()
-    
-    pdf.set_font("Arial", size=11)
-    pdf.cell(0, 6, f"Cliente: {cliente}", ln=True)
-    pdf.cell(0, 6, f"Fecha: {fecha}", ln=True)
-    pdf.cell(0, 6, f"Referencia: {servicio} - {area}", ln=True)
-    pdf.ln(5)
-    
-    # Filtros
-    lista_equipos = [m for m in materiales if m['Tipo'] == 'Equipo']
-    lista_materiales = [m for m in materiales if m['Tipo'] == 'Material']
-    lista_herramientas = [m for m in materiales if m['Tipo'] == 'Herramienta']
-
-    # Helper tabla
-    def dibujar_tabla(titulo, lista, color_rgb):
-        if lista:
-            pdf.set_fill_color(*color_rgb) 
-            pdf.set_font("Arial", 'B', 10)
-            pdf.cell(0, 10, titulo, ln=True)
-            pdf.cell(100, 8, "Descripción", 1, 0, 'C', fill=True)
-            pdf.cell(30, 8, "Cant.", 1, 0, 'C', fill=True)
-            pdf.cell(30, 8, "P.Unit", 1, 0, 'C', fill=True)
-            pdf.cell(30, 8, "Total", 1, 1, 'C', fill=True)
-            pdf.set_font("Arial", size=9)
-            for m in lista:
-                pdf.cell(100, 8, f"{m['Nombre'][:60]}", 1) 
-                pdf.cell(30, 8, f"{m['Cantidad']} {m['Unidad']}", 1, 0, 'C')
-                pdf.cell(30, 8, f"{m['Precio Unit.']:.2f}", 1, 0, 'R')
-                pdf.cell(30, 8, f"{m['Subtotal']:.2f}", 1, 1, 'R')
-            pdf.ln(5)
-
-    dibujar_tabla("1. SUMINISTRO DE EQUIPOS (ACTIVOS)", lista_equipos, (220, 240, 255))
-    dibujar_tabla("2. SUMINISTRO DE MATERIALES", lista_materiales, (235, 255, 235))
-    dibujar_tabla("3. HERRAMIENTAS Y EQUIPOS MENORES", lista_herramientas, (255, 250, 230))
-
-    if mano_obra:
-        pdf.set_fill_color(255, 240, 240)
-        pdf.set_font("Arial", 'B', 10)
-        pdf.cell(0, 10, "4. MANO DE OBRA ESPECIALIZADA", ln=True)
-        pdf.cell(100, 8, "Rol / Cargo", 1, 0, 'C', fill=True)
-        pdf.cell(30, 8, "Pers.", 1, 0, 'C', fill=True)
-        pdf.cell(30, 8, "Hrs.", 1, 0, 'C', fill=True)
-        pdf.cell(30, 8, "Total", 1, 1, 'C', fill=True)
-        pdf.set_font("Arial", size=9)
-        for mo in mano_obra:
-            pdf.cell(100, 8, f"{mo['Cargo']}", 1)
-            pdf.cell(30, 8, str(mo['Personas']), 1, 0, 'C')
-            pdf.cell(30, 8, str(mo['Horas']), 1, 0, 'C')
-            pdf.cell(30, 8, f"{mo['Subtotal']:.2f}", 1, 1, 'R')
-    
-    pdf.ln(5)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(130)
-    pdf.cell(30, 12, "TOTAL VENTA:", 0, 0, 'R')
-    pdf.cell(30, 12, f"S/. {total:,.2f}", 0, 1, 'R')
-    return pdf.output(dest='S').encode('latin-1')
+# Valores iniciales de "Información del Proyecto" (claves de sus widgets)
+PROYECTO_INICIAL = {"cliente": "Cliente Nuevo", "contacto": "51", "area": "Integral", "servicio": "Correctivo"}
 
-# ------------------------------------------------------
-# 3. DATOS Y LÓGICA
-# ------------------------------------------------------
 def init_session():
-    if "recursos" not in st.session_state:
-        datos_iniciales = [
-            # DACI
-            {"Nombre": 'Panel de Alarma 4Z', "Tipo": "Equipo", "Categoría": "DACI", "Unidad": "und", "Costo Unitario": 1200.0},
-            {"Nombre": 'Detector de Humo', "Tipo": "Equipo", "Categoría": "DACI", "Unidad": "und", "Costo Unitario": 45.0},
-            {"Nombre": 'Estación Manual', "Tipo": "Equipo", "Categoría": "DACI", "Unidad": "und", "Costo Unitario": 65.0},
-            {"Nombre": 'TUBERIA EMT 3/4"', "Tipo": "Material", "Categoría": "DACI", "Unidad": "und", "Costo Unitario": 6.20},
-            {"Nombre": 'Cable FPL 2x18AWG', "Tipo": "Material", "Categoría": "DACI", "Unidad": "rollo", "Costo Unitario": 280.0},
-            # HERRAMIENTAS DACI
-            {"Nombre": 'Multímetro Fluke (Alquiler)', "Tipo": "Herramienta", "Categoría": "DACI", "Unidad": "día", "Costo Unitario": 35.0},
-            {"Nombre": 'Escalera de Tijera 8 pasos', "Tipo": "Herramienta", "Categoría": "DACI", "Unidad": "día", "Costo Unitario": 15.0},
-            {"Nombre": 'Andamio Normado (1 Cuerpo)', "Tipo": "Herramienta", "Categoría": "DACI", "Unidad": "día", "Costo Unitario": 25.0},
-            
-            # ACI
-            {"Nombre": 'Gabinete CI c/manguera', "Tipo": "Equipo", "Categoría": "ACI", "Unidad": "und", "Costo Unitario": 850.0},
-            {"Nombre": 'Rociador K5.6', "Tipo": "Material", "Categoría": "ACI", "Unidad": "und", "Costo Unitario": 18.0},
-            {"Nombre": 'Manómetro 300PSI', "Tipo": "Material", "Categoría": "ACI", "Unidad": "und", "Costo Unitario": 45.0},
-            # HERRAMIENTAS ACI
-            {"Nombre": 'Roscadora de Tubos 1/2-2" (Alquiler)', "Tipo": "Herramienta", "Categoría": "ACI", "Unidad": "día", "Costo Unitario": 65.0},
-            {"Nombre": 'Ranuradora (Roll Groover)', "Tipo": "Herramienta", "Categoría": "ACI", "Unidad": "día", "Costo Unitario": 80.0},
-            {"Nombre": 'Llave Stilson 24"', "Tipo": "Herramienta", "Categoría": "ACI", "Unidad": "día", "Costo Unitario": 10.0},
-
-            # BCI
-            {"Nombre": 'Bomba Jockey 5HP', "Tipo": "Equipo", "Categoría": "BCI", "Unidad": "und", "Costo Unitario": 950.0},
-            {"Nombre": 'Empaquetadura', "Tipo": "Material", "Categoría": "BCI", "Unidad": "mt", "Costo Unitario": 45.0},
-            # HERRAMIENTAS BCI
-            {"Nombre": 'Alineador Laser de Ejes', "Tipo": "Herramienta", "Categoría": "BCI", "Unidad": "día", "Costo Unitario": 150.0},
-            {"Nombre": 'Torquímetro', "Tipo": "Herramienta", "Categoría": "BCI", "Unidad": "día", "Costo Unitario": 40.0},
-            {"Nombre": 'Tecle de Cadena 1Ton', "Tipo": "Herramienta", "Categoría": "BCI", "Unidad": "día", "Costo Unitario": 35.0},
-        ]
-        st.session_state.recursos = pd.DataFrame(datos_iniciales)
-    
-    if "roles" not in st.session_state:
-        st.session_state.roles = pd.DataFrame([
-            {"Cargo": "Técnico Líder", "Costo Hora": 35.0},
-            {"Cargo": "Ayudante", "Costo Hora": 15.0},
-            {"Cargo": "Soldador", "Costo Hora": 45.0},
-        ])
-    if "items_mat" not in st.session_state: st.session_state.items_mat = []
-    if "items_mo" not in st.session_state: st.session_state.items_mo = []
+    # Catálogo compartido por todo el proceso: la sesión solo guarda la referencia
+    # a la instantánea vigente (sin copias), ver neozinc/catalogo.py
+    st.session_state.cat_recursos = store_recursos().actual
+    st.session_state.cat_roles = store_roles().actual
+    st.session_state.recursos = st.session_state.cat_recursos.df
+    st.session_state.roles = st.session_state.cat_roles.df
+
+    if "canasta" not in st.session_state: st.session_state.canasta = Canasta()
+    # Precios del catálogo cambiados desde el último rerun (ver neozinc/reprecio.py)
+    indice_reprecio().registrar(st.session_state.canasta)
+    n = indice_reprecio().aplicar(st.session_state.canasta)
+    if n:
+        st.session_state.aviso = f"🔄 {n} línea(s) de la canasta con precio actualizado"
+    for campo, valor in PROYECTO_INICIAL.items():
+        if campo not in st.session_state: st.session_state[campo] = valor
     if "gg" not in st.session_state: st.session_state.gg = 50.0
     if "margen" not in st.session_state: st.session_state.margen = 30
+    if "historia" not in st.session_state:
+        st.session_state.historia = Historia()
+        registrar_paso()
+
+def registrar_paso():
+    # Deshacer/rehacer: un paso por cambio, compartiendo las líneas sin cambios (ver neozinc/deshacer.py)
+    ss = st.session_state
+    ss.historia.registrar(ss.canasta, ss.gg, ss.margen, {campo: ss[campo] for campo in PROYECTO_INICIAL})
 
-init_session()
+with medir("sesion"):
+    init_session()
 
 def agregar_item(item_dict, cantidad):
-    st.session_state.items_mat.append({
-        "Nombre": item_dict['Nombre'], 
-        "Tipo": item_dict['Tipo'], 
-        "Unidad": item_dict['Unidad'], 
-        "Precio Unit.": item_dict['Costo Unitario'], 
-        "Cantidad": cantidad, 
-        "Subtotal": item_dict['Costo Unitario'] * cantidad
+    # La línea guarda una referencia al registro del catálogo (ver neozinc/canasta.py)
+    st.session_state.canasta.agregar_recurso(item_dict, cantidad)
+    # El aviso se muestra al redibujar la canasta (un callback no debe dibujar elementos)
+    st.session_state.aviso = "✅ Agregado correctamente"
+
+def editar_canasta(key):
+    # Aplica en lote lo marcado en la tabla de la canasta: cantidades nuevas y filas a quitar
+    # (cantidad 0 también quita la fila; una celda vaciada no cambia nada)
+    canasta = st.session_state.canasta
+    cambios = st.session_state[key]["edited_rows"]
+    quitar = {int(i) for i, c in cambios.items() if c.get("Quitar") or c.get("Cantidad", 1) == 0}
+    for i, c in cambios.items():
+        if int(i) not in quitar and c.get("Cantidad") is not None:
+            canasta.actualizar_cantidad(int(i), c["Cantidad"])
+    canasta.eliminar_varios(quitar, 'mat')
+    refrescar('canasta')
+
+# Fragmentos de la UI que dependen de cada dato: cuando el dato cambia desde un
+# callback solo se vuelven a ejecutar esos fragmentos (ver @st.fragment en la sección 3).
+# Todo cambio registra un paso, así que "historia" (deshacer/rehacer) va en todas.
+DEPENDENCIAS = {
+    "canasta": ["canasta", "dashboard", "escenarios", "exportar", "historia"],
+    "mano_obra": ["mano_obra", "dashboard", "escenarios", "exportar", "historia"],
+    "finanzas": ["dashboard", "exportar", "historia"],
+    "proyecto": ["exportar", "historia"],
+    # Guardar no cambia la cotización (no es un paso), pero sí la lista de guardadas
+    "guardadas": ["exportar", "guardadas"],
+}
+
+def refrescar(dato):
+    # Todo callback que cambia un dato pasa por aquí: es también el punto de registro del paso
+    registrar_paso()
+    st.rerun(DEPENDENCIAS[dato])
+
+def mostrar_aviso():
+    # Los callbacks dejan el aviso en la sesión (no deben dibujar elementos); lo
+    # muestra el primer fragmento que se redibuja
+    if "aviso" in st.session_state:
+        st.toast(st.session_state.pop("aviso"))
+
+def agregar_desde_selector(map_items, key_sel, key_cant):
+    sel = st.session_state.get(key_sel)
+    if sel in map_items:
+        agregar_item(map_items[sel], st.session_state[key_cant])
+        refrescar('canasta')
+
+def actualizar_finanzas():
+    st.session_state.gg = st.session_state.w_gg
+    st.session_state.margen = st.session_state.w_margen
+    refrescar('finanzas')
+
+def agregar_mano_obra(map_rol):
+    r = map_rol.get(st.session_state.get("rol"))
+    if r is None:
+        return
+    n_per, n_hrs = st.session_state.np, st.session_state.nh
+    st.session_state.canasta.agregar_mano_obra({
+        "Cargo": r['Cargo'], "Personas": n_per, "Horas": n_hrs,
+        "Subtotal": r['Costo Hora']*n_per*n_hrs
     })
-    st.toast("✅ Agregado correctamente")
+    refrescar('mano_obra')
+
+def guardar_edicion(store, key, base, posiciones=None):
+    # base: la instantánea que mostraba el editor; posiciones: sus filas visibles
+    # (página/filtro). Si otra sesión cambió las mismas filas desde entonces, el
+    # store rechaza la edición completa (ver neozinc/catalogo.py)
+    cambios = st.session_state[key]
+    editados, eliminados = cambios["edited_rows"], cambios["deleted_rows"]
+    if posiciones is not None:
+        editados = {posiciones[int(p)]: c for p, c in editados.items()}
+        eliminados = [posiciones[int(p)] for p in eliminados]
+    try:
+        store.aplicar_edicion(editados, cambios["added_rows"], eliminados, base=base)
+    except ConflictoEdicion as e:
+        st.session_state.edicion_error = str(e)
+
+def analizar_importacion():
+    archivo = st.session_state.get("lista_precios")
+    st.session_state.pop("importacion", None)
+    if archivo is None:
+        return
+    try:
+        st.session_state.importacion = calcular_diferencias(
+            store_recursos().actual, leer_bloques(archivo, archivo.name),
+            eliminar_ausentes=st.session_state.imp_eliminar)
+    except ValueError as e:
+        st.session_state.importacion_error = str(e)
+
+def aplicar_importacion():
+    try:
+        aplicar_diferencias(store_recursos(), st.session_state.pop("importacion"))
+    except ValueError as e:
+        st.session_state.importacion_error = str(e)
+    else:
+        st.session_state.aviso = "✅ Lista de precios importada"
+
+def cargar_cotizacion(cid):
+    cot = almacen().cargar_cotizacion(cid)
+    if cot is None:
+        return
+    canasta = Canasta()
+    for m in cot["materiales"]: canasta.agregar_material(m)
+    for mo in cot["mano_obra"]: canasta.agregar_mano_obra(mo)
+    indice_reprecio().registrar(canasta)
+    st.session_state.canasta = canasta
+    st.session_state.gg = cot["gg"]
+    st.session_state.margen = int(cot["margen"])
+    # Los widgets de finanzas se recrean con los valores cargados
+    st.session_state.pop("w_gg", None)
+    st.session_state.pop("w_margen", None)
+    for campo in ("cliente", "contacto", "area", "servicio"):
+        st.session_state[campo] = cot[campo]
+    registrar_paso()
+    st.rerun()  # el botón vive en un fragmento, pero cambia toda la cotización
+
+def guardar_cotizacion_actual(datos_pdf, totales):
+    cliente = datos_pdf[0]
+    cid = almacen().guardar_cotizacion(cliente, st.session_state.contacto, *datos_pdf[1:])
+    historial().agregar([fila_cotizacion(cid, cliente, datos_pdf[1], st.session_state.area,
+                                         st.session_state.servicio, totales, st.session_state.margen,
+                                         len(st.session_state.canasta.lineas))])
+    st.session_state.cotizacion_guardada = cid
+    st.rerun(DEPENDENCIAS["guardadas"])
+
+def volver_a(estado):
+    if estado is None:
+        return
+    st.session_state.canasta.restaurar(estado.todas("lineas"), estado.todas("lineas_mo"))
+    st.session_state.gg, st.session_state.margen = estado.gg, estado.margen
+    st.session_state.pop("w_gg", None)
+    st.session_state.pop("w_margen", None)
+    for campo, valor in estado.proyecto:
+        st.session_state[campo] = valor
+
+# Deshacer, rehacer y restaurar cambian canasta, finanzas y proyecto a la vez, y sus
+# botones viven en un fragmento: se pide un rerun completo para redibujar toda la app
+def deshacer():
+    volver_a(st.session_state.historia.deshacer())
+    st.rerun()
+
+def rehacer():
+    volver_a(st.session_state.historia.rehacer())
+    st.rerun()
+
+def guardar_instantanea():
+    nombre = st.session_state.inst_nombre.strip()
+    if nombre:
+        st.session_state.historia.guardar(nombre)
+        st.session_state.aviso = f"📸 Instantánea «{nombre}» guardada"
 
-def eliminar_item(idx, tipo):
-    if tipo == 'mat': st.session_state.items_mat.pop(idx)
-    elif tipo == 'mo': st.session_state.items_mo.pop(idx)
+def restaurar_instantanea():
+    # Restaurar es un paso más: se puede deshacer
+    volver_a(st.session_state.historia.instantaneas.get(st.session_state.inst_sel))
+    registrar_paso()
     st.rerun()
 
-def formatear_moneda(val): return f"S/. {val:,.2f}"
+# Grupos (Categoría, Tipo) más grandes que esto usan búsqueda en vez de lista completa
+UMBRAL_BUSQUEDA = 200
+MAX_RESULTADOS = 20
+
+COLUMNAS_CANASTA = ["Tipo", "Nombre", "Cantidad", "Unidad", "Precio Unit.", "Subtotal"]
+ALTO_MAX_CANASTA = 420  # px; filas extra se desplazan dentro de la tabla
+FILAS_POR_PAGINA = 100  # filas del catálogo por página en el editor lateral
+TOP_HISTORIAL = 20  # grupos (clientes, sistemas...) en el gráfico del histórico
 
 # ------------------------------------------------------
-# 4. INTERFAZ GRÁFICA (UI)
+# 3. INTERFAZ GRÁFICA (UI)
 # ------------------------------------------------------
+# Recursos estáticos: se leen una vez por proceso, no en cada rerun
+@st.cache_resource
+def logo_bytes():
+    if not os.path.exists("logo.png"):
+        return None
+    with open("logo.png", "rb") as f:
+        return f.read()
+
 # Sidebar
-if os.path.exists("logo.png"):
-    st.sidebar.image("logo.png", use_container_width=True)
+if logo_bytes() is not None:
+    st.sidebar.image(logo_bytes(), use_container_width=True)
 else:
     st.sidebar.title("NEOZINC")
 
 st.sidebar.markdown("### ⚙️ Panel de Control")
-with st.sidebar.expander("📦 Base de Datos", expanded=False):
-    edited_df = st.data_editor(st.session_state.recursos, num_rows="dynamic", key="data_recursos") 
-    st.session_state.recursos = edited_df
-
-with st.sidebar.expander("👷 Tarifas Personal", expanded=False):
-    edited_roles = st.data_editor(st.session_state.roles, num_rows="dynamic", key="data_roles")
-    st.session_state.roles = edited_roles
+if "edicion_error" in st.session_state:
+    st.sidebar.error(st.session_state.pop("edicion_error"))
+with medir("sidebar/base_datos"), st.sidebar.expander("📦 Base de Datos", expanded=False):
+    # Cada edición publica una versión nueva del catálogo (copy-on-write); la clave
+    # del editor cambia con la versión para arrancar limpio sobre la nueva instantánea.
+    # Solo se envía al navegador una página del catálogo filtrada por Categoría/Tipo.
+    cat = st.session_state.cat_recursos
+    categorias = cat.derivar("categorias", lambda df: sorted(df["Categoría"].dropna().unique().tolist()), columnas=("Categoría",))
+    f1, f2 = st.columns(2)
+    f_cat = f1.selectbox("Categoría", ["Todas", *categorias], key="f_cat")
+    f_tipo = f2.selectbox("Tipo", ["Todos", *TIPOS], key="f_tipo")
+    posiciones = posiciones_catalogo(cat, None if f_cat == "Todas" else f_cat, None if f_tipo == "Todos" else f_tipo)
+    n_paginas = max(1, -(-len(posiciones) // FILAS_POR_PAGINA))
+    pagina = st.number_input(f"Página (de {n_paginas})", 1, n_paginas, key=f"f_pag_{f_cat}_{f_tipo}") if n_paginas > 1 else 1
+    en_pagina = posiciones[(pagina - 1) * FILAS_POR_PAGINA:pagina * FILAS_POR_PAGINA]
+    key_rec = f"data_recursos_{cat.version}_{f_cat}_{f_tipo}_{pagina}"
+    st.data_editor(editable(cat.df.iloc[en_pagina].reset_index(drop=True)), num_rows="dynamic", key=key_rec,
+                   on_change=guardar_edicion, args=(store_recursos(), key_rec, cat, en_pagina))
+
+with medir("sidebar/importar"), st.sidebar.expander("📥 Importar Lista de Precios", expanded=False):
+    # Se analiza por bloques contra el catálogo y solo se aplican las filas que cambian
+    st.file_uploader("CSV o XLSX (Nombre, Tipo, Categoría, Unidad, Costo Unitario)", type=["csv", "xlsx"],
+                     key="lista_precios", on_change=analizar_importacion)
+    st.checkbox("Eliminar ítems que no estén en la lista", key="imp_eliminar", on_change=analizar_importacion)
+    if "importacion_error" in st.session_state:
+        st.error(st.session_state.pop("importacion_error"))
+    dif = st.session_state.get("importacion")
+    if dif is not None:
+        st.caption(dif.resumen())
+        for error in dif.errores[:5]:
+            st.caption(f"⚠️ {error}")
+        if dif:
+            st.button("✔️ APLICAR CAMBIOS", key="b_importar", use_container_width=True, on_click=aplicar_importacion)
+
+with medir("sidebar/tarifas"), st.sidebar.expander("👷 Tarifas Personal", expanded=False):
+    key_rol = f"data_roles_{st.session_state.cat_roles.version}"
+    st.data_editor(st.session_state.roles, num_rows="dynamic", key=key_rol,
+                   on_change=guardar_edicion, args=(store_roles(), key_rol, st.session_state.cat_roles))
+
+# Fragmento con clave: GUARDAR COTIZACIÓN (en la pestaña Exportar) lo redibuja
+@st.fragment(key="guardadas")
+@medido("sidebar/guardadas")
+def fragmento_guardadas():
+    with st.expander("📂 Cotizaciones Guardadas", expanded=False):
+        guardadas = almacen().listar_cotizaciones()
+        if guardadas:
+            opciones_cot = {f"#{c['id']} · {c['cliente']} · {formatear_moneda(c['total'])}": c['id'] for c in guardadas}
+            sel_cot = st.selectbox("Cotización", list(opciones_cot), key="sel_cotizacion", label_visibility="collapsed")
+            st.button("📂 CARGAR", use_container_width=True, on_click=cargar_cotizacion, args=(opciones_cot[sel_cot],))
+        else:
+            st.caption("Aún no hay cotizaciones guardadas.")
+        reporte = indice_reprecio().ultimo_reporte
+        if reporte:
+            st.caption(f"🔄 {len(reporte)} cotización(es) repreciada(s) con el catálogo v{indice_reprecio().version_reporte}")
+            st.dataframe(pd.DataFrame(reporte).rename(columns={
+                "id": "#", "cliente": "Cliente", "fecha": "Fecha", "total_anterior": "Antes",
+                "total_nuevo": "Ahora", "diferencia": "Diferencia"}), hide_index=True, use_container_width=True)
+
+with st.sidebar:
+    fragmento_guardadas()
+
+# Deshacer/rehacer: fragmento con clave para que los callbacks que registran un
+# paso (ver DEPENDENCIAS) redibujen también el estado de estos botones
+@st.fragment(key="historia")
+@medido("sidebar/historia")
+def fragmento_historia():
+    mostrar_aviso()
+    historia = st.session_state.historia
+    d1, d2 = st.columns(2)
+    d1.button("↩️ DESHACER", use_container_width=True, on_click=deshacer, disabled=not historia.puede_deshacer)
+    d2.button("↪️ REHACER", use_container_width=True, on_click=rehacer, disabled=not historia.puede_rehacer)
+    with st.expander("📸 Instantáneas", expanded=False):
+        st.text_input("Nombre", key="inst_nombre", placeholder="p.ej. Opción con bombas")
+        st.button("📸 GUARDAR", use_container_width=True, on_click=guardar_instantanea)
+        if historia.instantaneas:
+            st.selectbox("Instantánea", list(historia.instantaneas), key="inst_sel")
+            st.button("⏪ RESTAURAR", use_container_width=True, on_click=restaurar_instantanea)
+
+with st.sidebar:
+    fragmento_historia()
 
 if st.sidebar.button("🧹 LIMPIAR TODO", use_container_width=True):
-    st.session_state.items_mat = []
-    st.session_state.items_mo = []
+    st.session_state.canasta.limpiar()
+    registrar_paso()
     st.rerun()
 
 # Main Header
 st.markdown("<h1 style='text-align: center; color: white;'>NEOZINC <span style='color:#00E5FF'>MANAGER</span></h1>", unsafe_allow_html=True)
 
 # PESTAÑAS (NOMBRE ACTUALIZADO)
-tab1, tab2, tab3 = st.tabs(["📝 COTIZADOR", "📊 GRÁFICOS Y ESTADÍSTICAS", "📤 EXPORTAR"])
-
-with tab1:
+# on_change="rerun": la pestaña activa se conoce en el servidor (tab.open) y los
+# gráficos y la exportación solo se calculan cuando su pestaña está a la vista
+tab1, tab2, tab3 = st.tabs(["📝 COTIZADOR", "📊 GRÁFICOS Y ESTADÍSTICAS", "📤 EXPORTAR"], key="pestana", on_change="rerun")
+
+# Cada bloque es un fragmento con clave: sus propios widgets solo lo re-ejecutan a
+# él, y los callbacks re-ejecutan además los fragmentos listados en DEPENDENCIAS.
+# CSS, editores del catálogo y cabecera solo corren en un rerun completo.
+@st.fragment(key="proyecto")
+def fragmento_proyecto():
     with st.container(border=True):
         st.markdown("#### 📁 Información del Proyecto")
         c1, c2, c3, c4 = st.columns(4)
-        cliente = c1.text_input("Cliente", "Cliente Nuevo")
-        contacto = c2.text_input("Celular", "51")
-        area = c3.selectbox("Sistema", ["Integral", "Detección", "Agua", "Bombas"])
-        servicio = c4.selectbox("Servicio", ["Correctivo", "Preventivo", "Instalación"])
-
-    st.write(" ")
-
-    # GENERADOR DE SECCIONES
-    def seccion_categoria(cat_code, titulo, icono):
-        with st.expander(f"{icono} {titulo}", expanded=False):
-            df_cat = st.session_state.recursos[st.session_state.recursos['Categoría'] == cat_code]
-            
-            def selector_tipo(tipo_label, tipo_code, color_emoji):
-                st.markdown(f"**{color_emoji} {tipo_label}**")
-                df = df_cat[df_cat['Tipo'] == tipo_code]
-                if not df.empty:
-                    map_items = {f"{r['Nombre']} (S/.{r['Costo Unitario']})": r for r in df.to_dict("records")}
-                    c1, c2, c3 = st.columns([3, 1, 1], vertical_alignment="bottom")
-                    sel = c1.selectbox(f"Item", list(map_items.keys()), key=f"s_{cat_code}_{tipo_code}", label_visibility="collapsed")
-                    cant = c2.number_input("Cant.", 1.0, key=f"c_{cat_code}_{tipo_code}", label_visibility="collapsed")
-                    if c3.button("AGREGAR", key=f"b_{cat_code}_{tipo_code}", use_container_width=True):
-                        agregar_item(map_items[sel], cant)
-                else:
-                    st.info(f"No hay {tipo_label} registrados.")
-                st.write("")
-
-            selector_tipo("EQUIPOS (Activos)", "Equipo", "📡")
-            st.divider()
-            selector_tipo("MATERIALES (Insumos)", "Material", "🔩")
-            st.divider()
-            selector_tipo("HERRAMIENTAS (Uso)", "Herramienta", "🛠️")
-
-    seccion_categoria("DACI", "SISTEMA DE DETECCIÓN (DACI)", "🔴")
-    seccion_categoria("ACI", "SISTEMA DE AGUA (ACI)", "🔵")
-    seccion_categoria("BCI", "SISTEMA DE BOMBAS (BCI)", "🟢")
-
-    st.write(" ")
-    # CANASTA
-    if st.session_state.items_mat:
+        c1.text_input("Cliente", key="cliente", on_change=refrescar, args=("proyecto",))
+        c2.text_input("Celular", key="contacto", on_change=refrescar, args=("proyecto",))
+        c3.selectbox("Sistema", ["Integral", "Detección", "Agua", "Bombas"], key="area", on_change=refrescar, args=("proyecto",))
+        c4.selectbox("Servicio", ["Correctivo", "Preventivo", "Instalación"], key="servicio", on_change=refrescar, args=("proyecto",))
+
+# GENERADOR DE SECCIONES
+def selector_tipo(indice, cat_code, tipo_label, tipo_code, color_emoji):
+    st.markdown(f"**{color_emoji} {tipo_label}**")
+    grupo = indice.grupo(cat_code, tipo_code)
+    if grupo.etiquetas:
+        map_items = grupo.mapa
+        c1, c2, c3 = st.columns([3, 1, 1], vertical_alignment="bottom")
+        key_sel = f"s_{cat_code}_{tipo_code}"
+        if len(grupo.etiquetas) > UMBRAL_BUSQUEDA:
+            # Catálogo grande: se busca en el servidor y solo viajan los mejores resultados
+            consulta = c1.text_input("Buscar", key=f"q_{cat_code}_{tipo_code}", label_visibility="collapsed",
+                                     placeholder=f"🔎 Buscar entre {len(grupo.etiquetas)} ítems...")
+            if consulta.strip():
+                encontrados = indice_busqueda().buscar(consulta, MAX_RESULTADOS, cat_code, tipo_code)
+                # Ids de fila -> registros de este grupo (el índice de búsqueda puede ir una versión adelante)
+                registros = [r for r in map(indice.por_id.get, encontrados)
+                             if r is not None and (r['Categoría'], r['Tipo']) == (cat_code, tipo_code)]
+                map_items = {etiqueta_recurso(r): r for r in registros}
+            else:
+                map_items = {e: grupo.mapa[e] for e in grupo.etiquetas[:MAX_RESULTADOS]}
+            key_sel = f"{key_sel}_{consulta}"  # lista nueva por consulta, arranca en el mejor resultado
+        key_cant = f"c_{cat_code}_{tipo_code}"
+        c1.selectbox(f"Item", tuple(map_items), key=key_sel, label_visibility="collapsed")
+        c2.number_input("Cant.", 1.0, key=key_cant, label_visibility="collapsed")
+        c3.button("AGREGAR", key=f"b_{cat_code}_{tipo_code}", use_container_width=True,
+                  on_click=agregar_desde_selector, args=(map_items, key_sel, key_cant))
+    else:
+        st.info(f"No hay {tipo_label} registrados.")
+    st.write("")
+
+@st.fragment
+def seccion_categoria(cat_code, titulo, icono):
+    with medir(f"seccion/{cat_code}"), st.expander(f"{icono} {titulo}", expanded=False):
+        indice = indice_catalogo(st.session_state.cat_recursos)
+        selector_tipo(indice, cat_code, "EQUIPOS (Activos)", "Equipo", "📡")
+        st.divider()
+        selector_tipo(indice, cat_code, "MATERIALES (Insumos)", "Material", "🔩")
+        st.divider()
+        selector_tipo(indice, cat_code, "HERRAMIENTAS (Uso)", "Herramienta", "🛠️")
+
+# EXPORTACIONES EN SEGUNDO PLANO (neozinc/exportaciones.py)
+@st.fragment(run_every=1.0)
+def progreso_trabajo(trabajo):
+    # Solo existe mientras el trabajo no termina; al terminar redibuja la
+    # exportación completa y deja de consultarse
+    from neozinc.exportaciones import EN_COLA
+    if trabajo.terminado:
+        st.rerun(["exportar"])
+    if trabajo.estado == EN_COLA:
+        texto = "En cola..."
+    else:
+        texto = f"{trabajo.hechos}/{trabajo.total} PDFs" if trabajo.total > 1 else "Generando PDF..."
+    st.progress(trabajo.fraccion, text=texto)
+
+def mostrar_trabajo(trabajo, etiqueta):
+    if not trabajo.terminado:
+        progreso_trabajo(trabajo)
+    elif trabajo.error is not None:
+        st.error(f"No se pudo exportar: {trabajo.error}")
+    else:
+        datos = trabajo.leer()
+        if datos is None:
+            st.warning("La exportación ya no está disponible; vuelve a generarla.")
+        else:
+            st.download_button(etiqueta, datos, trabajo.archivo, trabajo.mime, use_container_width=True,
+                               type="primary" if trabajo.mime == "application/pdf" else "secondary")
+
+# CANASTA
+@st.fragment(key="canasta")
+@medido("canasta")
+def fragmento_canasta():
+    mostrar_aviso()
+    canasta = st.session_state.canasta
+    if canasta.lineas:
         with st.container(border=True):
             st.markdown("#### 🛒 Canasta de Productos")
-            st.markdown("""<div style="display: flex; font-weight: bold; margin-bottom: 5px; color:#00E5FF;">
-                <div style="flex: 1;">Tipo</div>
-                <div style="flex: 3;">Descripción</div>
-                <div style="flex: 1;">Cant</div>
-                <div style="flex: 1;">Total</div>
-                <div style="flex: 0.5;"></div>
-            </div>""", unsafe_allow_html=True)
-            
-            for i, item in enumerate(st.session_state.items_mat):
-                c1, c2, c3, c4, c5 = st.columns([1, 3, 1, 1, 0.5])
-                c1.caption(item['Tipo'])
-                c2.write(item['Nombre'])
-                c3.write(f"{item['Cantidad']} {item['Unidad']}")
-                c4.write(f"{item['Subtotal']:.2f}")
-                if c5.button("❌", key=f"del_mat_{i}"): eliminar_item(i, 'mat')
+            # Una sola tabla (virtualizada por el navegador) en vez de una fila de widgets
+            # por línea; las ediciones se aplican juntas al pulsar el botón del formulario
+            df = pd.DataFrame(canasta.materiales, columns=COLUMNAS_CANASTA)
+            df.insert(0, "Quitar", False)
+            key = f"tabla_canasta_{canasta.version}"
+            with st.form(f"form_canasta_{canasta.version}", border=False):
+                st.data_editor(
+                    df, key=key, hide_index=True, use_container_width=True,
+                    height=min(38 + 35 * len(df), ALTO_MAX_CANASTA),
+                    disabled=["Tipo", "Nombre", "Unidad", "Precio Unit.", "Subtotal"],
+                    column_config={
+                        "Quitar": st.column_config.CheckboxColumn("❌", width="small"),
+                        "Cantidad": st.column_config.NumberColumn("Cant", min_value=0.0),
+                        "Nombre": st.column_config.TextColumn("Descripción", width="large"),
+                        "Precio Unit.": st.column_config.NumberColumn("P.Unit", format="%.2f"),
+                        "Subtotal": st.column_config.NumberColumn("Total", format="%.2f"),
+                    },
+                )
+                st.form_submit_button("✔️ APLICAR CAMBIOS", on_click=editar_canasta, args=(key,))
 
-    st.write(" ")
+@st.fragment(key="mano_obra")
+@medido("mano_obra")
+def fragmento_mano_obra():
     with st.container(border=True):
         st.markdown("#### 👷 Mano de Obra")
         c1, c2, c3, c4 = st.columns([3, 1, 1, 1], vertical_alignment="bottom")
-        df_rol = st.session_state.roles.to_dict("records")
-        map_rol = {f"{r['Cargo']} (S/.{r['Costo Hora']})": r for r in df_rol}
+        map_rol = st.session_state.cat_roles.derivar(
+            "map_rol", lambda df: {f"{r['Cargo']} (S/.{r['Costo Hora']})": r for r in df.to_dict("records")})
         
-        with c1: sel_rol = st.selectbox("Cargo", list(map_rol.keys()) if map_rol else [])
-        with c2: n_per = st.number_input("Pers.", 1, key="np")
-        with c3: n_hrs = st.number_input("Hrs.", 4.0, key="nh")
-        with c4:
-            if st.button("AGREGAR", key="b_mo", use_container_width=True) and map_rol:
-                r = map_rol[sel_rol]
-                st.session_state.items_mo.append({
-                    "Cargo": r['Cargo'], "Personas": n_per, "Horas": n_hrs,
-                    "Subtotal": r['Costo Hora']*n_per*n_hrs
-                })
+        with c1: st.selectbox("Cargo", list(map_rol.keys()) if map_rol else [], key="rol")
+        with c2: st.number_input("Pers.", 1, key="np")
+        with c3: st.number_input("Hrs.", 4.0, key="nh")
+        with c4: st.button("AGREGAR", key="b_mo", use_container_width=True, on_click=agregar_mano_obra, args=(map_rol,))
         
-        if st.session_state.items_mo:
-            st.dataframe(pd.DataFrame(st.session_state.items_mo)[["Cargo", "Personas", "Horas", "Subtotal"]], use_container_width=True)
-
-# CÁLCULOS
-t_mat = sum(x['Subtotal'] for x in st.session_state.items_mat)
-t_mo = sum(x['Subtotal'] for x in st.session_state.items_mo)
+        if st.session_state.canasta.lineas_mo:
+            st.dataframe(pd.DataFrame(st.session_state.canasta.mano_obra)[["Cargo", "Personas", "Horas", "Subtotal"]], use_container_width=True)
 
-st.sidebar.markdown("---")
-st.sidebar.markdown("### 💰 Finanzas")
-st.session_state.gg = st.sidebar.number_input("Gastos Grales (S/.)", value=st.session_state.gg)
-st.session_state.margen = st.sidebar.slider("Margen %", 0, 100, st.session_state.margen)
+@st.fragment(key="finanzas")
+def fragmento_finanzas():
+    st.markdown("---")
+    st.markdown("### 💰 Finanzas")
+    st.number_input("Gastos Grales (S/.)", value=st.session_state.gg, key="w_gg", on_change=actualizar_finanzas)
+    st.slider("Margen %", 0, 100, st.session_state.margen, key="w_margen", on_change=actualizar_finanzas)
 
-costo_dir = t_mat + t_mo + st.session_state.gg
-precio_final = costo_dir * (1 + st.session_state.margen/100)
-utilidad = precio_final - costo_dir
+# CÁLCULOS (totales acumulados de la canasta, ver neozinc/canasta.py)
+def calcular_totales():
+    with medir("totales"):
+        return st.session_state.canasta.totales(st.session_state.gg, st.session_state.margen)
 
 # --- DASHBOARD (GRÁFICOS) ---
-with tab2:
+def graficos_dashboard(totales):
+    # Gráficos guardados en la sesión: se rearman solo si cambió lo que dibujan
+    from neozinc.graficos import grafico_distribucion, grafico_pareto
+    canasta = st.session_state.canasta
+    cache = st.session_state.setdefault("cache_graficos", {})
+    clave_pie = (canasta.version, st.session_state.gg, st.session_state.margen)
+    if cache.get("pie", (None,))[0] != clave_pie:
+        cache["pie"] = (clave_pie, grafico_distribucion(totales))
+    if cache.get("pareto", (None,))[0] != canasta.version:
+        cache["pareto"] = (canasta.version, grafico_pareto(canasta.lineas) if canasta.lineas else None)
+    return cache["pie"][1], cache["pareto"][1]
+
+@st.fragment(key="dashboard")
+@medido("graficos")
+def fragmento_dashboard():
+    if not tab2.open:
+        return  # pestaña oculta: nada que calcular ni enviar
+    from neozinc.graficos import TOP_PARETO
+    totales = calcular_totales()
+    costo_dir, precio_final, utilidad = totales.costo_dir, totales.precio_final, totales.utilidad
     st.markdown("### 📊 Tablero de Control Financiero")
     
     with st.container(border=True):
@@ -382,52 +616,102 @@ with tab2:
 
     if costo_dir > 0:
         c1, c2 = st.columns(2)
-        
-        # Datos para Gráficos
-        t_eq = sum(x['Subtotal'] for x in st.session_state.items_mat if x['Tipo'] == 'Equipo')
-        t_mt = sum(x['Subtotal'] for x in st.session_state.items_mat if x['Tipo'] == 'Material')
-        t_he = sum(x['Subtotal'] for x in st.session_state.items_mat if x['Tipo'] == 'Herramienta')
-        
-        data_pie = pd.DataFrame([
-            {"Categoría": "Equipos", "Monto": t_eq},
-            {"Categoría": "Materiales", "Monto": t_mt},
-            {"Categoría": "Herramientas", "Monto": t_he},
-            {"Categoría": "Mano Obra", "Monto": t_mo},
-            {"Categoría": "Gastos Grales", "Monto": st.session_state.gg},
-            {"Categoría": "Utilidad", "Monto": utilidad}
-        ])
+        pie, bar = graficos_dashboard(totales)
         
         with c1:
             with st.container(border=True):
                 st.markdown("**Distribución del Precio Total**")
-                base = alt.Chart(data_pie).encode(theta=alt.Theta("Monto", stack=True))
-                pie = base.mark_arc(outerRadius=120, innerRadius=60).encode(
-                    color=alt.Color("Categoría", scale=alt.Scale(scheme='spectral')),
-                    order=alt.Order("Monto", sort="descending"),
-                    tooltip=["Categoría", "Monto"]
-                )
-                text = base.mark_text(radius=140).encode(
-                    text=alt.Text("Monto", format=",.0f"),
-                    order=alt.Order("Monto", sort="descending"),
-                    color=alt.value("white")
-                )
-                st.altair_chart(pie + text, use_container_width=True)
+                st.altair_chart(pie, use_container_width=True)
         
         with c2:
             with st.container(border=True):
-                st.markdown("**Top Costos (Pareto)**")
-                if st.session_state.items_mat:
-                    df_bar = pd.DataFrame(st.session_state.items_mat)
-                    bar = alt.Chart(df_bar).mark_bar().encode(
-                        x=alt.X("Subtotal", title="Costo (S/.)"),
-                        y=alt.Y("Nombre", sort="-x"),
-                        color="Tipo",
-                        tooltip=["Nombre", "Subtotal"]
-                    )
+                st.markdown(f"**Top Costos (Pareto, {TOP_PARETO} mayores)**")
+                if bar is not None:
                     st.altair_chart(bar, use_container_width=True)
 
+# --- ESCENARIOS (MARGEN × GASTOS GENERALES) ---
+@st.fragment(key="escenarios")
+@medido("escenarios")
+def fragmento_escenarios():
+    if not tab2.open:
+        return
+    canasta = st.session_state.canasta
+    with st.expander("🔀 Escenarios: Margen × Gastos Grales", expanded=False):
+        if not canasta:
+            st.info("Agrega ítems a la canasta para simular escenarios.")
+            return
+        # Un formulario: mover los controles no dispara reruns, la grilla completa
+        # se calcula de una vez al confirmar (ver precios.sensibilidad)
+        with st.form("form_escenarios", border=False):
+            m = int(st.session_state.margen)
+            c1, c2 = st.columns(2)
+            rango_m = c1.slider("Margen %", 0, 100, (max(0, m - 15), min(100, m + 15)), key="esc_margen")
+            paso_m = c2.number_input("Paso margen", 1, 50, 5, key="esc_paso_m")
+            c1, c2, c3 = st.columns(3)
+            gg = float(st.session_state.gg)
+            gg_min = c1.number_input("GG desde", 0.0, value=max(0.0, gg - 100), step=10.0, key="esc_gg_min")
+            gg_max = c2.number_input("GG hasta", 0.0, value=gg + 100, step=10.0, key="esc_gg_max")
+            n_gg = c3.number_input("Pasos GG", 2, 50, 9, key="esc_n_gg")
+            st.caption("Descuento del proveedor por tipo (%)")
+            columnas = st.columns(len(TIPOS))
+            descuentos = [col.number_input(t, 0.0, 100.0, 0.0, step=1.0, key=f"esc_desc_{t}")
+                          for col, t in zip(columnas, TIPOS)]
+            st.form_submit_button("CALCULAR", use_container_width=True)
+
+        from neozinc.graficos import grafico_sensibilidad
+        margenes = np.arange(rango_m[0], rango_m[1] + 1, paso_m)
+        ggs = np.linspace(gg_min, max(gg_min, gg_max), int(n_gg))
+        factores = [1 - d / 100 for d in descuentos] + [1.0]  # "Otros" sin descuento
+        sens = sensibilidad(canasta.por_tipo, canasta.t_mo, margenes, ggs, factores)
+        st.altair_chart(grafico_sensibilidad(sens), use_container_width=True)
+        tabla = pd.DataFrame(sens.precio_final, index=[formatear_moneda(g) for g in ggs],
+                             columns=[f"{m:g}%" for m in margenes])
+        st.dataframe(tabla.style.format("{:,.2f}"), use_container_width=True)
+
+# --- HISTÓRICO (ROLLUPS POR MES, ver neozinc/historial.py) ---
+@st.fragment(key="historial")
+@medido("historial")
+def fragmento_historial():
+    if not tab2.open:
+        return
+    with st.expander("📈 Histórico de Cotizaciones", expanded=False):
+        hist = historial()
+        meses = hist.meses()
+        if not meses:
+            st.info("Aún no hay cotizaciones en el histórico: se agregan al guardarlas.")
+            return
+        from neozinc.graficos import grafico_historial
+        c1, c2 = st.columns([2, 1])
+        if len(meses) > 1:
+            desde, hasta = c1.select_slider("Meses", meses, value=(meses[0], meses[-1]), key="hist_meses")
+        else:
+            desde = hasta = meses[0]
+        opciones = {"mes": "Mes", **DIMENSIONES}
+        por = c2.selectbox("Agrupar por", list(opciones), format_func=opciones.get, key="hist_por")
+        # Solo se leen los rollups (una fila por grupo y mes), nunca las líneas de cada cotización
+        total = hist.resumen("mes", desde, hasta)
+        resumen = total if por == "mes" else hist.resumen(por, desde, hasta, limite=TOP_HISTORIAL)
+        venta, utilidad, costo = total["Venta"].sum(), total["Utilidad"].sum(), total["Costo Directo"].sum()
+        k1, k2, k3 = st.columns(3)
+        k1.metric("COTIZACIONES", f"{int(total['Cotizaciones'].sum()):,}")
+        k2.metric("VENTA", formatear_moneda(venta))
+        k3.metric("MARGEN", f"{100 * utilidad / costo:.1f}%" if costo else "—")  # sobre costo, como el slider
+        st.altair_chart(grafico_historial(resumen, opciones[por]), use_container_width=True)
+        st.dataframe(resumen, hide_index=True, use_container_width=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.2f")
+                                    for c in resumen.columns[2:]})
+
 # --- EXPORTAR ---
-with tab3:
+@st.fragment(key="exportar")
+def fragmento_exportar():
+    if not tab3.open:
+        return
+    from neozinc.exportaciones import cola_exportacion
+    from neozinc.lote import leer_clientes_csv
+    from neozinc.pdf import CACHE_PDF, clave_cotizacion
+    totales = calcular_totales()
+    precio_final = totales.precio_final
+    cliente = st.session_state.cliente
     st.markdown("### 📤 Finalizar Proyecto")
     
     col_center = st.columns([1, 2, 1])[1]
@@ -436,15 +720,82 @@ with tab3:
             st.metric("TOTAL A COBRAR", formatear_moneda(precio_final))
             st.write(" ")
             
-            if st.session_state.items_mat or st.session_state.items_mo:
-                pdf_data = generar_pdf_bytes(cliente, str(datetime.date.today()), area, servicio, 
-                                            st.session_state.items_mat, st.session_state.items_mo, 
-                                            st.session_state.gg, st.session_state.margen, precio_final)
+            if st.session_state.canasta:
+                datos_pdf = (cliente, str(datetime.date.today()), st.session_state.area, st.session_state.servicio,
+                             st.session_state.canasta.materiales, st.session_state.canasta.mano_obra,
+                             st.session_state.gg, st.session_state.margen, precio_final)
+                # El PDF solo se genera bajo demanda, en la cola de exportaciones (nunca en
+                # este hilo); si la cotización no cambió sale de la caché
+                trabajos = st.session_state.setdefault("exportaciones", {})  # "pdf"/"zip" -> Trabajo
+                clave_pdf = clave_cotizacion(*datos_pdf)
+                pdf_data = CACHE_PDF.obtener(clave_pdf)
+                trabajo_pdf = trabajos.get("pdf")
+                if trabajo_pdf is not None and trabajo_pdf.clave != "pdf:" + clave_pdf:
+                    del trabajos["pdf"]  # era de una versión anterior de la cotización
+                    trabajo_pdf = None
+                if pdf_data is not None:
+                    st.download_button("📄 1. DESCARGAR PDF", pdf_data, f"Cotizacion_{cliente}.pdf", "application/pdf", type="primary", use_container_width=True)
+                elif trabajo_pdf is not None:
+                    mostrar_trabajo(trabajo_pdf, "📄 1. DESCARGAR PDF")
+                elif st.button("📄 1. PREPARAR PDF", type="primary", use_container_width=True):
+                    trabajos["pdf"] = cola_exportacion().pdf(datos_pdf)
+                    mostrar_trabajo(trabajos["pdf"], "📄 1. DESCARGAR PDF")
                 
-                st.download_button("📄 1. DESCARGAR PDF", pdf_data, f"Cotizacion_{cliente}.pdf", "application/pdf", type="primary", use_container_width=True)
+                st.button("💾 GUARDAR COTIZACIÓN", use_container_width=True,
+                          on_click=guardar_cotizacion_actual, args=(datos_pdf, totales))
+                if "cotizacion_guardada" in st.session_state:
+                    st.success(f"Cotización #{st.session_state.pop('cotizacion_guardada')} guardada.")
                 
                 st.write(" ")
                 msg = urllib.parse.quote(f"*NEOZINC*\nCliente: {cliente}\nTotal: {formatear_moneda(precio_final)}")
-                st.link_button("🟢 2. ENVIAR WHATSAPP", f"https://wa.me/{contacto}?text={msg}", use_container_width=True)
+                st.link_button("🟢 2. ENVIAR WHATSAPP", f"https://wa.me/{st.session_state.contacto}?text={msg}", use_container_width=True)
+                
+                st.write(" ")
+                with st.expander("📦 3. EXPORTACIÓN MASIVA (ZIP)", expanded=False):
+                    archivo = st.file_uploader("CSV de clientes (columnas: Cliente, opcional Sistema y Servicio)", type="csv", key="csv_clientes")
+                    if archivo is not None and st.button("GENERAR ZIP", use_container_width=True):
+                        try:
+                            clientes = leer_clientes_csv(archivo.getvalue())
+                        except ValueError as e:
+                            st.error(str(e))
+                        else:
+                            # El ZIP se arma en disco, en segundo plano (ver neozinc/exportaciones.py)
+                            trabajos["zip"] = cola_exportacion().zip(clientes, datos_pdf)
+                    if "zip" in trabajos:
+                        mostrar_trabajo(trabajos["zip"], "⬇️ DESCARGAR ZIP")
             else:
-                st.warning("Cotización vacía.")
\ No newline at end of file
+                st.warning("Cotización vacía.")
+
+with st.sidebar:
+    fragmento_finanzas()
+
+with tab1:
+    fragmento_proyecto()
+    st.write(" ")
+    seccion_categoria("DACI", "SISTEMA DE DETECCIÓN (DACI)", "🔴")
+    seccion_categoria("ACI", "SISTEMA DE AGUA (ACI)", "🔵")
+    seccion_categoria("BCI", "SISTEMA DE BOMBAS (BCI)", "🟢")
+    st.write(" ")
+    fragmento_canasta()
+    st.write(" ")
+    fragmento_mano_obra()
+
+with tab2:
+    fragmento_dashboard()
+    fragmento_escenarios()
+    fragmento_historial()
+
+with tab3:
+    fragmento_exportar()
+
+# --- PANEL DE PERFIL ---
+# Al final del script: muestra lo medido en este rerun completo (los reruns de
+# un solo fragmento van al log pero no redibujan el panel)
+if "perfil" in st.session_state:
+    perfil = st.session_state.perfil
+    total = perfil.total_ms()
+    perfil.registrar("rerun", total)
+    with st.sidebar.expander("⏱️ Perfil del rerun", expanded=True):
+        st.caption(f"Rerun #{perfil.rerun} · {total:.0f} ms · log: {perfil.ruta}")
+        st.dataframe(perfil.tabla(), hide_index=True, use_container_width=True,
+                     column_config={"ms": st.column_config.NumberColumn("ms", format="%.1f")})
@@ -0,0 +1,463 @@
+"""Benchmarks de los caminos críticos del cotizador, sin navegador.
+
+Cubre generar_pdf_bytes, el filtrado del catálogo de seccion_categoria, los
+totales de la canasta, los pasos de deshacer, formatear_moneda, el histórico de cotizaciones
+(rollups vs. reescaneo a 100k cotizaciones), el reprecio tras una
+actualización de 5.000 precios (solo lo afectado vs. todo), el commit de una
+edición del catálogo con sus vistas derivadas, el rerun completo de APP4.py y de
+app.py (el script que app.py.py trae como parche) con AppTest y el arranque
+en frío de APP4.py en un proceso nuevo. Escribe los
+resultados en JSON y, con --comparar, los contrasta con una línea base y sale
+con código 1 si algo empeoró más que --umbral; antes de fallar vuelve a medir
+(hasta REINTENTOS veces) los grupos con regresiones.
+
+    python benchmarks/bench.py -o resultados.json --comparar benchmarks/baseline.json
+    python benchmarks/bench.py --solo pdf,rerun      # solo esos grupos
+    python benchmarks/bench.py --repetir 3 -o benchmarks/baseline.json   # nueva línea base
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+# Base SQLite descartable, aunque NEOZINC_DB ya apunte a otra: bench_reprecio
+# borra las cotizaciones guardadas
+os.environ["NEOZINC_DB"] = os.path.join(tempfile.mkdtemp(prefix="neozinc_bench_"), "bench.db")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from neozinc.almacen import almacen  # noqa: E402
+from neozinc.busqueda import IndiceBusqueda  # noqa: E402
+from neozinc.canasta import Canasta  # noqa: E402
+from neozinc.historial import COLUMNAS, Historial  # noqa: E402
+from neozinc.catalogo import Catalogo, CatalogoStore, compactar  # noqa: E402
+from neozinc.deshacer import Historia  # noqa: E402
+from neozinc.indice import IndiceCatalogo, etiqueta_recurso, indice_catalogo, posiciones_catalogo  # noqa: E402
+from neozinc.memoria import catalogo_sintetico  # noqa: E402
+from neozinc.pdf import generar_pdf_bytes  # noqa: E402
+from neozinc.precios import cotizar, cotizar_lote, formatear_moneda  # noqa: E402
+from neozinc.reprecio import IndiceReprecio  # noqa: E402
+
+# x2 sobre la línea base = regresión. En máquinas virtuales compartidas una misma
+# medición varía hasta x1.7 entre corridas sin cambiar el código, así que un
+# umbral menor da regresiones falsas; las optimizaciones que vigila el banco son
+# de un orden de magnitud, y perderlas sigue saltando. En una máquina dedicada
+# se puede bajar con --umbral
+UMBRAL = 1.0
+# Un grupo con regresiones se vuelve a medir y se queda la mejor vuelta, como la
+# línea base con --repetir: una regresión real sobrevive, el ruido casi nunca
+REINTENTOS = 2
+CATEGORIAS = ("DACI", "ACI", "BCI")
+TIPOS_UI = ("Equipo", "Material", "Herramienta")
+
+
+def medir(funcion, min_tiempo=0.3, min_rep=3, max_rep=200, min_muestra=0.002) -> dict:
+    # Como timeit.autorange: las funciones de microsegundos se llaman `lote`
+    # veces por muestra para que cada muestra dure al menos `min_muestra`
+    lote, t = 1, time.perf_counter()
+    funcion()
+    dt = time.perf_counter() - t
+    while dt < min_muestra and lote < 100_000:
+        lote *= 10
+        t = time.perf_counter()
+        for _ in range(lote):
+            funcion()
+        dt = time.perf_counter() - t
+    tiempos, total = [], 0.0
+    while (len(tiempos) < min_rep or total < min_tiempo) and len(tiempos) < max_rep:
+        t = time.perf_counter()
+        for _ in range(lote):
+            funcion()
+        dt = time.perf_counter() - t
+        tiempos.append(dt / lote)
+        total += dt
+    return {"mediana_ms": round(statistics.median(tiempos) * 1000, 5),
+            "min_ms": round(min(tiempos) * 1000, 5), "rep": len(tiempos), "lote": lote}
+
+
+def canasta_sintetica(lineas, semilla=0) -> Canasta:
+    registros = IndiceCatalogo(compactar(catalogo_sintetico(max(lineas, 20), semilla))).registros
+    canasta = Canasta()
+    for i, r in enumerate(registros[:lineas]):
+        canasta.agregar_recurso(r, float(1 + i % 5))
+    canasta.agregar_mano_obra({"Cargo": "Técnico Líder", "Personas": 2, "Horas": 8, "Subtotal": 560.0})
+    return canasta
+
+
+# --- Grupos de benchmarks ---
+def bench_pdf(res):
+    for n in (10, 100, 1_000, 10_000):
+        c = canasta_sintetica(n)
+        materiales, mano_obra = c.materiales, c.mano_obra
+        res[f"pdf/lineas={n}"] = medir(lambda: generar_pdf_bytes(
+            "Cliente", "2026-01-01", "Integral", "Correctivo", materiales, mano_obra, 50.0, 30, 1000.0),
+            min_rep=1 if n >= 10_000 else 3)
+
+
+def bench_filtro(res):
+    for n in (20, 1_000, 50_000):
+        df = compactar(catalogo_sintetico(n))
+        # Costo por versión del catálogo: índice (Categoría, Tipo) y mapas de opciones
+        res[f"filtro/indice/filas={n}"] = medir(lambda: IndiceCatalogo(df))
+        indice = IndiceCatalogo(df)
+
+        def seccion():
+            # Lo que hace cada seccion_categoria por rerun: 3 grupos por categoría
+            for cat in CATEGORIAS:
+                for tipo in TIPOS_UI:
+                    tuple(indice.grupo(cat, tipo).mapa)
+        res[f"filtro/seccion/filas={n}"] = medir(seccion)
+
+        def filtro_booleano():
+            # Forma original (antes del índice): máscara + to_dict por selector
+            for cat in CATEGORIAS:
+                for tipo in TIPOS_UI:
+                    sub = df[(df["Categoría"] == cat) & (df["Tipo"] == tipo)]
+                    {etiqueta_recurso(r): r for r in sub.to_dict("records")}
+        res[f"filtro/booleano/filas={n}"] = medir(filtro_booleano, max_rep=20)
+
+        busqueda = IndiceBusqueda()
+        busqueda.reconstruir(df)
+        res[f"filtro/busqueda/filas={n}"] = medir(lambda: busqueda.buscar("item 12 prueba", 20))
+
+
+def bench_totales(res):
+    for n in (10, 500, 5_000):
+        c = canasta_sintetica(n)
+        materiales, mano_obra = c.materiales, c.mano_obra
+        res[f"totales/acumulados/lineas={n}"] = medir(lambda: c.totales(50.0, 30))
+        res[f"totales/recalculo/lineas={n}"] = medir(lambda: cotizar(materiales, mano_obra, 50.0, 30))
+
+
+def bench_deshacer(res):
+    # Cambio de cantidad + registro del paso, y deshacer + restaurar la canasta
+    for n in (10, 500, 5_000):
+        c = canasta_sintetica(n)
+        historia = Historia()
+        historia.registrar(c, 50.0, 30, {})
+        contador = iter(range(10 ** 9))
+
+        def paso():
+            i = next(contador)
+            c.actualizar_cantidad(i % n, float(i))
+            historia.registrar(c, 50.0, 30, {})
+        res[f"deshacer/registrar/lineas={n}"] = medir(paso, max_rep=50)
+
+        def deshacer():
+            estado = historia.deshacer() or historia.rehacer()
+            c.restaurar(estado.todas("lineas"), estado.todas("lineas_mo"))
+        res[f"deshacer/restaurar/lineas={n}"] = medir(deshacer, max_rep=50)
+
+
+def bench_formato(res):
+    valores = np.random.default_rng(0).uniform(0, 1e6, 10_000).tolist()
+    r = medir(lambda: [formatear_moneda(v) for v in valores])
+    res["formato/formatear_moneda/x10000"] = r
+
+
+def historial_sintetico(n, semilla=0) -> pd.DataFrame:
+    # n cotizaciones de 8 líneas repartidas en 24 meses, 2000 clientes, 4 sistemas y 3 servicios
+    rng = np.random.default_rng(semilla)
+    lineas = 8
+    canasta = np.repeat(np.arange(n), lineas)
+    totales = cotizar_lote(canasta, rng.uniform(10, 2000, n * lineas), rng.integers(1, 10, n * lineas),
+                           rng.integers(0, 3, n * lineas), t_mo=rng.uniform(100, 2000, n), gg=50.0,
+                           margen=rng.choice([20.0, 25.0, 30.0], n), n_canastas=n)
+    meses = np.array([f"{2025 + m // 12}-{m % 12 + 1:02d}" for m in range(24)])
+    mes = meses[rng.integers(0, 24, n)]
+    df = pd.DataFrame({"id": np.arange(n), "fecha": np.char.add(mes.astype(str), "-15"), "mes": mes,
+                       "cliente": np.char.add("Cliente ", rng.integers(0, 2000, n).astype(str)),
+                       "area": np.array(["Integral", "Detección", "Agua", "Bombas"])[rng.integers(0, 4, n)],
+                       "servicio": np.array(["Correctivo", "Preventivo", "Instalación"])[rng.integers(0, 3, n)],
+                       "margen": 30.0, "lineas": lineas, "creado": "2026-01-01T00:00:00"})
+    for campo in totales._fields:
+        df[campo] = getattr(totales, campo)
+    return df[list(COLUMNAS)]
+
+
+def bench_historial(res):
+    n = 100_000
+    df = historial_sintetico(n)
+    hist = Historial(tempfile.mkdtemp(prefix="neozinc_hist_"))
+    t = time.perf_counter()
+    for i in range(0, n, 10_000):
+        hist.agregar(df.iloc[i:i + 10_000].to_dict("records"))
+    res[f"historial/ingesta/cotizaciones={n}"] = {"mediana_ms": round((time.perf_counter() - t) * 1000, 4), "rep": 1}
+    for por in ("mes", "cliente", "area", "servicio"):
+        res[f"historial/resumen/{por}/cotizaciones={n}"] = medir(lambda: hist.resumen(por, limite=20))
+    res[f"historial/resumen/cliente_rango/cotizaciones={n}"] = medir(
+        lambda: hist.resumen("cliente", "2025-07", "2025-12", limite=20))
+    # Lo que costaría sin rollups: leer los hechos y agrupar en cada carga del tablero
+    res[f"historial/reescaneo/cliente/cotizaciones={n}"] = medir(
+        lambda: hist.leer().groupby("cliente")["precio_final"].sum().nlargest(20), max_rep=10)
+    fila = df.iloc[:1].to_dict("records")
+    res["historial/agregar/1"] = medir(lambda: hist.agregar(fila), max_rep=50)
+
+
+def bench_edicion(res):
+    # Una sesión cambia un precio sobre una instantánea vieja (otra sesión hizo
+    # commit entre medio) y el siguiente rerun pide el índice y los filtros
+    for n in (1_000, 50_000):
+        store = CatalogoStore(catalogo_sintetico(n))
+        rng = np.random.default_rng(0)
+
+        def editar(heredar=True):
+            base = store.actual
+            store.aplicar_edicion({int(rng.integers(n)): {"Costo Unitario": float(rng.uniform(1, 1000))}})
+            cat = store.aplicar_edicion({int(rng.integers(n)): {"Costo Unitario": 1.0}}, base=base)
+            if heredar:
+                indice_catalogo(cat)
+            else:
+                IndiceCatalogo(cat.df)  # reconstrucción completa, como antes
+            posiciones_catalogo(cat, "DACI", "Equipo")
+        indice_catalogo(store.actual)
+        posiciones_catalogo(store.actual, "DACI", "Equipo")
+        res[f"edicion/precio/filas={n}"] = medir(editar, max_rep=50)
+        res[f"edicion/precio_sin_herencia/filas={n}"] = medir(lambda: editar(False), max_rep=20)
+
+
+def _una_vez(funcion) -> dict:
+    t = time.perf_counter()
+    funcion()
+    return {"mediana_ms": round((time.perf_counter() - t) * 1000, 4), "rep": 1}
+
+
+def bench_reprecio(res):
+    # 50k ítems, 10k cotizaciones guardadas de 8 líneas y 500 canastas abiertas de
+    # 20; el proveedor cambia 5.000 precios. Cada medición modifica el estado, así
+    # que es de una sola vuelta
+    filas, n_cot, lineas, n_canastas, cambios = 50_000, 10_000, 8, 500, 5_000
+    rng = np.random.default_rng(0)
+    store = CatalogoStore(catalogo_sintetico(filas))
+    registros = IndiceCatalogo(store.actual.df, store.actual.ids).registros
+    alm = almacen()
+    con = alm.conexion()
+    with con:
+        con.execute("DELETE FROM cotizaciones")
+        con.execute("DELETE FROM cotizacion_materiales")
+        con.executemany("INSERT INTO cotizaciones (id, cliente, fecha, gg, margen, total) VALUES (?, ?, ?, 50, 30, 0)",
+                        ((i, f"Cliente {i % 500}", "2026-01-15") for i in range(1, n_cot + 1)))
+        elegidos = rng.integers(0, filas, (n_cot, lineas))
+        con.executemany("INSERT INTO cotizacion_materiales VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)",
+                        ((i + 1, j, r['Nombre'], r['Tipo'], r['Unidad'], r['Costo Unitario'], r['Costo Unitario'], r['id'])
+                         for i, fila in enumerate(elegidos) for j, r in enumerate(registros[k] for k in fila)))
+    indice = IndiceReprecio()
+    canastas = []
+    for fila in rng.integers(0, filas, (n_canastas, 20)):
+        c = Canasta()
+        indice.registrar(c)
+        for k in fila:
+            c.agregar_recurso(registros[k], 1.0)
+        canastas.append(c)
+    store.suscribir(indice.al_cambiar)
+
+    costos = store.actual.df["Costo Unitario"].to_numpy()
+    posiciones = rng.choice(filas, cambios, replace=False)
+    editados = {int(p): {"Costo Unitario": float(costos[p]) + 1.0} for p in posiciones}
+    # La misma edición sin suscriptor: lo que cuesta publicar la versión nueva del catálogo
+    res[f"reprecio/edicion_sin_reprecio/filas={cambios}"] = _una_vez(
+        lambda: CatalogoStore(store.actual.df).aplicar_edicion(editados))
+    res[f"reprecio/edicion/filas={cambios}"] = _una_vez(lambda: store.aplicar_edicion(editados))
+    marcadas = [c for c in canastas if c.reprecio_pendiente]
+    por_id = IndiceCatalogo(store.actual.df, store.actual.ids).por_id
+    res["reprecio/canastas/aplicar"] = {**_una_vez(lambda: [c.repreciar(por_id) for c in marcadas]),
+                                        "marcadas": len(marcadas), "de": n_canastas}
+    res["reprecio/cotizaciones/afectadas"] = {"cotizaciones": len(indice.ultimo_reporte), "de": n_cot}
+    # Referencia: repreciar todas las cotizaciones guardadas (todos los precios cambian)
+    todos = {i: (r['Nombre'], r['Costo Unitario'] + 1.0, r['Tipo']) for i, r in por_id.items()}
+    res[f"reprecio/cotizaciones_todas/filas={filas}"] = _una_vez(lambda: alm.repreciar_cotizaciones(todos))
+
+
+def _script_de_parche(ruta) -> str:
+    # app.py.py es un `git apply` con app.py dentro: se reconstruye el archivo original
+    lineas, dentro = [], False
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            if linea.startswith("+++ "):
+                dentro = True
+            elif dentro and linea.startswith("+"):
+                lineas.append(linea[1:])
+            elif dentro and linea.startswith("EOF"):
+                break
+    destino = os.path.join(tempfile.mkdtemp(prefix="neozinc_app_"), "app.py")
+    with open(destino, "w", encoding="utf-8") as f:
+        f.writelines(lineas)
+    return destino
+
+
+def _bench_rerun(res, nombre, ruta, canasta=None):
+    from streamlit.testing.v1 import AppTest
+
+    t = time.perf_counter()
+    at = AppTest.from_file(ruta, default_timeout=120)
+    if canasta is not None:
+        at.session_state["canasta"] = canasta
+    at.run()
+    if at.exception:
+        res[f"rerun/{nombre}"] = {"error": str(at.exception[0].message)}
+        return
+    res[f"rerun/{nombre}/primero"] = {"mediana_ms": round((time.perf_counter() - t) * 1000, 4), "rep": 1}
+    res[f"rerun/{nombre}"] = medir(at.run, min_tiempo=2.0, min_rep=5, max_rep=30)
+
+
+def bench_rerun(res):
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        res["rerun"] = {"error": "streamlit no está instalado"}
+        return
+    _bench_rerun(res, "APP4", os.path.join(RAIZ, "APP4.py"))
+    _bench_rerun(res, "APP4/canasta=500", os.path.join(RAIZ, "APP4.py"), canasta_sintetica(500))
+    _bench_rerun(res, "app_py", _script_de_parche(os.path.join(RAIZ, "app.py.py")))
+
+
+# Arranque en frío: un proceso nuevo por medición (importar streamlit, primer run
+# del script y reruns en caliente), e informa si altair/fpdf quedaron cargados
+_ARRANQUE = r"""
+import json, sys, time
+t = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+importar = time.perf_counter() - t
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+t = time.perf_counter()
+at.run()
+primero = time.perf_counter() - t
+reruns = []
+for _ in range(int(sys.argv[2])):
+    t = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - t)
+print(json.dumps({"importar": importar, "primero": primero, "rerun": min(reruns),
+                  "error": str(at.exception[0].message) if at.exception else None,
+                  "modulos": {m: m in sys.modules for m in ("altair", "fpdf", "pandas")}}))
+"""
+
+
+def arranque(ruta, procesos=3, reruns=10) -> dict:
+    muestras = []
+    for _ in range(procesos):
+        salida = subprocess.run([sys.executable, "-c", _ARRANQUE, ruta, str(reruns)], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout
+        muestras.append(json.loads(salida.strip().splitlines()[-1]))
+    res = {}
+    for campo in ("importar", "primero", "rerun"):
+        tiempos = [m[campo] for m in muestras]
+        res[campo] = {"mediana_ms": round(statistics.median(tiempos) * 1000, 4),
+                      "min_ms": round(min(tiempos) * 1000, 4), "rep": len(tiempos)}
+    res["modulos"] = {**muestras[-1]["modulos"], "error": muestras[-1]["error"]}
+    return res
+
+
+def bench_arranque(res):
+    for campo, r in arranque(os.path.join(RAIZ, "APP4.py")).items():
+        res[f"arranque/APP4/{campo}"] = r
+
+
+GRUPOS = {"pdf": bench_pdf, "filtro": bench_filtro, "totales": bench_totales, "deshacer": bench_deshacer,
+          "formato": bench_formato, "historial": bench_historial, "reprecio": bench_reprecio, "edicion": bench_edicion, "rerun": bench_rerun,
+          "arranque": bench_arranque}
+
+
+# --- Comparación con la línea base ---
+def unir_mejor(resultados, parcial):
+    # Con --repetir, de cada medición se queda la vuelta más rápida: las fases
+    # lentas de una máquina compartida no entran al JSON
+    for nombre, r in parcial.items():
+        previo = resultados.get(nombre)
+        if previo is None or "min_ms" not in r or "min_ms" not in previo:
+            resultados.setdefault(nombre, r)
+        elif r["min_ms"] < previo["min_ms"]:
+            resultados[nombre] = r
+
+
+def comparar(resultados, base, umbral=UMBRAL):
+    # Se compara el mínimo (el tiempo menos afectado por ruido); las medidas de
+    # una sola repetición (p.ej. el primer run) solo se informan
+    filas, regresiones = [], []
+    for nombre, r in resultados.items():
+        b = base.get(nombre)
+        if "mediana_ms" not in r or not b or "mediana_ms" not in b:
+            continue
+        actual, previo = r.get("min_ms", r["mediana_ms"]), b.get("min_ms", b["mediana_ms"])
+        razon = actual / previo if previo else float("inf")
+        estado = ""
+        if r["rep"] > 1 and b["rep"] > 1:
+            estado = "REGRESIÓN" if razon > 1 + umbral else ("mejora" if razon < 1 / (1 + umbral) else "")
+        filas.append((nombre, previo, actual, razon, estado))
+        if estado == "REGRESIÓN":
+            regresiones.append(nombre)
+    return filas, regresiones
+
+
+def correr(grupos, resultados, repetir):
+    for vuelta in range(repetir):
+        for g in grupos:
+            t = time.perf_counter()
+            parcial = {}
+            GRUPOS[g](parcial)
+            unir_mejor(resultados, parcial)
+            print(f"[{vuelta + 1}/{repetir} {g}] {time.perf_counter() - t:.1f} s", file=sys.stderr)
+
+
+def entorno() -> dict:
+    return {"python": platform.python_version(), "plataforma": platform.platform(),
+            "cpus": os.cpu_count(), "fecha": datetime.datetime.now().isoformat(timespec="seconds")}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("-o", "--salida", help="archivo JSON de resultados (por defecto, stdout)")
+    p.add_argument("--comparar", metavar="BASE", help="JSON de línea base con el que comparar")
+    p.add_argument("--umbral", type=float, default=UMBRAL, help="empeoramiento tolerado (1.0 = x2, 0.25 = +25%%)")
+    p.add_argument("--repetir", type=int, default=1, help="vueltas completas; se guarda la mejor de cada medición")
+    p.add_argument("--solo", help="grupos separados por coma: " + ",".join(GRUPOS))
+    a = p.parse_args()
+
+    grupos = a.solo.split(",") if a.solo else list(GRUPOS)
+    resultados = {}
+    correr(grupos, resultados, a.repetir)
+    if a.comparar:
+        with open(a.comparar, encoding="utf-8") as f:
+            linea_base = json.load(f)
+        base = linea_base["resultados"]
+        for _ in range(REINTENTOS):
+            _, regresiones = comparar(resultados, base, a.umbral)
+            sospechosos = [g for g in grupos if any(n.startswith(g + "/") for n in regresiones)]
+            if not sospechosos:
+                break
+            print(f"Posibles regresiones en {', '.join(sospechosos)}: se vuelven a medir", file=sys.stderr)
+            correr(sospechosos, resultados, 1)
+    salida = {"entorno": entorno(), "resultados": resultados}
+    texto = json.dumps(salida, indent=2, ensure_ascii=False)
+    if a.salida:
+        with open(a.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    if a.comparar:
+        filas, regresiones = comparar(resultados, base, a.umbral)
+        for nombre, b, r, razon, estado in filas:
+            print(f"{nombre:<42} {b:>11.3f} ms -> {r:>11.3f} ms  x{razon:5.2f}  {estado}", file=sys.stderr)
+        otro = {k: v for k, v in linea_base.get("entorno", {}).items()
+                if k != "fecha" and v != salida["entorno"].get(k)}
+        if otro:
+            # Los tiempos absolutos solo son comparables en la misma máquina
+            print(f"La línea base es de otro entorno ({', '.join(f'{k}={v}' for k, v in otro.items())}): "
+                  f"regenérela en esta máquina con --repetir 3 -o {a.comparar}", file=sys.stderr)
+        if regresiones:
+            print(f"{len(regresiones)} regresiones (> +{a.umbral:.0%}): {', '.join(regresiones)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
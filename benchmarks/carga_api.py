@@ -0,0 +1,142 @@
+"""Prueba de carga de la API de cotización (neozinc/api.py).
+
+Abre ``--conexiones`` conexiones keep-alive y envía pedidos durante
+``--segundos``, mezclando /cotizar, /catalogo y /pdf según ``--mezcla``.
+Informa p50/p99 por endpoint y pedidos por segundo totales.
+
+    python benchmarks/carga_api.py --lanzar                # arranca una instancia local
+    python benchmarks/carga_api.py --puerto 8600 --conexiones 64 --segundos 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from neozinc.datos import RECURSOS_INICIALES, ROLES_INICIALES  # noqa: E402
+
+
+def pedido_aleatorio(rng: random.Random, lineas=8):
+    return {
+        "cliente": f"Cliente {rng.randrange(1000)}",
+        "materiales": [{"Nombre": rng.choice(RECURSOS_INICIALES)["Nombre"], "Cantidad": rng.randint(1, 5)}
+                       for _ in range(lineas)],
+        "mano_obra": [{"Cargo": rng.choice(ROLES_INICIALES)["Cargo"], "Personas": 2, "Horas": 8}],
+        "gg": 50, "margen": rng.choice([20, 25, 30]),
+    }
+
+
+def armar(metodo, ruta, cuerpo=None) -> bytes:
+    datos = json.dumps(cuerpo).encode() if cuerpo is not None else b""
+    return (f"{metodo} {ruta} HTTP/1.1\r\nHost: local\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(datos)}\r\n\r\n").encode() + datos
+
+
+async def leer_respuesta(reader) -> int:
+    cabecera = await reader.readuntil(b"\r\n\r\n")
+    lineas = cabecera.decode("latin-1").split("\r\n")
+    estado = int(lineas[0].split(" ", 2)[1])
+    largo = next((int(l.split(":", 1)[1]) for l in lineas if l.lower().startswith("content-length:")), 0)
+    await reader.readexactly(largo)
+    return estado
+
+
+async def cliente(host, puerto, fin, mezcla, rng, tiempos, errores):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        while time.perf_counter() < fin:
+            endpoint = rng.choices(list(mezcla), weights=list(mezcla.values()))[0]
+            if endpoint == "catalogo":
+                msg = armar("GET", f"/catalogo?desde={rng.randrange(0, 20)}&limite=50")
+            else:
+                msg = armar("POST", f"/{endpoint}", pedido_aleatorio(rng))
+            t = time.perf_counter()
+            writer.write(msg)
+            await writer.drain()
+            estado = await leer_respuesta(reader)
+            tiempos[endpoint].append(time.perf_counter() - t)
+            if estado != 200:
+                errores[endpoint] = errores.get(endpoint, 0) + 1
+    finally:
+        writer.close()
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))] if ordenados else float("nan")
+
+
+async def correr(host, puerto, conexiones, segundos, mezcla, semilla=0):
+    tiempos = {e: [] for e in mezcla}
+    errores = {}
+    inicio = time.perf_counter()
+    fin = inicio + segundos
+    await asyncio.gather(*(cliente(host, puerto, fin, mezcla, random.Random(semilla + i), tiempos, errores)
+                           for i in range(conexiones)))
+    duracion = time.perf_counter() - inicio
+    total = sum(len(v) for v in tiempos.values())
+    resultado = {"conexiones": conexiones, "segundos": round(duracion, 2), "pedidos": total,
+                 "rps": round(total / duracion, 1), "errores": errores, "endpoints": {}}
+    for e, v in tiempos.items():
+        resultado["endpoints"][e] = {"pedidos": len(v), "p50_ms": round(percentil(v, 50) * 1000, 2),
+                                     "p99_ms": round(percentil(v, 99) * 1000, 2)}
+    return resultado
+
+
+async def esperar_puerto(host, puerto, limite=30.0):
+    fin = time.perf_counter() + limite
+    while True:
+        try:
+            _, w = await asyncio.open_connection(host, puerto)
+            w.close()
+            return
+        except OSError:
+            if time.perf_counter() > fin:
+                raise
+            await asyncio.sleep(0.2)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--puerto", type=int, default=8600)
+    p.add_argument("--conexiones", type=int, default=32)
+    p.add_argument("--segundos", type=float, default=10)
+    p.add_argument("--mezcla", default="cotizar=80,catalogo=18,pdf=2",
+                   help="pesos por endpoint, p.ej. cotizar=80,catalogo=18,pdf=2")
+    p.add_argument("--lanzar", action="store_true", help="arrancar python -m neozinc.api durante la prueba")
+    p.add_argument("--json", action="store_true", help="imprimir el resultado como JSON")
+    a = p.parse_args()
+    mezcla = {k: float(v) for k, v in (par.split("=") for par in a.mezcla.split(","))}
+
+    servidor = None
+    if a.lanzar:
+        servidor = subprocess.Popen([sys.executable, "-m", "neozinc.api", "--host", a.host, "--puerto", str(a.puerto)],
+                                    cwd=RAIZ, stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(esperar_puerto(a.host, a.puerto))
+        resultado = asyncio.run(correr(a.host, a.puerto, a.conexiones, a.segundos, mezcla))
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+
+    if a.json:
+        print(json.dumps(resultado, indent=2))
+        return
+    print(f"{resultado['pedidos']} pedidos en {resultado['segundos']} s con {a.conexiones} conexiones: "
+          f"{resultado['rps']} pedidos/s")
+    for e, r in resultado["endpoints"].items():
+        print(f"  {e:<9} {r['pedidos']:>7} pedidos   p50 {r['p50_ms']:>8.2f} ms   p99 {r['p99_ms']:>8.2f} ms")
+    if resultado["errores"]:
+        print(f"  errores: {resultado['errores']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Núcleo de Neozinc Systems (lógica reutilizable fuera de la UI de Streamlit).
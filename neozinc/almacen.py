@@ -0,0 +1,285 @@
+import datetime
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from neozinc.datos import RECURSOS_INICIALES, ROLES_INICIALES
+from neozinc.precios import cotizar_lote, indice_tipo
+
+# ------------------------------------------------------
+# ALMACENAMIENTO PERSISTENTE (SQLITE)
+# ------------------------------------------------------
+# Catálogo, tarifas y cotizaciones guardadas en un archivo SQLite local (ruta en
+# NEOZINC_DB). Modo WAL para que varias sesiones lean mientras otra escribe; una
+# conexión por hilo porque sqlite3 no comparte conexiones entre hilos.
+# La clave primaria de `recursos` es el id estable de la fila en el catálogo en
+# memoria (neozinc/catalogo.py): las ediciones se escriben por id.
+
+RUTA_DB = os.environ.get("NEOZINC_DB", "neozinc.db")
+
+COLUMNAS_RECURSOS = {"Nombre": "nombre", "Tipo": "tipo", "Categoría": "categoria",
+                     "Unidad": "unidad", "Costo Unitario": "costo"}
+COLUMNAS_ROLES = {"Cargo": "cargo", "Costo Hora": "costo_hora"}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS recursos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT, tipo TEXT, categoria TEXT, unidad TEXT, costo REAL
+);
+CREATE INDEX IF NOT EXISTS ix_recursos_cat_tipo ON recursos (categoria, tipo);
+CREATE INDEX IF NOT EXISTS ix_recursos_clave ON recursos (nombre, categoria, tipo);
+
+CREATE TABLE IF NOT EXISTS roles (
+    id INTEGER PRIMARY KEY,
+    cargo TEXT, costo_hora REAL
+);
+
+CREATE TABLE IF NOT EXISTS cotizaciones (
+    id INTEGER PRIMARY KEY,
+    cliente TEXT, contacto TEXT, fecha TEXT, area TEXT, servicio TEXT,
+    gg REAL, margen REAL, total REAL, creado TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_cotizaciones_cliente ON cotizaciones (cliente);
+
+CREATE TABLE IF NOT EXISTS cotizacion_materiales (
+    cotizacion_id INTEGER REFERENCES cotizaciones (id) ON DELETE CASCADE,
+    orden INTEGER, nombre TEXT, tipo TEXT, unidad TEXT,
+    precio REAL, cantidad REAL, subtotal REAL,
+    recurso_id INTEGER  -- fila de `recursos` de la que salió la línea
+);
+CREATE INDEX IF NOT EXISTS ix_cot_mat_cotizacion ON cotizacion_materiales (cotizacion_id);
+
+CREATE TABLE IF NOT EXISTS cotizacion_mano_obra (
+    cotizacion_id INTEGER REFERENCES cotizaciones (id) ON DELETE CASCADE,
+    orden INTEGER, cargo TEXT, personas REAL, horas REAL, subtotal REAL
+);
+CREATE INDEX IF NOT EXISTS ix_cot_mo_cotizacion ON cotizacion_mano_obra (cotizacion_id);
+"""
+
+
+class Almacen:
+    def __init__(self, ruta=RUTA_DB):
+        self.ruta = ruta
+        self._local = threading.local()
+        with self.conexion() as con:
+            con.executescript(ESQUEMA)
+        self._migrar()
+        self._sembrar()
+
+    def conexion(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=30)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA foreign_keys=ON")
+            self._local.con = con
+        return con
+
+    def _migrar(self):
+        # Bases anteriores a recurso_id: se agrega la columna y se completa en las
+        # líneas cuyo nombre corresponde a una sola fila del catálogo (el resto
+        # queda en NULL y no se reprecia)
+        con = self.conexion()
+        with con:
+            columnas = {f["name"] for f in con.execute("PRAGMA table_info(cotizacion_materiales)")}
+            if "recurso_id" not in columnas:
+                con.execute("ALTER TABLE cotizacion_materiales ADD COLUMN recurso_id INTEGER")
+                con.execute(
+                    "UPDATE cotizacion_materiales SET recurso_id = (SELECT MIN(r.id) FROM recursos r "
+                    "WHERE r.nombre = cotizacion_materiales.nombre) WHERE (SELECT COUNT(*) FROM recursos r "
+                    "WHERE r.nombre = cotizacion_materiales.nombre) = 1")
+            con.execute("CREATE INDEX IF NOT EXISTS ix_cot_mat_recurso ON cotizacion_materiales (recurso_id)")
+
+    def _sembrar(self):
+        con = self.conexion()
+        with con:
+            if con.execute("SELECT COUNT(*) FROM recursos").fetchone()[0] == 0:
+                self._insertar_recursos(con, RECURSOS_INICIALES)
+            if con.execute("SELECT COUNT(*) FROM roles").fetchone()[0] == 0:
+                con.executemany("INSERT INTO roles (cargo, costo_hora) VALUES (?, ?)",
+                                [(r["Cargo"], r["Costo Hora"]) for r in ROLES_INICIALES])
+
+    # --- Catálogo ---
+    @staticmethod
+    def _insertar_recursos(con, filas):
+        # Filas sin "id" reciben uno nuevo de SQLite
+        con.executemany(
+            "INSERT INTO recursos (id, nombre, tipo, categoria, unidad, costo) VALUES (?, ?, ?, ?, ?, ?)",
+            ((_valor(r.get("id")), _valor(r.get("Nombre")), _valor(r.get("Tipo")), _valor(r.get("Categoría")),
+              _valor(r.get("Unidad")), _valor(r.get("Costo Unitario"))) for r in filas),
+        )
+
+    def cargar_recursos(self) -> pd.DataFrame:
+        # Indexado por id: el catálogo en memoria usa el índice como id de fila
+        df = pd.read_sql_query(
+            "SELECT id, nombre, tipo, categoria, unidad, costo FROM recursos ORDER BY id", self.conexion(),
+            index_col="id")
+        df.index.name = None
+        return df.rename(columns={v: k for k, v in COLUMNAS_RECURSOS.items()})
+
+    def reemplazar_recursos(self, df: pd.DataFrame, ids=None):
+        filas = df.to_dict("records")
+        if ids is not None:
+            for r, id_fila in zip(filas, ids.tolist()):
+                r["id"] = id_fila
+        con = self.conexion()
+        with con:
+            con.execute("DELETE FROM recursos")
+            self._insertar_recursos(con, filas)
+
+    def persistir_recursos(self, catalogo, cambios):
+        # Suscriptor de CatalogoStore: escribe solo las filas que cambiaron
+        if cambios.reemplazo:
+            if catalogo.version > 1:
+                self.reemplazar_recursos(catalogo.df, catalogo.ids)
+            return
+        con = self.conexion()
+        with con:
+            con.executemany("DELETE FROM recursos WHERE id = ?", [(f["id"],) for f in cambios.eliminados])
+            con.executemany(
+                "UPDATE recursos SET nombre = ?, tipo = ?, categoria = ?, unidad = ?, costo = ? WHERE id = ?",
+                [(_valor(d.get("Nombre")), _valor(d.get("Tipo")), _valor(d.get("Categoría")),
+                  _valor(d.get("Unidad")), _valor(d.get("Costo Unitario")), d["id"])
+                 for a, d in cambios.modificados],
+            )
+            self._insertar_recursos(con, cambios.agregados)
+
+    def cargar_roles(self) -> pd.DataFrame:
+        df = pd.read_sql_query("SELECT cargo, costo_hora FROM roles ORDER BY id", self.conexion())
+        return df.rename(columns={v: k for k, v in COLUMNAS_ROLES.items()})
+
+    def persistir_roles(self, catalogo, cambios):
+        if cambios.reemplazo and catalogo.version == 1:
+            return
+        # La tabla de tarifas es pequeña: se reescribe completa
+        con = self.conexion()
+        with con:
+            con.execute("DELETE FROM roles")
+            con.executemany("INSERT INTO roles (cargo, costo_hora) VALUES (?, ?)",
+                            [(_valor(r.get("Cargo")), _valor(r.get("Costo Hora")))
+                             for r in catalogo.df.to_dict("records")])
+
+    # --- Cotizaciones ---
+    def guardar_cotizacion(self, cliente, contacto, fecha, area, servicio, materiales, mano_obra,
+                           gg, margen, total) -> int:
+        con = self.conexion()
+        with con:
+            cur = con.execute(
+                "INSERT INTO cotizaciones (cliente, contacto, fecha, area, servicio, gg, margen, total, creado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cliente, contacto, str(fecha), area, servicio, gg, margen, total,
+                 datetime.datetime.now().isoformat(timespec="seconds")),
+            )
+            cid = cur.lastrowid
+            con.executemany(
+                "INSERT INTO cotizacion_materiales "
+                "(cotizacion_id, orden, nombre, tipo, unidad, precio, cantidad, subtotal, recurso_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((cid, i, m['Nombre'], m['Tipo'], m['Unidad'], m['Precio Unit.'], m['Cantidad'], m['Subtotal'],
+                  m.get('id')) for i, m in enumerate(materiales)),
+            )
+            con.executemany(
+                "INSERT INTO cotizacion_mano_obra (cotizacion_id, orden, cargo, personas, horas, subtotal) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((cid, i, mo['Cargo'], mo['Personas'], mo['Horas'], mo['Subtotal'])
+                 for i, mo in enumerate(mano_obra)),
+            )
+        return cid
+
+    def cargar_cotizacion(self, cid) -> Optional[Dict]:
+        con = self.conexion()
+        cab = con.execute("SELECT * FROM cotizaciones WHERE id = ?", (cid,)).fetchone()
+        if cab is None:
+            return None
+        materiales = [
+            {"Nombre": f["nombre"], "Tipo": f["tipo"], "Unidad": f["unidad"], "Precio Unit.": f["precio"],
+             "Cantidad": f["cantidad"], "Subtotal": f["subtotal"], "id": f["recurso_id"]}
+            for f in con.execute("SELECT * FROM cotizacion_materiales WHERE cotizacion_id = ? ORDER BY orden", (cid,))
+        ]
+        mano_obra = [
+            {"Cargo": f["cargo"], "Personas": f["personas"], "Horas": f["horas"], "Subtotal": f["subtotal"]}
+            for f in con.execute("SELECT * FROM cotizacion_mano_obra WHERE cotizacion_id = ? ORDER BY orden", (cid,))
+        ]
+        return {**dict(cab), "materiales": materiales, "mano_obra": mano_obra}
+
+    def repreciar_cotizaciones(self, precios: Dict[int, Tuple[str, float, str]]) -> List[Dict]:
+        """Lleva las cotizaciones guardadas a los precios nuevos (id de fila -> (Nombre, Costo Unitario, Tipo)).
+
+        ix_cot_mat_recurso hace de índice invertido fila del catálogo ->
+        cotizaciones: solo se leen y recalculan las cotizaciones que usan alguna
+        fila cuyo precio o tipo cambió (y con el mismo nombre: un id puede volver
+        a usarse tras borrar la fila). Devuelve las que cambiaron de total, con
+        el total anterior y el nuevo.
+        """
+        if not precios:
+            return []
+        con = self.conexion()
+        with con:
+            con.execute("CREATE TEMP TABLE IF NOT EXISTS precios_nuevos "
+                        "(id INTEGER PRIMARY KEY, nombre TEXT, precio REAL, tipo TEXT)")
+            con.execute("CREATE TEMP TABLE IF NOT EXISTS afectadas (id INTEGER PRIMARY KEY)")
+            con.execute("DELETE FROM precios_nuevos")
+            con.execute("DELETE FROM afectadas")
+            con.executemany("INSERT OR REPLACE INTO precios_nuevos VALUES (?, ?, ?, ?)",
+                            ((_valor(i), _valor(n), _valor(p), _valor(t)) for i, (n, p, t) in precios.items()))
+            con.execute(
+                "INSERT OR IGNORE INTO afectadas SELECT m.cotizacion_id FROM precios_nuevos p "
+                "JOIN cotizacion_materiales m ON m.recurso_id = p.id AND m.nombre = p.nombre "
+                "WHERE m.precio IS NOT p.precio OR m.tipo IS NOT p.tipo")
+            con.execute(
+                "UPDATE cotizacion_materiales SET precio = p.precio, tipo = p.tipo, subtotal = p.precio * cantidad "
+                "FROM precios_nuevos p WHERE cotizacion_materiales.recurso_id = p.id "
+                "AND cotizacion_materiales.nombre = p.nombre "
+                "AND (cotizacion_materiales.precio IS NOT p.precio OR cotizacion_materiales.tipo IS NOT p.tipo)")
+            cab = con.execute("SELECT c.id, c.cliente, c.fecha, c.gg, c.margen, c.total FROM afectadas a "
+                              "JOIN cotizaciones c ON c.id = a.id ORDER BY c.id").fetchall()
+            if not cab:
+                return []
+            pos = {f["id"]: i for i, f in enumerate(cab)}
+            # Subtotales por (cotización, Tipo) como "líneas" de cotizar_lote
+            por_tipo = con.execute("SELECT m.cotizacion_id, m.tipo, SUM(m.subtotal) FROM afectadas a "
+                                   "JOIN cotizacion_materiales m ON m.cotizacion_id = a.id GROUP BY 1, 2").fetchall()
+            t_mo = np.zeros(len(cab))
+            for cid, subtotal in con.execute("SELECT mo.cotizacion_id, SUM(mo.subtotal) FROM afectadas a "
+                                             "JOIN cotizacion_mano_obra mo ON mo.cotizacion_id = a.id GROUP BY 1"):
+                t_mo[pos[cid]] = subtotal or 0.0
+            nuevos = cotizar_lote([pos[f[0]] for f in por_tipo], [f[2] or 0.0 for f in por_tipo], np.ones(len(por_tipo)),
+                                  [indice_tipo(f[1]) for f in por_tipo], t_mo,
+                                  [f["gg"] for f in cab], [f["margen"] for f in cab], n_canastas=len(cab)).precio_final
+            con.executemany("UPDATE cotizaciones SET total = ? WHERE id = ?",
+                            ((float(t), f["id"]) for t, f in zip(nuevos, cab)))
+        return [{"id": f["id"], "cliente": f["cliente"], "fecha": f["fecha"], "total_anterior": f["total"],
+                 "total_nuevo": float(t), "diferencia": float(t) - (f["total"] or 0.0)}
+                for t, f in zip(nuevos, cab) if abs(float(t) - (f["total"] or 0.0)) > 0.005]
+
+    def listar_cotizaciones(self, limite=50) -> List[Dict]:
+        filas = self.conexion().execute(
+            "SELECT id, cliente, fecha, area, servicio, total, creado FROM cotizaciones ORDER BY id DESC LIMIT ?",
+            (limite,),
+        ).fetchall()
+        return [dict(f) for f in filas]
+
+
+def _valor(v):
+    # NaN/None de pandas -> NULL; numpy -> tipos nativos de Python
+    if v is None or (isinstance(v, float) and v != v):
+        return None
+    return v.item() if hasattr(v, "item") else v
+
+
+_ALMACEN = None
+_ALMACEN_LOCK = threading.Lock()
+
+
+def almacen() -> Almacen:
+    global _ALMACEN
+    with _ALMACEN_LOCK:
+        if _ALMACEN is None:
+            _ALMACEN = Almacen()
+        return _ALMACEN
@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import datetime
+import json
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from neozinc.canasta import armar_canasta
+from neozinc.catalogo import store_recursos, store_roles
+from neozinc.indice import indice_catalogo, posiciones_catalogo
+from neozinc.pdf import CACHE_PDF, clave_cotizacion, generar_pdf_bytes
+
+# ------------------------------------------------------
+# API HTTP DE COTIZACIÓN (ASYNCIO, SIN DEPENDENCIAS)
+# ------------------------------------------------------
+# Servidor HTTP/1.1 mínimo sobre asyncio.start_server, con keep-alive. Usa el
+# mismo catálogo compartido (neozinc/catalogo.py) y las mismas reglas de precio
+# que la UI. Cotizar y paginar el catálogo cuesta microsegundos y corre en el
+# loop; los PDFs se generan en un pool de procesos (el loop nunca se bloquea) y
+# se guardan en CACHE_PDF.
+#
+#   python -m neozinc.api --puerto 8600 --procesos 2
+#
+#   GET  /salud
+#   GET  /catalogo?categoria=ACI&tipo=Equipo&desde=0&limite=100
+#   POST /cotizar   {"materiales": [{"Nombre", "Cantidad"}], "mano_obra": [{"Cargo", "Personas", "Horas"}],
+#                    "gg": 50, "margen": 30}
+#   POST /pdf       mismo cuerpo más "cliente", "area", "servicio" y "fecha" opcionales
+
+MAX_CUERPO = 1 << 20
+MAX_LIMITE = 1000
+GG_DEFECTO, MARGEN_DEFECTO = 50.0, 30
+
+
+class ErrorAPI(Exception):
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class Respuesta(NamedTuple):
+    estado: int
+    cuerpo: bytes
+    tipo: str = "application/json"
+
+
+def _json(datos, estado=200) -> Respuesta:
+    return Respuesta(estado, json.dumps(datos, ensure_ascii=False).encode("utf-8"))
+
+
+def _entero(query, nombre, defecto):
+    try:
+        return int(query.get(nombre, [defecto])[0])
+    except ValueError:
+        raise ErrorAPI(400, f"'{nombre}' debe ser un entero.")
+
+
+def _roles_por_cargo(catalogo):
+    return catalogo.derivar("por_cargo", lambda df: {r["Cargo"]: r for r in df.to_dict("records")})
+
+
+def _canasta_pedido(pedido: Dict):
+    if not isinstance(pedido, dict):
+        raise ErrorAPI(400, "El cuerpo debe ser un objeto JSON.")
+    recursos = indice_catalogo(store_recursos().actual).por_nombre
+    try:
+        canasta, faltan = armar_canasta(pedido.get("materiales"), pedido.get("mano_obra"),
+                                        recursos, _roles_por_cargo(store_roles().actual))
+        gg = float(pedido.get("gg", GG_DEFECTO))
+        margen = float(pedido.get("margen", MARGEN_DEFECTO))
+    except (AttributeError, TypeError, ValueError):
+        raise ErrorAPI(400, "Formato de canasta inválido.")
+    if faltan:
+        raise ErrorAPI(422, "No está en el catálogo: " + "; ".join(faltan))
+    return canasta, gg, margen
+
+
+class ServidorAPI:
+    def __init__(self, procesos: Optional[int] = None):
+        self.procesos = procesos or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._rutas = {
+            ("GET", "/salud"): self.salud,
+            ("GET", "/catalogo"): self.catalogo,
+            ("POST", "/cotizar"): self.cotizar,
+            ("POST", "/pdf"): self.pdf,
+        }
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: un fork heredaría el socket de escucha y lo mantendría abierto
+            self._pool = ProcessPoolExecutor(self.procesos, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    # --- Endpoints ---
+    async def salud(self, query, cuerpo):
+        return _json({"ok": True, "version_catalogo": store_recursos().version})
+
+    async def catalogo(self, query, cuerpo):
+        cat = store_recursos().actual
+        categoria = query.get("categoria", [None])[0]
+        tipo = query.get("tipo", [None])[0]
+        desde = max(0, _entero(query, "desde", 0))
+        limite = min(MAX_LIMITE, max(1, _entero(query, "limite", 100)))
+        if (categoria, tipo) == (None, None) or any(
+                categoria in (None, c) and tipo in (None, t) for c, t in indice_catalogo(cat).grupos):
+            posiciones = posiciones_catalogo(cat, categoria, tipo)
+        else:
+            posiciones = []  # categoría/tipo inexistente: no se memoriza (la clave la elige el cliente)
+        pagina = cat.df.iloc[posiciones[desde:desde + limite]]
+        items = pagina.astype(object).where(pagina.notna(), None).to_dict("records")
+        return _json({"version": cat.version, "total": len(posiciones), "desde": desde, "items": items})
+
+    async def cotizar(self, query, cuerpo):
+        canasta, gg, margen = _canasta_pedido(cuerpo)
+        return _json({**canasta.totales(gg, margen)._asdict(), "margen": margen,
+                      "lineas": len(canasta.lineas) + len(canasta.lineas_mo)})
+
+    async def pdf(self, query, cuerpo):
+        canasta, gg, margen = _canasta_pedido(cuerpo)
+        datos = (str(cuerpo.get("cliente", "Cliente")), str(cuerpo.get("fecha", datetime.date.today())),
+                 str(cuerpo.get("area", "Integral")), str(cuerpo.get("servicio", "Correctivo")),
+                 canasta.materiales, canasta.mano_obra, gg, margen, canasta.totales(gg, margen).precio_final)
+        clave = clave_cotizacion(*datos)
+        pdf = CACHE_PDF.obtener(clave)
+        if pdf is None:
+            pdf = await asyncio.get_running_loop().run_in_executor(self.pool, generar_pdf_bytes, *datos)
+            CACHE_PDF.guardar(clave, pdf)
+        return Respuesta(200, pdf, "application/pdf")
+
+    # --- HTTP ---
+    async def despachar(self, metodo, objetivo, cuerpo: bytes) -> Respuesta:
+        url = urlsplit(objetivo)
+        manejador = self._rutas.get((metodo, url.path))
+        if manejador is None:
+            if any(ruta == url.path for _, ruta in self._rutas):
+                raise ErrorAPI(405, "Método no permitido.")
+            raise ErrorAPI(404, "Ruta no encontrada.")
+        datos = None
+        if metodo == "POST":
+            try:
+                datos = json.loads(cuerpo or b"{}")
+            except ValueError:
+                raise ErrorAPI(400, "JSON inválido.")
+        return await manejador(parse_qs(url.query), datos)
+
+    async def manejar(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    cabecera = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lineas = cabecera.decode("latin-1").split("\r\n")
+                try:
+                    metodo, objetivo, version = lineas[0].split(" ", 2)
+                except ValueError:
+                    break
+                cabeceras = {k.strip().lower(): v.strip()
+                             for k, v in (l.split(":", 1) for l in lineas[1:] if ":" in l)}
+                seguir = version == "HTTP/1.1" and cabeceras.get("connection", "").lower() != "close"
+                try:
+                    try:
+                        largo = int(cabeceras.get("content-length") or 0)
+                    except ValueError:
+                        largo = -1
+                    if largo < 0:
+                        seguir = False  # sin largo válido no se sabe dónde empieza el próximo pedido
+                        raise ErrorAPI(400, "Content-Length inválido.")
+                    if largo > MAX_CUERPO:
+                        seguir = False
+                        raise ErrorAPI(413, "Cuerpo demasiado grande.")
+                    cuerpo = await reader.readexactly(largo) if largo else b""
+                    respuesta = await self.despachar(metodo, objetivo, cuerpo)
+                except ErrorAPI as e:
+                    respuesta = _json({"error": str(e)}, e.estado)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:  # un pedido roto no debe tumbar la conexión del resto
+                    respuesta = _json({"error": f"Error interno: {e}"}, 500)
+                writer.write(
+                    f"HTTP/1.1 {respuesta.estado} {HTTPStatus(respuesta.estado).phrase}\r\n"
+                    f"Content-Type: {respuesta.tipo}\r\nContent-Length: {len(respuesta.cuerpo)}\r\n"
+                    f"Connection: {'keep-alive' if seguir else 'close'}\r\n\r\n".encode("latin-1")
+                    + respuesta.cuerpo
+                )
+                await writer.drain()
+                if not seguir:
+                    break
+        finally:
+            writer.close()
+
+
+async def servir(host="127.0.0.1", puerto=8600, procesos=None):
+    api = ServidorAPI(procesos)
+    # Catálogo e índices listos antes de aceptar conexiones
+    indice_catalogo(store_recursos().actual)
+    store_roles()
+    # Procesos de PDF arrancados (e importado fpdf) antes del primer pedido
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(api.pool, generar_pdf_bytes, "", "", "", "", [], [], 0, 0, 0)
+                           for _ in range(api.procesos)))
+    servidor = await asyncio.start_server(api.manejar, host, puerto)
+    print(f"API de cotización en http://{host}:{puerto}", flush=True)
+    tarea = asyncio.current_task()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, tarea.cancel)
+        except NotImplementedError:  # Windows
+            pass
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        api.cerrar()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m neozinc.api", description="API HTTP de cotización.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--puerto", type=int, default=8600)
+    p.add_argument("--procesos", type=int, help="procesos para generar PDFs (por defecto, núcleos)")
+    a = p.parse_args(argv)
+    asyncio.run(servir(a.host, a.puerto, a.procesos))
+
+
+if __name__ == "__main__":
+    main()
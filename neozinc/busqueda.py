@@ -0,0 +1,153 @@
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+from neozinc.catalogo import store_recursos
+
+# ------------------------------------------------------
+# BÚSQUEDA INCREMENTAL DE RECURSOS (TOKENS + TRIGRAMAS)
+# ------------------------------------------------------
+# Índice en memoria sobre "Nombre", insensible a tildes y mayúsculas
+# ("manometro" encuentra "Manómetro 300PSI"). Cada palabra de la consulta debe
+# aparecer como subcadena del nombre: las de 3+ letras se resuelven por
+# intersección de trigramas, las más cortas por prefijo sobre el vocabulario
+# ordenado. El índice se actualiza fila a fila con los cambios del catálogo.
+# Un documento por fila (id estable del catálogo): dos ítems con el mismo
+# nombre en categorías distintas son dos documentos, y buscar() devuelve ids.
+
+_PALABRA = re.compile(r"[a-z0-9]+")
+
+
+def normalizar(texto) -> str:
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def _trigramas(palabra: str) -> Set[str]:
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+class IndiceBusqueda:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs: Dict[int, Tuple[str, object, object]] = {}  # id -> (nombre normalizado, Categoría, Tipo)
+        self._trigramas: Dict[str, Set[int]] = {}
+        self._tokens: Dict[str, Set[int]] = {}
+        self._vocabulario: List[str] = []  # tokens ordenados, para prefijos
+
+    def __len__(self):
+        return len(self._docs)
+
+    def agregar(self, id_fila, nombre, categoria=None, tipo=None):
+        with self._lock:
+            self._quitar(id_fila)
+            if not isinstance(nombre, str) or not nombre:
+                return
+            norm = normalizar(nombre)
+            self._docs[id_fila] = (norm, categoria, tipo)
+            for tok in set(_PALABRA.findall(norm)):
+                if tok not in self._tokens:
+                    self._tokens[tok] = set()
+                    bisect.insort(self._vocabulario, tok)
+                self._tokens[tok].add(id_fila)
+                for tri in _trigramas(tok):
+                    self._trigramas.setdefault(tri, set()).add(id_fila)
+
+    def eliminar(self, id_fila):
+        with self._lock:
+            self._quitar(id_fila)
+
+    def _quitar(self, id_fila):
+        doc = self._docs.pop(id_fila, None)
+        if doc is None:
+            return
+        for tok in set(_PALABRA.findall(doc[0])):
+            docs = self._tokens.get(tok)
+            if docs is not None:
+                docs.discard(id_fila)
+                if not docs:
+                    del self._tokens[tok]
+                    del self._vocabulario[bisect.bisect_left(self._vocabulario, tok)]
+            for tri in _trigramas(tok):
+                docs = self._trigramas.get(tri)
+                if docs is not None:
+                    docs.discard(id_fila)
+                    if not docs:
+                        del self._trigramas[tri]
+
+    def _candidatos(self, palabra: str) -> Set[int]:
+        if len(palabra) >= 3:
+            listas = sorted((self._trigramas.get(t, set()) for t in _trigramas(palabra)), key=len)
+            if not listas[0]:
+                return set()
+            return set(listas[0]).intersection(*listas[1:])
+        # Palabras cortas: unión de los tokens que empiezan por ella
+        i = bisect.bisect_left(self._vocabulario, palabra)
+        encontrados = set()
+        while i < len(self._vocabulario) and self._vocabulario[i].startswith(palabra):
+            encontrados |= self._tokens[self._vocabulario[i]]
+            i += 1
+        return encontrados
+
+    def buscar(self, consulta, limite=20, categoria=None, tipo=None) -> List[int]:
+        # Ids de las filas que coinciden, las mejores primero
+        palabras = _PALABRA.findall(normalizar(consulta))
+        if not palabras:
+            return []
+        with self._lock:
+            candidatos: Optional[Set[int]] = None
+            for palabra in sorted(palabras, key=len, reverse=True):
+                encontrados = self._candidatos(palabra)
+                candidatos = encontrados if candidatos is None else candidatos & encontrados
+                if not candidatos:
+                    return []
+            resultados = []
+            for id_fila in candidatos:
+                norm, cat, tip = self._docs[id_fila]
+                if categoria is not None and cat != categoria:
+                    continue
+                if tipo is not None and tip != tipo:
+                    continue
+                pos = norm.find(palabras[0])
+                if pos < 0 or any(p not in norm for p in palabras[1:]):
+                    continue  # trigramas presentes pero no contiguos
+                resultados.append((pos, len(norm), norm, id_fila))
+        return [r[-1] for r in heapq.nsmallest(limite, resultados)]
+
+    def sincronizar(self, catalogo, cambios):
+        # Suscriptor de CatalogoStore: aplica solo las filas que cambiaron
+        if cambios.reemplazo:
+            self.reconstruir(catalogo.df, catalogo.ids)
+            return
+        if not (cambios.agregados or cambios.eliminados or cambios.columnas & {"Nombre", "Categoría", "Tipo"}):
+            return  # p.ej. solo precios: nada que indexar
+        for fila in cambios.eliminados:
+            self.eliminar(fila["id"])
+        for fila in [d for _, d in cambios.modificados] + cambios.agregados:
+            self.agregar(fila["id"], fila.get("Nombre"), fila.get("Categoría"), fila.get("Tipo"))
+
+    def reconstruir(self, df, ids=None):
+        with self._lock:
+            self._docs.clear()
+            self._trigramas.clear()
+            self._tokens.clear()
+            self._vocabulario.clear()
+        ids = range(len(df)) if ids is None else ids.tolist()
+        for id_fila, nombre, cat, tipo in zip(ids, df["Nombre"].tolist(), df["Categoría"].tolist(), df["Tipo"].tolist()):
+            self.agregar(id_fila, nombre, cat, tipo)
+
+
+_INDICE = None
+_INDICE_LOCK = threading.Lock()
+
+
+def indice_busqueda() -> IndiceBusqueda:
+    global _INDICE
+    with _INDICE_LOCK:
+        if _INDICE is None:
+            _INDICE = IndiceBusqueda()
+            store_recursos().suscribir(_INDICE.sincronizar)
+        return _INDICE
@@ -0,0 +1,244 @@
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from neozinc.precios import OTROS, Totales, indice_tipo, totales_desde_agregados
+
+# ------------------------------------------------------
+# CANASTA CON TOTALES ACUMULADOS
+# ------------------------------------------------------
+# Cada alta/baja actualiza en O(1) los subtotales por Tipo y por sección
+# (materiales / mano de obra), así el dashboard y la exportación leen los
+# agregados sin volver a recorrer las líneas en cada rerun.
+# Las líneas repetidas (misma fila del catálogo, Nombre, Unidad y Precio) se
+# fusionan en una sola sumando la cantidad. Las líneas no se modifican en sitio:
+# se reemplazan.
+# Cada línea es un registro con __slots__ que apunta al registro del catálogo
+# (compartido por todas las sesiones, con el id de su fila en "id") más la
+# cantidad; los dicts con formato de cotización ("Precio Unit.", "Subtotal"...)
+# solo se arman al mostrar o exportar.
+# Cuando el catálogo cambia, neozinc/reprecio.py marca en la canasta los ids de
+# fila afectados (marcar_reprecio, desde cualquier hilo) y la sesión dueña los
+# aplica con repreciar() en su próximo rerun.
+# Como las líneas son inmutables, deshacer/rehacer (neozinc/deshacer.py) guarda
+# referencias a ellas y restaurar() las vuelve a poner tal cual.
+
+class Linea:
+    __slots__ = ("recurso", "cantidad")
+
+    def __init__(self, recurso: Dict, cantidad):
+        self.recurso = recurso  # registro del catálogo: Nombre, Tipo, Unidad, Costo Unitario e id
+        self.cantidad = cantidad
+
+    @property
+    def tipo(self):
+        return self.recurso['Tipo']
+
+    @property
+    def precio(self):
+        return self.recurso['Costo Unitario']
+
+    @property
+    def subtotal(self):
+        return self.recurso['Costo Unitario'] * self.cantidad
+
+    @property
+    def clave(self):
+        r = self.recurso
+        return (r.get('id'), r['Nombre'], r['Unidad'], r['Costo Unitario'])
+
+    def como_dict(self) -> Dict:
+        r = self.recurso
+        return {"Nombre": r['Nombre'], "Tipo": r['Tipo'], "Unidad": r['Unidad'],
+                "Precio Unit.": r['Costo Unitario'], "Cantidad": self.cantidad,
+                "Subtotal": r['Costo Unitario'] * self.cantidad, "id": r.get('id')}
+
+
+class LineaMO:
+    __slots__ = ("cargo", "personas", "horas", "subtotal")
+
+    def __init__(self, cargo, personas, horas, subtotal):
+        self.cargo = cargo
+        self.personas = personas
+        self.horas = horas
+        self.subtotal = subtotal
+
+    def como_dict(self) -> Dict:
+        return {"Cargo": self.cargo, "Personas": self.personas, "Horas": self.horas, "Subtotal": self.subtotal}
+
+
+def recurso_de_item(item: Dict) -> Dict:
+    # Línea de cotización (p.ej. cargada de la base) -> registro equivalente del catálogo
+    return {"Nombre": item['Nombre'], "Tipo": item['Tipo'], "Unidad": item['Unidad'],
+            "Costo Unitario": item['Precio Unit.'], "id": item.get('id')}
+
+
+class Canasta:
+    def __init__(self):
+        self.lineas: List[Linea] = []
+        self.lineas_mo: List[LineaMO] = []
+        self.por_tipo = [0.0] * (OTROS + 1)
+        self.t_mat = 0.0
+        self.t_mo = 0.0
+        self.version = 0  # sube con cada cambio; sirve de clave para cachés derivadas
+        self._pos: Dict[tuple, int] = {}  # clave de línea -> posición en lineas
+        self.observador: Optional[Callable] = None  # observador(canasta, id de fila) al sumar un ítem nuevo
+        self._reprecio: Optional[Set[int]] = set()  # ids de fila a repreciar; None = todos
+        self._lock_reprecio = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.lineas or self.lineas_mo)
+
+    @property
+    def materiales(self) -> List[Dict]:
+        return [l.como_dict() for l in self.lineas]
+
+    @property
+    def mano_obra(self) -> List[Dict]:
+        return [l.como_dict() for l in self.lineas_mo]
+
+    def agregar_recurso(self, recurso: Dict, cantidad):
+        linea = Linea(recurso, cantidad)
+        idx = self._pos.get(linea.clave)
+        if idx is None:
+            self._pos[linea.clave] = len(self.lineas)
+            self.lineas.append(linea)
+            if self.observador is not None:
+                self.observador(self, recurso.get('id'))
+        else:
+            previa = self.lineas[idx]
+            self.lineas[idx] = Linea(previa.recurso, previa.cantidad + cantidad)
+        self._sumar_material(linea, 1)
+
+    def agregar_material(self, item: Dict):
+        self.agregar_recurso(recurso_de_item(item), item['Cantidad'])
+
+    def actualizar_cantidad(self, idx: int, cantidad):
+        linea = self.lineas[idx]
+        nueva = self.lineas[idx] = Linea(linea.recurso, cantidad)
+        self._sumar_material(linea, -1)
+        self._sumar_material(nueva, 1)
+
+    def eliminar_varios(self, indices, tipo: str = 'mat'):
+        quitar = set(indices)
+        if not quitar:
+            return
+        if tipo == 'mat':
+            quitados = [m for i, m in enumerate(self.lineas) if i in quitar]
+            self.lineas = [m for i, m in enumerate(self.lineas) if i not in quitar]
+            self._reindexar()
+            for linea in quitados:
+                self._sumar_material(linea, -1)
+        elif tipo == 'mo':
+            quitados = [m for i, m in enumerate(self.lineas_mo) if i in quitar]
+            self.lineas_mo = [m for i, m in enumerate(self.lineas_mo) if i not in quitar]
+            for linea in quitados:
+                self._sumar_mano_obra(linea, -1)
+
+    def agregar_mano_obra(self, item: Dict):
+        linea = LineaMO(item['Cargo'], item['Personas'], item['Horas'], item['Subtotal'])
+        self.lineas_mo.append(linea)
+        self._sumar_mano_obra(linea, 1)
+
+    def limpiar(self):
+        self.lineas = []
+        self.lineas_mo = []
+        self.por_tipo = [0.0] * (OTROS + 1)
+        self.t_mat = 0.0
+        self.t_mo = 0.0
+        self._pos = {}
+        self.version += 1
+
+    def restaurar(self, lineas, lineas_mo):
+        # Vuelve a un estado guardado reutilizando sus líneas (ya fusionadas)
+        self.limpiar()
+        for linea in lineas:
+            self._pos[linea.clave] = len(self.lineas)
+            self.lineas.append(linea)
+            self._sumar_material(linea, 1)
+            if self.observador is not None:
+                self.observador(self, linea.recurso.get('id'))
+        for linea in lineas_mo:
+            self.lineas_mo.append(linea)
+            self._sumar_mano_obra(linea, 1)
+        # Las líneas pueden ser de antes de un cambio de precio del catálogo
+        self.marcar_reprecio({l.recurso.get('id') for l in self.lineas})
+
+    def _reindexar(self):
+        self._pos = {l.clave: i for i, l in enumerate(self.lineas)}
+
+    def _sumar_material(self, linea: Linea, signo):
+        subtotal = linea.subtotal
+        self.por_tipo[indice_tipo(linea.tipo)] += signo * subtotal
+        self.t_mat += signo * subtotal
+        if not self.lineas:
+            # Sin líneas el total es exactamente cero (evita arrastrar error de redondeo)
+            self.por_tipo = [0.0] * (OTROS + 1)
+            self.t_mat = 0.0
+        self.version += 1
+
+    def _sumar_mano_obra(self, linea: LineaMO, signo):
+        self.t_mo += signo * linea.subtotal
+        if not self.lineas_mo:
+            self.t_mo = 0.0
+        self.version += 1
+
+    # --- Reprecio ---
+    def marcar_reprecio(self, ids: Optional[Set[int]]):
+        # Puede llamarse desde el hilo de otra sesión: solo toca el conjunto pendiente
+        with self._lock_reprecio:
+            if ids is None or self._reprecio is None:
+                self._reprecio = None
+            else:
+                self._reprecio = self._reprecio | ids
+
+    @property
+    def reprecio_pendiente(self) -> bool:
+        return self._reprecio is None or bool(self._reprecio)
+
+    def repreciar(self, por_id: Dict[int, Dict]) -> int:
+        """Apunta las líneas marcadas al registro vigente de su fila del catálogo; devuelve cuántas cambiaron.
+
+        Una fila renombrada cuenta como otro ítem: la línea conserva su precio.
+        """
+        with self._lock_reprecio:
+            ids, self._reprecio = self._reprecio, set()
+        nuevas, cambiadas = [], 0
+        for linea in self.lineas:
+            id_fila = linea.recurso.get('id')
+            r = por_id.get(id_fila) if ids is None or id_fila in ids else None
+            if r is not None and r is not linea.recurso and r['Nombre'] == linea.recurso['Nombre'] and \
+                    (r['Costo Unitario'], r['Tipo'], r['Unidad']) != (linea.precio, linea.tipo, linea.recurso['Unidad']):
+                linea = Linea(r, linea.cantidad)
+                cambiadas += 1
+            nuevas.append(linea)
+        if cambiadas:
+            # Se rearman los acumulados: dos líneas que ahora tienen el mismo precio se fusionan
+            self.lineas, self._pos = [], {}
+            self.por_tipo, self.t_mat = [0.0] * (OTROS + 1), 0.0
+            for linea in nuevas:
+                self.agregar_recurso(linea.recurso, linea.cantidad)
+        return cambiadas
+
+    def totales(self, gg, margen) -> Totales:
+        return totales_desde_agregados(self.por_tipo, self.t_mo, gg, margen)
+
+
+def armar_canasta(materiales, mano_obra, recursos: Dict[str, Dict], roles: Dict[str, Dict]) -> Tuple[Canasta, List[str]]:
+    # Canasta a partir de un pedido externo (CLI, API): materiales [{"Nombre", "Cantidad"}],
+    # mano de obra [{"Cargo", "Personas", "Horas"}]. Devuelve además lo que no se encontró.
+    canasta, faltan = Canasta(), []
+    for m in materiales or []:
+        r = recursos.get(m.get("Nombre"))
+        if r is None:
+            faltan.append(str(m.get("Nombre")))
+        else:
+            canasta.agregar_recurso(r, float(m.get("Cantidad", 1)))
+    for mo in mano_obra or []:
+        r = roles.get(mo.get("Cargo"))
+        if r is None:
+            faltan.append(str(mo.get("Cargo")))
+            continue
+        personas, horas = float(mo.get("Personas", 1)), float(mo.get("Horas", 0))
+        canasta.agregar_mano_obra({"Cargo": r["Cargo"], "Personas": personas, "Horas": horas,
+                                   "Subtotal": r["Costo Hora"] * personas * horas})
+    return canasta, faltan
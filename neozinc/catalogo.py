@@ -0,0 +1,251 @@
+import threading
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from neozinc.almacen import almacen
+
+# ------------------------------------------------------
+# CATÁLOGO COMPARTIDO Y VERSIONADO
+# ------------------------------------------------------
+# Un solo catálogo en memoria por proceso, compartido por todas las sesiones y
+# respaldado en SQLite (neozinc/almacen.py): se carga una vez y cada commit se
+# persiste de forma incremental, fila por fila según su id.
+# Cada versión es una instantánea inmutable: nadie modifica su DataFrame, las
+# ediciones crean una copia nueva con version + 1 (copy-on-write). Las vistas
+# derivadas (mapas de opciones, índices...) se memorizan en la instantánea, así
+# que se calculan una vez por versión y no una vez por sesión.
+# Las columnas de pocos valores distintos se guardan como category: un código
+# entero por fila en vez de un objeto str.
+#
+# Ediciones concurrentes (optimistas): cada fila tiene un id estable y una
+# revisión (la versión que la modificó por última vez). Una sesión edita sobre
+# la instantánea que tiene en pantalla y la pasa como `base`; si entre medio
+# otra sesión hizo commit, las posiciones se trasladan a la versión vigente por
+# id y solo hay conflicto si alguna de las filas tocadas cambió o se borró: en
+# ese caso no se aplica nada y se lanza ConflictoEdicion.
+# Un commit sin altas ni bajas no invalida todas las vistas derivadas: las que
+# declaran sus columnas (derivar(..., columnas=)) y no leen ninguna tocada pasan
+# tal cual a la versión nueva, y las que saben actualizarse (actualizar=) se
+# rehacen solo en las filas tocadas.
+
+CATEGORICAS = ("Tipo", "Categoría", "Unidad")
+
+
+def compactar(df: pd.DataFrame) -> pd.DataFrame:
+    tipos = {c: "category" for c in CATEGORICAS if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype)}
+    df = df.astype(tipos) if tipos else df
+    return df.reset_index(drop=True)
+
+
+def editable(df: pd.DataFrame) -> pd.DataFrame:
+    # Copia con columnas de texto normales para st.data_editor (con category solo
+    # dejaría elegir valores existentes)
+    return df.astype({c: object for c in CATEGORICAS if c in df.columns})
+
+
+class ConflictoEdicion(ValueError):
+    def __init__(self, filas: List[str]):
+        muestra = ", ".join(map(str, filas[:5])) + ("..." if len(filas) > 5 else "")
+        super().__init__(f"Otra sesión modificó o eliminó {len(filas)} fila(s) que editaste: {muestra}. "
+                         "Se muestran los datos vigentes; vuelve a aplicar tus cambios.")
+        self.filas = filas
+
+
+class Catalogo:
+    __slots__ = ("version", "df", "ids", "revisiones", "_vistas", "_dependencias", "_lock", "_pos_id")
+
+    def __init__(self, version: int, df: pd.DataFrame, ids=None, revisiones=None):
+        self.version = version
+        self.df = df
+        self.ids = np.arange(len(df), dtype=np.int64) if ids is None else ids  # id estable por fila
+        self.revisiones = np.full(len(df), version, dtype=np.int64) if revisiones is None else revisiones
+        self._vistas = {}
+        self._dependencias: Dict[object, Tuple[Optional[FrozenSet[str]], Optional[Callable]]] = {}
+        self._lock = threading.Lock()
+        self._pos_id: Optional[Dict[int, int]] = None
+
+    def derivar(self, clave, funcion, columnas: Optional[Iterable[str]] = None, actualizar=None):
+        # columnas: las que lee la vista (None = todas); actualizar(vista, df, posiciones)
+        # rehace la vista para una versión nueva que solo cambió esas filas
+        vista = self._vistas.get(clave)
+        if vista is None:
+            with self._lock:
+                vista = self._vistas.get(clave)
+                if vista is None:
+                    vista = self._vistas[clave] = funcion(self.df)
+                    self._dependencias[clave] = (None if columnas is None else frozenset(columnas), actualizar)
+        return vista
+
+    def heredar(self, previo: "Catalogo", columnas: FrozenSet[str], posiciones: List[int]):
+        # Vistas de `previo` válidas para esta versión (mismas filas, solo cambiaron `columnas`)
+        with previo._lock:
+            vistas = list(previo._vistas.items())
+        for clave, vista in vistas:
+            dependencias, actualizar = previo._dependencias.get(clave, (None, None))
+            if dependencias is not None and not dependencias & columnas:
+                self._vistas[clave] = vista
+            elif actualizar is not None:
+                self._vistas[clave] = actualizar(vista, self.df, posiciones)
+            else:
+                continue
+            self._dependencias[clave] = (dependencias, actualizar)
+
+    def posicion(self, id_fila) -> Optional[int]:
+        if self._pos_id is None:
+            self._pos_id = dict(zip(self.ids.tolist(), range(len(self.ids))))
+        return self._pos_id.get(int(id_fila))
+
+    def __len__(self):
+        return len(self.df)
+
+
+def _con_ids(df: pd.DataFrame, ids) -> List[dict]:
+    # Filas como dicts con su id estable en "id"
+    registros = df.to_dict("records")
+    for r, id_fila in zip(registros, ids.tolist()):
+        r["id"] = id_fila
+    return registros
+
+
+class Cambios(NamedTuple):
+    # Cambios de fila publicados a los suscriptores tras cada versión nueva; cada
+    # fila lleva su id estable en "id"
+    version: int
+    agregados: List[dict]
+    eliminados: List[dict]
+    modificados: List[Tuple[dict, dict]]  # (antes, después)
+    reemplazo: bool = False  # True si se cambió el catálogo completo
+    columnas: FrozenSet[str] = frozenset()  # columnas editadas en modificados
+
+
+class CatalogoStore:
+    def __init__(self, df: pd.DataFrame):
+        # El índice de df son los ids de fila (p.ej. la clave primaria en SQLite)
+        self._lock = threading.Lock()
+        ids = df.index.to_numpy(dtype=np.int64)
+        self._actual = Catalogo(1, compactar(df), ids)
+        self._siguiente_id = int(ids.max()) + 1 if len(ids) else 0
+        self._suscriptores = []
+
+    def suscribir(self, funcion):
+        # funcion(catalogo, cambios) se llama tras cada commit, en orden de versión y
+        # dentro del lock del store: no debe volver a escribir en el mismo store.
+        # Al suscribirse recibe la versión actual como reemplazo completo.
+        with self._lock:
+            actual = self._actual
+            funcion(actual, Cambios(actual.version, [], [], [], reemplazo=True))
+            self._suscriptores.append(funcion)
+
+    def _publicar(self, catalogo, cambios):
+        for funcion in list(self._suscriptores):
+            funcion(catalogo, cambios)
+
+    @property
+    def actual(self) -> Catalogo:
+        return self._actual
+
+    @property
+    def version(self) -> int:
+        return self._actual.version
+
+    def _rebasar(self, base: Catalogo, editados: Dict[int, dict], eliminados: List[int]):
+        # Posiciones de `base` -> posiciones de la versión vigente, por id de fila
+        actual, conflictos, destino = self._actual, [], {}
+        for p in set(editados).union(eliminados):
+            q = actual.posicion(base.ids[p])
+            if q is None or actual.revisiones[q] != base.revisiones[p]:
+                conflictos.append(base.df.iat[p, 0])
+            destino[p] = q
+        if conflictos:
+            raise ConflictoEdicion(conflictos)
+        return {destino[p]: c for p, c in editados.items()}, [destino[p] for p in eliminados]
+
+    def aplicar_edicion(self, editados=None, agregados=None, eliminados=None, base: Optional[Catalogo] = None) -> Catalogo:
+        # Mismo formato que el estado de st.data_editor: posiciones de fila de la
+        # instantánea `base` (por defecto, la vigente) para editados/eliminados,
+        # dicts para agregados.
+        if not (editados or agregados or eliminados):
+            return self._actual
+        with self._lock:
+            editados = {int(p): c for p, c in (editados or {}).items()}
+            eliminados = [int(p) for p in (eliminados or [])]
+            if base is not None and base is not self._actual:
+                editados, eliminados = self._rebasar(base, editados, eliminados)
+            previo = self._actual
+            original = previo.df
+            df = original.copy()
+            eliminados = sorted(set(eliminados))
+            # Una asignación por columna (no por celda): importaciones grandes tocan miles de filas
+            por_columna = {}
+            for pos, cambios in editados.items():
+                for col, valor in cambios.items():
+                    posiciones, valores = por_columna.setdefault(col, ([], []))
+                    posiciones.append(pos)
+                    valores.append(valor)
+            for col, (posiciones, valores) in por_columna.items():
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    faltan = {v for v in valores if isinstance(v, str)}.difference(df[col].cat.categories)
+                    if faltan:
+                        df[col] = df[col].cat.add_categories(sorted(faltan))
+                df.iloc[posiciones, df.columns.get_loc(col)] = valores
+            nuevos = pd.DataFrame(agregados or [], columns=df.columns)
+            quitar = set(eliminados)
+            tocados = [p for p in editados if p not in quitar]
+            modificados = list(zip(_con_ids(original.iloc[tocados], previo.ids[tocados]),
+                                   _con_ids(df.iloc[tocados], previo.ids[tocados])))
+            quitados = _con_ids(original.iloc[eliminados], previo.ids[eliminados])
+            version = previo.version + 1
+            ids, revisiones = previo.ids, previo.revisiones.copy()
+            revisiones[tocados] = version
+            if eliminados:
+                df = df.drop(index=eliminados)
+                ids, revisiones = np.delete(ids, eliminados), np.delete(revisiones, eliminados)
+            ids_nuevos = np.arange(self._siguiente_id, self._siguiente_id + len(nuevos))
+            if len(nuevos):
+                df = pd.concat([df, nuevos], ignore_index=True)
+                ids = np.concatenate([ids, ids_nuevos])
+                revisiones = np.concatenate([revisiones, np.full(len(nuevos), version)])
+                self._siguiente_id += len(nuevos)
+            catalogo = Catalogo(version, compactar(df), ids, revisiones)
+            columnas = frozenset(por_columna)
+            if not (eliminados or len(nuevos)):
+                catalogo.heredar(previo, columnas, tocados)
+            self._actual = catalogo
+            self._publicar(catalogo, Cambios(version, _con_ids(nuevos, ids_nuevos), quitados, modificados,
+                                             columnas=columnas))
+        return catalogo
+
+    def reemplazar(self, df: pd.DataFrame) -> Catalogo:
+        # Catálogo completo nuevo: filas nuevas (ids nuevos), así que toda edición pendiente choca
+        with self._lock:
+            df = compactar(df)
+            ids = np.arange(self._siguiente_id, self._siguiente_id + len(df))
+            self._siguiente_id += len(df)
+            catalogo = self._actual = Catalogo(self._actual.version + 1, df, ids)
+            self._publicar(catalogo, Cambios(catalogo.version, [], [], [], reemplazo=True))
+        return catalogo
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def _store(nombre, cargar, persistir=None) -> CatalogoStore:
+    with _STORES_LOCK:
+        if nombre not in _STORES:
+            store = _STORES[nombre] = CatalogoStore(cargar())
+            if persistir is not None:
+                store.suscribir(persistir)
+        return _STORES[nombre]
+
+
+def store_recursos() -> CatalogoStore:
+    db = almacen()
+    return _store("recursos", db.cargar_recursos, db.persistir_recursos)
+
+
+def store_roles() -> CatalogoStore:
+    db = almacen()
+    return _store("roles", db.cargar_roles, db.persistir_roles)
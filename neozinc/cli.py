@@ -0,0 +1,228 @@
+import argparse
+import csv
+import datetime
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from neozinc.almacen import almacen
+from neozinc.canasta import armar_canasta
+from neozinc.lote import nombre_archivo
+from neozinc.pdf import escribir_pdf
+
+# ------------------------------------------------------
+# COTIZADOR POR LÍNEA DE COMANDOS (SIN STREAMLIT)
+# ------------------------------------------------------
+# Lee canastas de un CSV o JSONL, las cotiza con las mismas reglas que APP4.py
+# (neozinc/canasta.py + neozinc/precios.py) y escribe un resultado por canasta
+# en CSV o JSONL, opcionalmente con su PDF. Todo es un pipeline de generadores:
+# se leen, cotizan y escriben de a lotes de TAM_LOTE canastas y nunca hay más de
+# EN_VUELO lotes por proceso pendientes, así la memoria no depende del archivo.
+#
+#   python -m neozinc.cli canastas.jsonl -o resultados.csv --procesos 4 --pdf pdfs/
+#
+# JSONL, una canasta por línea:
+#   {"id": "C-1", "cliente": "ACME", "area": "Agua", "servicio": "Preventivo",
+#    "gg": 50, "margen": 30,
+#    "materiales": [{"Nombre": "Válvula OS&Y 4\"", "Cantidad": 2}],
+#    "mano_obra": [{"Cargo": "Técnico Líder", "Personas": 1, "Horas": 8}]}
+# CSV, una fila por línea de canasta (filas consecutivas con el mismo id):
+#   Cotizacion,Cliente,Sistema,Servicio,GG,Margen,Nombre,Cantidad,Cargo,Personas,Horas
+
+TAM_LOTE = 256
+EN_VUELO = 2
+CAMPOS_SALIDA = ["id", "cliente", "lineas", "t_mat", "t_mo", "t_eq", "t_mt", "t_he", "t_otros",
+                 "gg", "margen", "costo_dir", "precio_final", "utilidad", "pdf", "error"]
+
+
+# --- Lectura ---
+# Una canasta mal formada no corta la corrida: llega como {"id", "error"} y sale
+# como una fila con error, igual que un ítem que no está en el catálogo.
+def leer_jsonl(archivo) -> Iterator[Dict]:
+    for n, linea in enumerate(archivo, 1):
+        if linea.strip():
+            try:
+                canasta = json.loads(linea)
+            except ValueError as e:
+                yield {"id": str(n), "error": f"JSON inválido: {e}"}
+                continue
+            if not isinstance(canasta, dict):
+                yield {"id": str(n), "error": "La línea debe ser un objeto JSON."}
+                continue
+            canasta.setdefault("id", str(n))
+            yield canasta
+
+
+def _numero(valor, defecto=None):
+    return float(valor) if valor not in (None, "") else defecto
+
+
+def leer_csv(archivo) -> Iterator[Dict]:
+    lector = csv.DictReader(archivo)
+    if not lector.fieldnames or "Cotizacion" not in lector.fieldnames:
+        raise ValueError("El CSV debe tener una columna 'Cotizacion'.")
+    for cid, filas in itertools.groupby(lector, key=lambda f: f["Cotizacion"]):
+        filas = list(filas)
+        cab = filas[0]
+        try:
+            canasta = {"id": cid, "cliente": cab.get("Cliente") or cid, "area": cab.get("Sistema"),
+                       "servicio": cab.get("Servicio"), "gg": _numero(cab.get("GG")),
+                       "margen": _numero(cab.get("Margen")), "materiales": [], "mano_obra": []}
+            for f in filas:
+                if f.get("Nombre"):
+                    canasta["materiales"].append({"Nombre": f["Nombre"], "Cantidad": _numero(f.get("Cantidad"), 1.0)})
+                if f.get("Cargo"):
+                    canasta["mano_obra"].append({"Cargo": f["Cargo"], "Personas": _numero(f.get("Personas"), 1.0),
+                                                 "Horas": _numero(f.get("Horas"), 0.0)})
+        except ValueError as e:
+            canasta = {"id": cid, "cliente": cab.get("Cliente") or cid, "error": f"Valor numérico inválido: {e}"}
+        yield canasta
+
+
+def en_lotes(items: Iterable, tam: int) -> Iterator[List]:
+    it = iter(items)
+    while True:
+        lote = list(itertools.islice(it, tam))
+        if not lote:
+            return
+        yield lote
+
+
+# --- Cotización (corre en cada proceso) ---
+_CONTEXTO: Dict = {}
+
+
+def iniciar_proceso(catalogo=None, roles=None, opciones=None):
+    # Cada proceso arma sus diccionarios Nombre -> registro y Cargo -> registro una vez
+    df_cat = pd.read_csv(catalogo) if catalogo else almacen().cargar_recursos()
+    df_rol = pd.read_csv(roles) if roles else almacen().cargar_roles()
+    recursos = {}
+    for r in df_cat.to_dict("records"):
+        recursos.setdefault(r["Nombre"], r)
+    _CONTEXTO.update(recursos=recursos, roles={r["Cargo"]: r for r in df_rol.to_dict("records")},
+                     opciones=opciones or {})
+
+
+def cotizar_canasta(datos: Dict) -> Dict:
+    op = _CONTEXTO["opciones"]
+    recursos, roles = _CONTEXTO["recursos"], _CONTEXTO["roles"]
+    gg = datos.get("gg")
+    gg = op["gg"] if gg is None else gg
+    margen = datos.get("margen")
+    margen = op["margen"] if margen is None else margen
+    fila = {"id": datos.get("id"), "cliente": datos.get("cliente") or datos.get("id"), "gg": gg, "margen": margen}
+    if datos.get("error"):
+        return {**fila, "error": datos["error"]}
+    try:
+        gg, margen = float(gg), float(margen)
+        fila.update(gg=gg, margen=margen)
+        canasta, faltan = armar_canasta(datos.get("materiales"), datos.get("mano_obra"), recursos, roles)
+    except (AttributeError, TypeError, ValueError) as e:
+        return {**fila, "error": f"Formato de canasta inválido: {e}"}
+    if faltan:
+        return {**fila, "error": "No está en el catálogo: " + "; ".join(faltan)}
+
+    totales = canasta.totales(gg, margen)
+    fila.update(totales._asdict(), lineas=len(canasta.lineas) + len(canasta.lineas_mo))
+    if op.get("pdf"):
+        nombre = nombre_archivo(f"{fila['id']}_{fila['cliente']}", set())
+        with open(os.path.join(op["pdf"], nombre), "wb") as destino:
+            escribir_pdf(destino, fila["cliente"], op["fecha"],
+                         datos.get("area") or op["area"], datos.get("servicio") or op["servicio"],
+                         canasta.materiales, canasta.mano_obra, gg, margen, totales.precio_final)
+        fila["pdf"] = nombre
+    return fila
+
+
+def cotizar_lote_canastas(lote: List[Dict]) -> List[Dict]:
+    return [cotizar_canasta(c) for c in lote]
+
+
+def cotizar_todo(canastas: Iterable[Dict], procesos=1, iniciar_args=(), tam_lote=TAM_LOTE) -> Iterator[Dict]:
+    """Cotiza en orden de entrada, con a lo sumo ``procesos * EN_VUELO`` lotes pendientes."""
+    lotes = en_lotes(canastas, tam_lote)
+    if procesos <= 1:
+        iniciar_proceso(*iniciar_args)
+        for lote in lotes:
+            yield from cotizar_lote_canastas(lote)
+        return
+    with ProcessPoolExecutor(procesos, initializer=iniciar_proceso, initargs=iniciar_args) as pool:
+        pendientes = deque()
+        for lote in lotes:
+            pendientes.append(pool.submit(cotizar_lote_canastas, lote))
+            if len(pendientes) >= procesos * EN_VUELO:
+                yield from pendientes.popleft().result()
+        while pendientes:
+            yield from pendientes.popleft().result()
+
+
+# --- Escritura ---
+def escribir(filas: Iterable[Dict], archivo, formato) -> Dict[str, int]:
+    resumen = {"canastas": 0, "errores": 0}
+    if formato == "jsonl":
+        for fila in filas:
+            archivo.write(json.dumps(fila, ensure_ascii=False) + "\n")
+            resumen["canastas"] += 1
+            resumen["errores"] += "error" in fila
+    else:
+        escritor = csv.DictWriter(archivo, CAMPOS_SALIDA, extrasaction="ignore")
+        escritor.writeheader()
+        for fila in filas:
+            escritor.writerow(fila)
+            resumen["canastas"] += 1
+            resumen["errores"] += "error" in fila
+    return resumen
+
+
+def _formato(ruta, explicito):
+    if explicito:
+        return explicito
+    return "jsonl" if str(ruta).lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m neozinc.cli", description="Cotiza canastas desde un archivo.")
+    p.add_argument("entrada", help="CSV o JSONL de canastas ('-' = stdin)")
+    p.add_argument("-o", "--salida", default="-", help="CSV o JSONL de resultados ('-' = stdout)")
+    p.add_argument("--formato-entrada", choices=["csv", "jsonl"])
+    p.add_argument("--formato-salida", choices=["csv", "jsonl"])
+    p.add_argument("--procesos", type=int, default=1)
+    p.add_argument("--catalogo", help="CSV de recursos (por defecto, la base NEOZINC_DB)")
+    p.add_argument("--roles", help="CSV de tarifas (por defecto, la base NEOZINC_DB)")
+    p.add_argument("--gg", type=float, default=50.0, help="gastos generales si la canasta no los indica")
+    p.add_argument("--margen", type=float, default=30.0, help="margen %% si la canasta no lo indica")
+    p.add_argument("--area", default="Integral")
+    p.add_argument("--servicio", default="Correctivo")
+    p.add_argument("--pdf", metavar="DIR", help="carpeta donde escribir un PDF por canasta")
+    a = p.parse_args(argv)
+
+    if a.pdf:
+        os.makedirs(a.pdf, exist_ok=True)
+    opciones = {"gg": a.gg, "margen": a.margen, "area": a.area, "servicio": a.servicio, "pdf": a.pdf,
+                "fecha": str(datetime.date.today())}
+    entrada = sys.stdin if a.entrada == "-" else open(a.entrada, encoding="utf-8-sig", newline="")
+    salida = sys.stdout if a.salida == "-" else open(a.salida, "w", encoding="utf-8", newline="")
+    try:
+        lector = leer_jsonl if _formato(a.entrada, a.formato_entrada) == "jsonl" else leer_csv
+        filas = cotizar_todo(lector(entrada), a.procesos, (a.catalogo, a.roles, opciones))
+        resumen = escribir(filas, salida, _formato(a.salida, a.formato_salida))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+    print(f"{resumen['canastas']} canastas cotizadas, {resumen['errores']} con errores.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
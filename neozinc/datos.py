@@ -0,0 +1,38 @@
+# ------------------------------------------------------
+# DATOS INICIALES (CATÁLOGO SEMILLA)
+# ------------------------------------------------------
+RECURSOS_INICIALES = [
+    # DACI
+    {"Nombre": 'Panel de Alarma 4Z', "Tipo": "Equipo", "Categoría": "DACI", "Unidad": "und", "Costo Unitario": 1200.0},
+    {"Nombre": 'Detector de Humo', "Tipo": "Equipo", "Categoría": "DACI", "Unidad": "und", "Costo Unitario": 45.0},
+    {"Nombre": 'Estación Manual', "Tipo": "Equipo", "Categoría": "DACI", "Unidad": "und", "Costo Unitario": 65.0},
+    {"Nombre": 'TUBERIA EMT 3/4"', "Tipo": "Material", "Categoría": "DACI", "Unidad": "und", "Costo Unitario": 6.20},
+    {"Nombre": 'Cable FPL 2x18AWG', "Tipo": "Material", "Categoría": "DACI", "Unidad": "rollo", "Costo Unitario": 280.0},
+    # HERRAMIENTAS DACI
+    {"Nombre": 'Multímetro Fluke (Alquiler)', "Tipo": "Herramienta", "Categoría": "DACI", "Unidad": "día", "Costo Unitario": 35.0},
+    {"Nombre": 'Escalera de Tijera 8 pasos', "Tipo": "Herramienta", "Categoría": "DACI", "Unidad": "día", "Costo Unitario": 15.0},
+    {"Nombre": 'Andamio Normado (1 Cuerpo)', "Tipo": "Herramienta", "Categoría": "DACI", "Unidad": "día", "Costo Unitario": 25.0},
+    
+    # ACI
+    {"Nombre": 'Gabinete CI c/manguera', "Tipo": "Equipo", "Categoría": "ACI", "Unidad": "und", "Costo Unitario": 850.0},
+    {"Nombre": 'Rociador K5.6', "Tipo": "Material", "Categoría": "ACI", "Unidad": "und", "Costo Unitario": 18.0},
+    {"Nombre": 'Manómetro 300PSI', "Tipo": "Material", "Categoría": "ACI", "Unidad": "und", "Costo Unitario": 45.0},
+    # HERRAMIENTAS ACI
+    {"Nombre": 'Roscadora de Tubos 1/2-2" (Alquiler)', "Tipo": "Herramienta", "Categoría": "ACI", "Unidad": "día", "Costo Unitario": 65.0},
+    {"Nombre": 'Ranuradora (Roll Groover)', "Tipo": "Herramienta", "Categoría": "ACI", "Unidad": "día", "Costo Unitario": 80.0},
+    {"Nombre": 'Llave Stilson 24"', "Tipo": "Herramienta", "Categoría": "ACI", "Unidad": "día", "Costo Unitario": 10.0},
+
+    # BCI
+    {"Nombre": 'Bomba Jockey 5HP', "Tipo": "Equipo", "Categoría": "BCI", "Unidad": "und", "Costo Unitario": 950.0},
+    {"Nombre": 'Empaquetadura', "Tipo": "Material", "Categoría": "BCI", "Unidad": "mt", "Costo Unitario": 45.0},
+    # HERRAMIENTAS BCI
+    {"Nombre": 'Alineador Laser de Ejes', "Tipo": "Herramienta", "Categoría": "BCI", "Unidad": "día", "Costo Unitario": 150.0},
+    {"Nombre": 'Torquímetro', "Tipo": "Herramienta", "Categoría": "BCI", "Unidad": "día", "Costo Unitario": 40.0},
+    {"Nombre": 'Tecle de Cadena 1Ton', "Tipo": "Herramienta", "Categoría": "BCI", "Unidad": "día", "Costo Unitario": 35.0},
+]
+
+ROLES_INICIALES = [
+    {"Cargo": "Técnico Líder", "Costo Hora": 35.0},
+    {"Cargo": "Ayudante", "Costo Hora": 15.0},
+    {"Cargo": "Soldador", "Costo Hora": 45.0},
+]
@@ -0,0 +1,99 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# ------------------------------------------------------
+# DESHACER / REHACER E INSTANTÁNEAS CON NOMBRE
+# ------------------------------------------------------
+# Cada paso guarda el estado completo de la cotización (líneas, mano de obra,
+# gg, margen y cabecera) como un Estado inmutable. Las líneas de la canasta ya
+# son inmutables (se reemplazan, no se modifican), así que un Estado solo guarda
+# referencias a ellas, agrupadas en trozos (tuplas): un paso nuevo reutiliza los
+# trozos del paso anterior que no cambiaron y solo crea los que sí. Cientos de
+# pasos sobre una cotización de 500 líneas cuestan O(cambios), no una copia por
+# paso.
+#
+# Los cortes entre trozos dependen del contenido (el hash de la línea), no de la
+# posición: quitar o insertar una línea solo rehace su trozo, no todos los que
+# siguen.
+
+TROZO_MEDIO = 16  # líneas por trozo, en promedio
+TROZO_MAX = 64
+MAX_PASOS = 1000  # pasos que se conservan; los más viejos se descartan
+
+
+class Estado(NamedTuple):
+    lineas: Tuple[tuple, ...]  # trozos de canasta.lineas
+    lineas_mo: Tuple[tuple, ...]  # trozos de canasta.lineas_mo
+    gg: float
+    margen: float
+    proyecto: Tuple[Tuple[str, object], ...]  # (campo, valor) de la cabecera
+
+    def todas(self, campo) -> List:
+        return [l for trozo in getattr(self, campo) for l in trozo]
+
+
+def trocear(lineas, previos=()) -> Tuple[tuple, ...]:
+    # previos: trozos de un Estado anterior; los iguales (mismas líneas) se reutilizan
+    reusar = {tuple(map(id, t)): t for t in previos}
+    trozos, actual = [], []
+    for linea in lineas:
+        actual.append(linea)
+        if hash(linea) % TROZO_MEDIO == 0 or len(actual) >= TROZO_MAX:
+            trozos.append(actual)
+            actual = []
+    if actual:
+        trozos.append(actual)
+    return tuple(reusar.get(tuple(map(id, t))) or tuple(t) for t in trozos)
+
+
+class Historia:
+    def __init__(self, limite=MAX_PASOS):
+        self.limite = limite
+        self.pasos: List[Estado] = []
+        self.cursor = -1  # posición del estado vigente en pasos
+        self.instantaneas: Dict[str, Estado] = {}
+
+    @property
+    def vigente(self) -> Optional[Estado]:
+        return self.pasos[self.cursor] if self.pasos else None
+
+    def capturar(self, canasta, gg, margen, proyecto: Dict) -> Estado:
+        previo = self.vigente
+        return Estado(trocear(canasta.lineas, previo.lineas if previo else ()),
+                      trocear(canasta.lineas_mo, previo.lineas_mo if previo else ()),
+                      gg, margen, tuple(proyecto.items()))
+
+    def registrar(self, canasta, gg, margen, proyecto: Dict) -> bool:
+        # Llamar después de cada cambio; descarta lo que había para rehacer
+        estado = self.capturar(canasta, gg, margen, proyecto)
+        if estado == self.vigente:
+            return False
+        del self.pasos[self.cursor + 1:]
+        self.pasos.append(estado)
+        if len(self.pasos) > self.limite:
+            del self.pasos[:len(self.pasos) - self.limite]
+        self.cursor = len(self.pasos) - 1
+        return True
+
+    @property
+    def puede_deshacer(self) -> bool:
+        return self.cursor > 0
+
+    @property
+    def puede_rehacer(self) -> bool:
+        return self.cursor < len(self.pasos) - 1
+
+    def deshacer(self) -> Optional[Estado]:
+        if not self.puede_deshacer:
+            return None
+        self.cursor -= 1
+        return self.pasos[self.cursor]
+
+    def rehacer(self) -> Optional[Estado]:
+        if not self.puede_rehacer:
+            return None
+        self.cursor += 1
+        return self.pasos[self.cursor]
+
+    def guardar(self, nombre: str):
+        if self.vigente is not None:
+            self.instantaneas[nombre] = self.vigente
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+from neozinc.lote import exportar_zip
+from neozinc.pdf import CACHE_PDF, clave_cotizacion, generar_pdf_bytes
+
+# ------------------------------------------------------
+# COLA DE EXPORTACIONES EN SEGUNDO PLANO
+# ------------------------------------------------------
+# Los PDFs y ZIPs no se generan en el hilo del script: la sesión envía un
+# trabajo y recibe un Trabajo (estado, progreso y, al terminar, el resultado)
+# que la pestaña EXPORTAR consulta en cada rerun. Una cola por proceso:
+#
+#   - Deduplicación: la clave es un hash del contenido; dos sesiones que piden
+#     el mismo documento comparten el mismo trabajo.
+#   - Límite de concurrencia: SIMULTANEOS trabajos en curso a la vez (el resto
+#     espera en la cola) sobre un pool de PROCESOS procesos con prioridad baja
+#     (os.nice), así una ráfaga de exportaciones no le quita CPU a los reruns.
+#   - Retención: se conservan los últimos MAX_TRABAJOS terminados; los ZIPs
+#     quedan en disco y se borran al descartar su trabajo.
+#   - Si un proceso del pool muere (OOM, kill), el pool queda inservible: se
+#     reemplaza por uno nuevo y el trabajo que lo encontró roto se reintenta
+#     una vez.
+
+PROCESOS = int(os.environ.get("NEOZINC_EXPORT_PROCESOS", 0)) or max(1, (os.cpu_count() or 1) // 2)
+SIMULTANEOS = 2
+PRIORIDAD = 10  # incremento de os.nice en los procesos de exportación
+MAX_TRABAJOS = 64
+
+EN_COLA, EN_CURSO, LISTO, ERROR = "en cola", "en curso", "listo", "error"
+
+
+def _bajar_prioridad():
+    if hasattr(os, "nice"):  # no existe en Windows
+        os.nice(PRIORIDAD)
+
+
+class Trabajo:
+    def __init__(self, clave: str, archivo: str, mime: str, total: int = 1):
+        self.clave = clave
+        self.archivo = archivo  # nombre para la descarga
+        self.mime = mime
+        self.estado = EN_COLA
+        self.hechos, self.total = 0, total
+        self.resultado = None  # bytes (PDF) o ruta en disco (ZIP)
+        self.error: Optional[str] = None
+        self.creado = time.time()
+
+    def avanzar(self, hechos, total):
+        self.hechos, self.total = hechos, total
+
+    @property
+    def terminado(self) -> bool:
+        return self.estado in (LISTO, ERROR)
+
+    @property
+    def fraccion(self) -> float:
+        return self.hechos / self.total if self.total else 0.0
+
+    def leer(self) -> Optional[bytes]:
+        if isinstance(self.resultado, str):
+            try:
+                with open(self.resultado, "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+        return self.resultado
+
+    def descartar(self):
+        if isinstance(self.resultado, str) and os.path.exists(self.resultado):
+            os.remove(self.resultado)
+        self.resultado = None
+
+
+class ColaExportacion:
+    def __init__(self, procesos=PROCESOS, simultaneos=SIMULTANEOS, max_trabajos=MAX_TRABAJOS):
+        self.procesos = procesos
+        self.max_trabajos = max_trabajos
+        self._lock = threading.Lock()
+        self._trabajos: "OrderedDict[str, Trabajo]" = OrderedDict()
+        self._hilos = ThreadPoolExecutor(simultaneos, thread_name_prefix="exportacion")
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: un fork copiaría los hilos del servidor a medio camino
+                self._pool = ProcessPoolExecutor(self.procesos, mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_bajar_prioridad)
+            return self._pool
+
+    def _en_pool(self, funcion):
+        # funcion(pool); con el pool roto se crea otro y se reintenta una vez
+        pool = self.pool
+        try:
+            return funcion(pool)
+        except BrokenProcessPool:
+            with self._lock:
+                if self._pool is pool:  # otro trabajo pudo haberlo reemplazado ya
+                    self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            return funcion(self.pool)
+
+    def _enviar(self, clave, archivo, mime, total, funcion: Callable[[Trabajo], object]) -> Trabajo:
+        with self._lock:
+            trabajo = self._trabajos.get(clave)
+            if trabajo is not None and trabajo.estado != ERROR:
+                self._trabajos.move_to_end(clave)
+                return trabajo
+            trabajo = self._trabajos[clave] = Trabajo(clave, archivo, mime, total)
+            self._recortar()
+        self._hilos.submit(self._correr, trabajo, funcion)
+        return trabajo
+
+    def _correr(self, trabajo: Trabajo, funcion):
+        trabajo.estado = EN_CURSO
+        try:
+            trabajo.resultado = funcion(trabajo)
+        except Exception as e:  # el error se muestra en la sesión que lo pidió
+            trabajo.error = str(e) or type(e).__name__
+            trabajo.estado = ERROR
+        else:
+            trabajo.hechos = trabajo.total
+            trabajo.estado = LISTO
+
+    def _recortar(self):
+        # Con el lock tomado: descarta los terminados más viejos
+        sobran = len(self._trabajos) - self.max_trabajos
+        for clave in [c for c, t in self._trabajos.items() if t.terminado][:max(0, sobran)]:
+            self._trabajos.pop(clave).descartar()
+
+    def trabajos(self) -> List[Trabajo]:
+        with self._lock:
+            return list(self._trabajos.values())
+
+    # --- Tipos de exportación ---
+    def pdf(self, datos: tuple) -> Trabajo:
+        # datos: los argumentos de generar_pdf_bytes
+        clave_pdf = clave_cotizacion(*datos)
+
+        def generar(trabajo):
+            pdf = CACHE_PDF.obtener(clave_pdf)
+            if pdf is None:
+                pdf = self._en_pool(lambda pool: pool.submit(generar_pdf_bytes, *datos).result())
+                CACHE_PDF.guardar(clave_pdf, pdf)
+            return pdf
+        return self._enviar("pdf:" + clave_pdf, f"Cotizacion_{datos[0]}.pdf", "application/pdf", 1, generar)
+
+    def zip(self, clientes: List[Dict], datos: tuple) -> Trabajo:
+        # Un PDF por fila de clientes (ver neozinc/lote.py) con los datos de la canasta
+        contenido = json.dumps([clientes, datos[1:]], sort_keys=True, default=str, ensure_ascii=False)
+        clave = "zip:" + hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+        def generar(trabajo):
+            fd, ruta = tempfile.mkstemp(prefix="neozinc_", suffix=".zip")
+            os.close(fd)
+
+            def escribir(pool):
+                with open(ruta, "wb") as f:  # un reintento reescribe el ZIP desde cero
+                    exportar_zip(f, clientes, *datos[1:], procesos=self.procesos, pool=pool,
+                                 progreso=trabajo.avanzar)
+            try:
+                self._en_pool(escribir)
+            except BaseException:
+                os.remove(ruta)
+                raise
+            return ruta
+        return self._enviar(clave, "Cotizaciones.zip", "application/zip", len(clientes), generar)
+
+
+_COLA = None
+_COLA_LOCK = threading.Lock()
+
+
+def cola_exportacion() -> ColaExportacion:
+    global _COLA
+    with _COLA_LOCK:
+        if _COLA is None:
+            _COLA = ColaExportacion()
+        return _COLA
@@ -0,0 +1,114 @@
+from typing import List
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------
+# DATOS Y GRÁFICOS DEL TABLERO
+# ------------------------------------------------------
+# El Pareto se agrega a los TOP_PARETO ítems más caros más un "Otros" con el
+# resto (selección parcial con argpartition), así el spec que viaja al navegador
+# no crece con la canasta. APP4.py guarda los gráficos en la sesión y solo los
+# reconstruye cuando cambian la canasta, los gastos generales o el margen.
+
+TOP_PARETO = 15
+
+
+def datos_distribucion(totales) -> pd.DataFrame:
+    return pd.DataFrame({
+        "Categoría": ["Equipos", "Materiales", "Herramientas", "Mano Obra", "Gastos Grales", "Utilidad"],
+        "Monto": [totales.t_eq, totales.t_mt, totales.t_he, totales.t_mo, totales.gg, totales.utilidad],
+    })
+
+
+def datos_pareto(lineas, top=TOP_PARETO) -> pd.DataFrame:
+    # Subtotal por Nombre; los `top` mayores en orden descendente y el resto sumado
+    por_nombre = {}
+    for l in lineas:
+        nombre = l.recurso['Nombre']
+        previo = por_nombre.get(nombre)
+        por_nombre[nombre] = (l.tipo, l.subtotal + (previo[1] if previo else 0.0))
+    nombres: List[str] = list(por_nombre)
+    tipos = [v[0] for v in por_nombre.values()]
+    subtotal = np.fromiter((v[1] for v in por_nombre.values()), np.float64, len(nombres))
+    if len(nombres) > top:
+        idx = np.argpartition(subtotal, -top)[-top:]
+    else:
+        idx = np.arange(len(nombres))
+    idx = idx[np.argsort(-subtotal[idx], kind="stable")]
+    df = pd.DataFrame({"Nombre": [nombres[i] for i in idx], "Tipo": [tipos[i] for i in idx],
+                       "Subtotal": subtotal[idx]})
+    resto = len(nombres) - len(idx)
+    if resto:
+        otros = float(subtotal.sum() - subtotal[idx].sum())
+        df.loc[len(df)] = [f"Otros ({resto} ítems)", "Otros", otros]
+    return df
+
+
+def grafico_distribucion(totales):
+    base = alt.Chart(datos_distribucion(totales)).encode(theta=alt.Theta("Monto", stack=True))
+    pie = base.mark_arc(outerRadius=120, innerRadius=60).encode(
+        color=alt.Color("Categoría", scale=alt.Scale(scheme='spectral')),
+        order=alt.Order("Monto", sort="descending"),
+        tooltip=["Categoría", "Monto"]
+    )
+    text = base.mark_text(radius=140).encode(
+        text=alt.Text("Monto", format=",.0f"),
+        order=alt.Order("Monto", sort="descending"),
+        color=alt.value("white")
+    )
+    return pie + text
+
+
+def grafico_pareto(lineas, top=TOP_PARETO):
+    df = datos_pareto(lineas, top)
+    # Orden explícito: de mayor a menor y "Otros" siempre al final
+    return alt.Chart(df).mark_bar().encode(
+        x=alt.X("Subtotal", title="Costo (S/.)"),
+        y=alt.Y("Nombre", sort=df["Nombre"].tolist()),
+        color="Tipo",
+        tooltip=["Nombre", "Subtotal"]
+    )
+
+
+def datos_sensibilidad(sens) -> pd.DataFrame:
+    # Formato largo (una fila por celda) a partir de una grilla gg × margen
+    gg, margen = np.meshgrid(sens.ggs, sens.margenes, indexing="ij")
+    return pd.DataFrame({"GG": gg.ravel(), "Margen": margen.ravel(),
+                         "Precio": sens.precio_final.ravel(), "Utilidad": sens.utilidad.ravel()})
+
+
+def grafico_sensibilidad(sens, max_textos=150):
+    df = datos_sensibilidad(sens)
+    base = alt.Chart(df).encode(
+        x=alt.X("Margen:O", title="Margen %"),
+        y=alt.Y("GG:O", title="Gastos Grales (S/.)", sort="descending"),
+    )
+    mapa = base.mark_rect().encode(
+        color=alt.Color("Precio:Q", scale=alt.Scale(scheme="viridis"), title="Precio (S/.)"),
+        tooltip=["GG", "Margen", alt.Tooltip("Precio", format=",.2f"), alt.Tooltip("Utilidad", format=",.2f")],
+    )
+    if len(df) > max_textos:
+        return mapa
+    return mapa + base.mark_text(fontSize=10).encode(text=alt.Text("Precio:Q", format=",.0f"), color=alt.value("white"))
+
+
+# Componentes que suman la venta de cada grupo del histórico (ver neozinc/historial.py)
+COMPONENTES_HISTORIAL = ["Equipos", "Materiales", "Herramientas", "Otros", "Mano Obra", "Gastos Grales", "Utilidad"]
+
+
+def datos_historial(resumen: pd.DataFrame, clave: str) -> pd.DataFrame:
+    return resumen.melt(id_vars=[clave], value_vars=COMPONENTES_HISTORIAL, var_name="Componente", value_name="Monto")
+
+
+def grafico_historial(resumen: pd.DataFrame, clave: str):
+    # Barras apiladas: la altura es la venta y los tramos, la mezcla de costos
+    orden = None if clave == "Mes" else resumen[clave].tolist()
+    return alt.Chart(datos_historial(resumen, clave)).mark_bar().encode(
+        x=alt.X(f"{clave}:N", sort=orden, title=clave),
+        y=alt.Y("Monto:Q", stack=True, title="S/."),
+        color=alt.Color("Componente", sort=COMPONENTES_HISTORIAL, scale=alt.Scale(scheme="spectral")),
+        order=alt.Order("orden:Q"),
+        tooltip=[clave, "Componente", alt.Tooltip("Monto", format=",.2f")],
+    ).transform_calculate(orden=f"indexof({COMPONENTES_HISTORIAL!r}, datum.Componente)")
@@ -0,0 +1,248 @@
+import argparse
+import datetime
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+# ------------------------------------------------------
+# HISTÓRICO DE COTIZACIONES (PARQUET POR MES + ROLLUPS)
+# ------------------------------------------------------
+# Cada cotización terminada es una fila de hechos (totales por tipo, precio,
+# utilidad...) que se agrega a un Parquet dentro de la partición de su mes:
+#
+#   historial/mes=2026-10/parte-<ns>-<id>.parquet
+#
+# Un SQLite en la misma carpeta hace de manifiesto (`partes`: qué archivos
+# forman el histórico; un archivo que no figura ahí se ignora) y guarda los
+# rollups por mes y por cliente / sistema / servicio, que se actualizan con un
+# UPSERT en la misma transacción que registra la parte. El tablero lee solo los
+# rollups (miles de filas, no cientos de miles); los hechos crudos quedan para
+# análisis puntuales con leer(). Cuando un mes acumula MAX_PARTES archivos se
+# compactan en uno.
+#
+#   python -m neozinc.historial --por cliente --desde 2026-01
+#   python -m neozinc.historial --desde-almacen     # cotizaciones ya guardadas en NEOZINC_DB
+
+RUTA_HISTORIAL = os.environ.get("NEOZINC_HISTORIAL", "historial")
+MAX_PARTES = 32
+
+# Columnas de hechos; las métricas son también las columnas de los rollups
+DIMENSIONES = {"cliente": "Cliente", "area": "Sistema", "servicio": "Servicio"}
+METRICAS = ("precio_final", "utilidad", "costo_dir", "t_eq", "t_mt", "t_he", "t_otros", "t_mo", "gg")
+COLUMNAS = ("id", "fecha", "mes", *DIMENSIONES, "margen", *METRICAS, "lineas", "creado")
+ETIQUETAS = {"n": "Cotizaciones", "precio_final": "Venta", "utilidad": "Utilidad", "margen": "Margen %",
+             "costo_dir": "Costo Directo", "t_eq": "Equipos", "t_mt": "Materiales", "t_he": "Herramientas",
+             "t_otros": "Otros", "t_mo": "Mano Obra", "gg": "Gastos Grales"}
+
+ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS partes (
+    archivo TEXT PRIMARY KEY, mes TEXT, filas INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_partes_mes ON partes (mes);
+
+CREATE TABLE IF NOT EXISTS rollup (
+    dimension TEXT, valor TEXT, mes TEXT, n INTEGER,
+    {", ".join(f"{m} REAL" for m in METRICAS)},
+    PRIMARY KEY (dimension, valor, mes)
+) WITHOUT ROWID;
+"""
+
+# dimension 'total' (valor '') es la serie mensual de toda la empresa
+_UPSERT = (
+    f"INSERT INTO rollup (dimension, valor, mes, n, {', '.join(METRICAS)}) "
+    f"VALUES (?, ?, ?, ?, {', '.join('?' for _ in METRICAS)}) "
+    f"ON CONFLICT (dimension, valor, mes) DO UPDATE SET n = n + excluded.n, "
+    + ", ".join(f"{m} = {m} + excluded.{m}" for m in METRICAS)
+)
+
+
+def fila_cotizacion(cid, cliente, fecha, area, servicio, totales, margen, lineas) -> Dict:
+    # totales: precios.Totales de la canasta
+    fecha = str(fecha)
+    return {"id": cid, "fecha": fecha, "mes": fecha[:7], "cliente": str(cliente), "area": str(area),
+            "servicio": str(servicio), "margen": float(margen),
+            **{m: float(getattr(totales, m)) for m in METRICAS}, "lineas": int(lineas),
+            "creado": datetime.datetime.now().isoformat(timespec="seconds")}
+
+
+def _rollups(df: pd.DataFrame) -> List[tuple]:
+    # Pre-agrega el lote antes del UPSERT: una fila por (dimensión, valor, mes)
+    filas = []
+    for dim in ("total", *DIMENSIONES):
+        claves = ["mes"] if dim == "total" else [dim, "mes"]
+        agg = df.groupby(claves, sort=False).agg(n=("fecha", "size"), **{m: (m, "sum") for m in METRICAS})
+        for clave, valores in zip(agg.index, agg.itertuples(index=False)):
+            valor, mes = ("", clave) if dim == "total" else clave
+            filas.append((dim, str(valor), mes, int(valores[0]), *map(float, valores[1:])))
+    return filas
+
+
+class Historial:
+    def __init__(self, ruta=RUTA_HISTORIAL):
+        self.ruta = ruta
+        os.makedirs(ruta, exist_ok=True)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with self.conexion() as con:
+            con.executescript(ESQUEMA)
+
+    def conexion(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(os.path.join(self.ruta, "rollups.db"), timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    # --- Escritura ---
+    def agregar(self, filas: Iterable[Dict]):
+        df = pd.DataFrame(list(filas), columns=list(COLUMNAS))
+        if df.empty:
+            return
+        with self._lock:
+            for mes, parte in df.groupby("mes", sort=False):
+                archivo = self._escribir(mes, parte)
+                con = self.conexion()
+                with con:
+                    con.execute("INSERT INTO partes (archivo, mes, filas) VALUES (?, ?, ?)", (archivo, mes, len(parte)))
+                    con.executemany(_UPSERT, _rollups(parte))
+                if self._n_partes(mes) > MAX_PARTES:
+                    self._compactar(mes)
+
+    def _escribir(self, mes, df) -> str:
+        carpeta = os.path.join(self.ruta, f"mes={mes}")
+        os.makedirs(carpeta, exist_ok=True)
+        archivo = os.path.join(f"mes={mes}", f"parte-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet")
+        df.to_parquet(os.path.join(self.ruta, archivo), index=False)
+        return archivo
+
+    def _n_partes(self, mes) -> int:
+        return self.conexion().execute("SELECT COUNT(*) FROM partes WHERE mes = ?", (mes,)).fetchone()[0]
+
+    def _compactar(self, mes):
+        # Nuevo archivo primero, cambio de manifiesto en una transacción y recién
+        # después se borran los viejos: un corte a mitad de camino deja el
+        # histórico consistente (a lo sumo un archivo huérfano que nadie lee)
+        viejos = self._archivos([mes])
+        df = pd.concat([pd.read_parquet(os.path.join(self.ruta, a)) for a in viejos], ignore_index=True)
+        nuevo = self._escribir(mes, df)
+        con = self.conexion()
+        with con:
+            con.executemany("DELETE FROM partes WHERE archivo = ?", [(a,) for a in viejos])
+            con.execute("INSERT INTO partes (archivo, mes, filas) VALUES (?, ?, ?)", (nuevo, mes, len(df)))
+        for a in viejos:
+            os.remove(os.path.join(self.ruta, a))
+
+    # --- Lectura ---
+    def _archivos(self, meses=None, desde=None, hasta=None) -> List[str]:
+        sql, params = "SELECT archivo FROM partes WHERE 1=1", []
+        if meses is not None:
+            sql += f" AND mes IN ({', '.join('?' for _ in meses)})"
+            params += list(meses)
+        if desde is not None:
+            sql += " AND mes >= ?"
+            params.append(desde)
+        if hasta is not None:
+            sql += " AND mes <= ?"
+            params.append(hasta)
+        return [f[0] for f in self.conexion().execute(sql + " ORDER BY archivo", params)]
+
+    def leer(self, desde: Optional[str] = None, hasta: Optional[str] = None, columnas=None) -> pd.DataFrame:
+        # Hechos crudos; solo se abren las particiones de los meses pedidos
+        archivos = self._archivos(desde=desde, hasta=hasta)
+        if not archivos:
+            return pd.DataFrame(columns=list(columnas or COLUMNAS))
+        return pd.concat([pd.read_parquet(os.path.join(self.ruta, a), columns=columnas) for a in archivos],
+                         ignore_index=True)
+
+    def meses(self) -> List[str]:
+        return [f[0] for f in self.conexion().execute(
+            "SELECT DISTINCT mes FROM rollup WHERE dimension = 'total' ORDER BY mes")]
+
+    def resumen(self, por="mes", desde: Optional[str] = None, hasta: Optional[str] = None,
+                limite: Optional[int] = None) -> pd.DataFrame:
+        """Totales desde los rollups, agrupados por 'mes', 'cliente', 'area' o 'servicio'."""
+        if por != "mes" and por not in DIMENSIONES:
+            raise ValueError(f"No se puede agrupar por '{por}'.")
+        dimension, grupo = ("total", "mes") if por == "mes" else (por, "valor")
+        sql = (f"SELECT {grupo} AS clave, SUM(n) AS n, {', '.join(f'SUM({m}) AS {m}' for m in METRICAS)} "
+               "FROM rollup WHERE dimension = ?")
+        params = [dimension]
+        if desde is not None:
+            sql += " AND mes >= ?"
+            params.append(desde)
+        if hasta is not None:
+            sql += " AND mes <= ?"
+            params.append(hasta)
+        sql += f" GROUP BY {grupo} ORDER BY " + ("clave" if por == "mes" else "precio_final DESC")
+        if limite is not None:
+            sql += f" LIMIT {int(limite)}"
+        df = pd.read_sql_query(sql, self.conexion(), params=params)
+        # Margen sobre el costo directo, como el de la cotización (precio_final = costo_dir * (1 + margen / 100))
+        df.insert(df.columns.get_loc("utilidad") + 1, "margen",
+                  (100 * df["utilidad"] / df["costo_dir"].where(df["costo_dir"] != 0)).fillna(0.0))
+        etiqueta = "Mes" if por == "mes" else DIMENSIONES[por]
+        return df.rename(columns={"clave": etiqueta, **ETIQUETAS})
+
+    def reconstruir_rollups(self):
+        # Recalcula los rollups desde los Parquet (p.ej. tras borrar una partición a mano)
+        with self._lock:
+            df = self.leer()
+            con = self.conexion()
+            with con:
+                con.execute("DELETE FROM rollup")
+                if not df.empty:
+                    con.executemany(_UPSERT, _rollups(df))
+
+
+_HISTORIAL = None
+_HISTORIAL_LOCK = threading.Lock()
+
+
+def historial() -> Historial:
+    global _HISTORIAL
+    with _HISTORIAL_LOCK:
+        if _HISTORIAL is None:
+            _HISTORIAL = Historial()
+        return _HISTORIAL
+
+
+def importar_almacen(hist: Historial, alm, tam_lote=1000) -> int:
+    # Para bases anteriores al histórico: recotiza cada cotización guardada que
+    # todavía no esté en el histórico
+    from neozinc.precios import cotizar
+    ya = set(hist.leer(columnas=["id"])["id"].dropna().astype(int))
+    ids = [f[0] for f in alm.conexion().execute("SELECT id FROM cotizaciones ORDER BY id") if f[0] not in ya]
+    lote = []
+    for cid in ids:
+        c = alm.cargar_cotizacion(cid)
+        totales = cotizar(c["materiales"], c["mano_obra"], c["gg"], c["margen"])
+        lote.append(fila_cotizacion(cid, c["cliente"], c["fecha"], c["area"], c["servicio"], totales,
+                                    c["margen"], len(c["materiales"])))
+        if len(lote) >= tam_lote:
+            hist.agregar(lote)
+            lote = []
+    hist.agregar(lote)
+    return len(ids)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(prog="python -m neozinc.historial", description="Resumen del histórico.")
+    p.add_argument("--por", default="mes", choices=["mes", *DIMENSIONES])
+    p.add_argument("--desde", help="mes inicial, AAAA-MM")
+    p.add_argument("--hasta", help="mes final, AAAA-MM")
+    p.add_argument("--desde-almacen", action="store_true", help="agregar las cotizaciones guardadas en NEOZINC_DB")
+    p.add_argument("--reconstruir", action="store_true", help="recalcular los rollups desde los Parquet")
+    a = p.parse_args()
+    if a.desde_almacen:
+        from neozinc.almacen import almacen
+        print(f"{importar_almacen(historial(), almacen())} cotizaciones agregadas.")
+    if a.reconstruir:
+        historial().reconstruir_rollups()
+    print(historial().resumen(a.por, a.desde, a.hasta).to_string(index=False))
@@ -0,0 +1,208 @@
+import io
+from typing import Dict, Iterator, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from neozinc.precios import TIPOS
+
+# ------------------------------------------------------
+# IMPORTACIÓN DE LISTAS DE PRECIOS DE PROVEEDORES
+# ------------------------------------------------------
+# El archivo (CSV o XLSX) se lee por bloques de TAM_BLOQUE filas con tipos
+# explícitos; cada bloque se valida y se compara contra el catálogo usando
+# (Nombre, Categoría, Tipo) como clave: el mismo Nombre puede estar en varias
+# categorías (p.ej. un detector en DACI y en ACI) con precios distintos. Solo se
+# guardan las diferencias (filas nuevas, celdas cambiadas), así que la memoria
+# depende del bloque y de los cambios, no del tamaño del archivo. Las diferencias
+# se aplican con un único commit del store.
+
+COLUMNAS = ["Nombre", "Tipo", "Categoría", "Unidad", "Costo Unitario"]
+TEXTO = ["Nombre", "Tipo", "Categoría", "Unidad"]
+CLAVE = ["Nombre", "Categoría", "Tipo"]
+VALORES = ["Unidad", "Costo Unitario"]  # lo que la lista puede cambiar de un ítem existente
+TAM_BLOQUE = 5000
+MAX_ERRORES = 50  # errores de validación que se conservan para mostrar
+
+
+class Diferencias(NamedTuple):
+    version: int  # versión del catálogo contra la que se calculó
+    editados: Dict[int, dict]  # posición en el catálogo -> {columna: valor nuevo}
+    agregados: List[dict]
+    eliminados: List[int]
+    filas: int  # filas leídas del archivo
+    errores: List[str]
+    n_errores: int
+    base: object = None  # instantánea analizada (Catalogo)
+
+    def __bool__(self):
+        return bool(self.editados or self.agregados or self.eliminados)
+
+    def resumen(self) -> str:
+        return (f"{self.filas} filas leídas · {len(self.agregados)} nuevas · "
+                f"{len(self.editados)} modificadas · {len(self.eliminados)} eliminadas · "
+                f"{self.n_errores} con errores")
+
+
+def leer_bloques(archivo, nombre="", tam_bloque=TAM_BLOQUE, sep=",") -> Iterator[pd.DataFrame]:
+    """Devuelve el archivo por bloques de ``tam_bloque`` filas con las columnas de COLUMNAS.
+
+    ``archivo`` puede ser ruta, bytes o archivo binario; ``nombre`` decide el formato
+    (``.xlsx`` o CSV).
+    """
+    nombre = str(nombre or (archivo if isinstance(archivo, str) else ""))
+    if isinstance(archivo, (bytes, bytearray)):
+        archivo = io.BytesIO(archivo)
+    if nombre.lower().endswith((".xlsx", ".xlsm")):
+        yield from _bloques_xlsx(archivo, tam_bloque)
+        return
+    lector = pd.read_csv(archivo, sep=sep, encoding="utf-8-sig", chunksize=tam_bloque,
+                         dtype={c: "string" for c in COLUMNAS}, keep_default_na=False)
+    with lector:
+        for i, bloque in enumerate(lector):
+            if i == 0:
+                _validar_columnas(bloque.columns)
+            yield bloque[COLUMNAS]
+
+
+def _bloques_xlsx(archivo, tam_bloque):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Para importar XLSX instale openpyxl (pip install openpyxl).")
+    # read_only: openpyxl recorre la hoja fila a fila sin cargarla entera
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = [str(c).strip() if c is not None else "" for c in next(filas, ())]
+        _validar_columnas(encabezado)
+        idx = [encabezado.index(c) for c in COLUMNAS]
+        bloque = []
+        for fila in filas:
+            bloque.append(["" if i >= len(fila) or fila[i] is None else str(fila[i]) for i in idx])
+            if len(bloque) == tam_bloque:
+                yield pd.DataFrame(bloque, columns=COLUMNAS, dtype="string")
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=COLUMNAS, dtype="string")
+    finally:
+        libro.close()
+
+
+def _validar_columnas(columnas):
+    faltan = [c for c in COLUMNAS if c not in list(columnas)]
+    if faltan:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltan)}.")
+
+
+def _limpiar_bloque(bloque: pd.DataFrame, desde: int, errores: List[str], conteo: List[int]) -> pd.DataFrame:
+    # Normaliza tipos y descarta filas inválidas, anotando el motivo (fila 2 = primera de datos)
+    texto = {c: bloque[c].fillna("").str.strip() for c in TEXTO}
+    costo = pd.to_numeric(bloque["Costo Unitario"].str.strip(), errors="coerce")
+    motivos = [
+        (texto["Nombre"] == "", "Nombre vacío"),
+        (~texto["Tipo"].isin(TIPOS), f"Tipo debe ser {'/'.join(TIPOS)}"),
+        (texto["Categoría"] == "", "Categoría vacía"),
+        (costo.isna() | (costo < 0), "Costo Unitario inválido"),
+    ]
+    malas = np.zeros(len(bloque), dtype=bool)
+    for mascara, motivo in motivos:
+        mascara = mascara.to_numpy(dtype=bool, na_value=True) & ~malas
+        for i in np.flatnonzero(mascara):
+            if len(errores) < MAX_ERRORES:
+                errores.append(f"Fila {desde + i + 2}: {motivo}")
+        malas |= mascara
+    conteo[0] += int(malas.sum())
+    limpio = pd.DataFrame({c: texto[c].astype(object) for c in TEXTO})
+    limpio["Costo Unitario"] = costo.astype(np.float64)
+    return limpio[COLUMNAS][~malas]
+
+
+def _distintos(a: pd.Series, b: pd.Series) -> np.ndarray:
+    a, b = a.to_numpy(dtype=object), b.to_numpy(dtype=object)
+    iguales = (a == b) | (pd.isna(a) & pd.isna(b))
+    return ~iguales.astype(bool)
+
+
+def _posiciones_por(columnas):
+    # clave -> posiciones de todas las filas del catálogo con esa clave
+    def calcular(df):
+        return df.groupby(list(columnas), observed=True, sort=False).indices
+    return calcular
+
+
+def calcular_diferencias(catalogo, bloques, eliminar_ausentes=False) -> Diferencias:
+    """Compara los bloques de una lista de precios con una instantánea del catálogo.
+
+    Las filas se emparejan por (Nombre, Categoría, Tipo) y solo cambian Unidad y
+    Costo Unitario; una fila que cambia de Categoría o Tipo es un ítem nuevo. Si
+    una clave se repite en el archivo gana la última fila. Con
+    ``eliminar_ausentes`` los ítems del catálogo que no aparecen en el archivo se
+    marcan para borrar (lista completa del proveedor); una fila con errores no
+    tiene clave fiable y conserva sin cambios todos los ítems con su Nombre.
+    """
+    df = catalogo.df
+    posiciones = catalogo.derivar("posiciones_por_clave", _posiciones_por(CLAVE), columnas=CLAVE)
+    por_nombre = catalogo.derivar("posiciones_por_nombre", _posiciones_por(["Nombre"]), columnas=("Nombre",))
+    editados: Dict[int, dict] = {}
+    agregados: Dict[tuple, dict] = {}
+    visto = np.zeros(len(df), dtype=bool)  # filas del catálogo presentes en el archivo
+    errores, conteo = [], [0]
+    filas = 0
+    for bloque in bloques:
+        bloque = bloque.reset_index(drop=True)
+        limpio = _limpiar_bloque(bloque, filas, errores, conteo)
+        for nombre in bloque["Nombre"].drop(limpio.index).fillna("").str.strip():
+            visto[por_nombre.get(nombre, [])] = True
+        limpio = limpio.drop_duplicates(CLAVE, keep="last").reset_index(drop=True)
+        filas += len(bloque)
+
+        pos_existentes, j_existentes = [], []  # pares (fila del catálogo, fila de limpio)
+        for j, r in enumerate(limpio.to_dict("records")):
+            clave = (r["Nombre"], r["Categoría"], r["Tipo"])
+            pos = posiciones.get(clave)
+            if pos is None:
+                agregados[clave] = r
+            else:
+                pos_existentes.extend(pos)
+                j_existentes.extend([j] * len(pos))
+
+        if pos_existentes:
+            pos_existentes = np.asarray(pos_existentes, dtype=np.intp)
+            visto[pos_existentes] = True
+            nuevos = limpio.iloc[j_existentes]
+            actuales = df.iloc[pos_existentes]
+            cambiados = {c: _distintos(nuevos[c], actuales[c]) for c in VALORES}
+            algun = np.logical_or.reduce(list(cambiados.values()))
+            if editados:
+                for p in pos_existentes[~algun]:
+                    editados.pop(int(p), None)  # repetido en el archivo, ahora igual al catálogo
+            for j in np.flatnonzero(algun):
+                editados[int(pos_existentes[j])] = {c: nuevos[c].iat[j] for c in VALORES if cambiados[c][j]}
+
+    eliminados: List[int] = []
+    if eliminar_ausentes:
+        eliminados = np.flatnonzero(~visto).tolist()
+        for p in eliminados:
+            editados.pop(p, None)
+    return Diferencias(catalogo.version, editados, list(agregados.values()), eliminados,
+                       filas, errores, conteo[0], catalogo)
+
+
+def aplicar_diferencias(store, diferencias: Diferencias):
+    # Las posiciones son de la instantánea analizada: si el catálogo cambió entre
+    # medio se trasladan por id de fila, y si otra sesión tocó alguna de esas
+    # filas el store lanza ConflictoEdicion (hay que volver a analizar el archivo)
+    if diferencias.base is None and store.version != diferencias.version:
+        raise ValueError("El catálogo cambió desde el análisis; vuelva a analizar el archivo.")
+    return store.aplicar_edicion(diferencias.editados, diferencias.agregados, diferencias.eliminados,
+                                 base=diferencias.base)
+
+
+def importar_lista(store, archivo, nombre="", eliminar_ausentes=False, tam_bloque=TAM_BLOQUE,
+                   sep=",") -> Diferencias:
+    diferencias = calcular_diferencias(store.actual, leer_bloques(archivo, nombre, tam_bloque, sep),
+                                       eliminar_ausentes)
+    if diferencias:
+        aplicar_diferencias(store, diferencias)
+    return diferencias
@@ -0,0 +1,126 @@
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------
+# ÍNDICE (Categoría, Tipo) DEL CATÁLOGO
+# ------------------------------------------------------
+# Se construye una vez por versión del catálogo (Catalogo.derivar) y los
+# selectores lo leen con una búsqueda en diccionario: sin filtros booleanos ni
+# to_dict("records") en cada rerun. Tras una edición sin altas ni bajas que no
+# cambia Categoría/Tipo, actualizado() rehace solo los registros editados y sus
+# grupos; el resto de registros (y de Grupo) se comparten con la versión previa.
+# Cada registro lleva el id estable de su fila del catálogo en "id".
+
+class Grupo(NamedTuple):
+    inicio: int  # desplazamiento dentro de IndiceCatalogo.registros
+    fin: int
+    etiquetas: Tuple[str, ...]
+    mapa: Dict[str, dict]  # etiqueta -> registro del catálogo
+
+
+_VACIO = Grupo(0, 0, (), {})
+
+
+def etiqueta_recurso(r) -> str:
+    return f"{r['Nombre']} (S/.{r['Costo Unitario']})"
+
+
+def _grupo(registros, inicio, fin) -> Grupo:
+    regs = registros[inicio:fin]
+    mapa = {etiqueta_recurso(r): r for r in regs}
+    return Grupo(inicio, fin, tuple(mapa), mapa)
+
+
+def _por_nombre(registros) -> Dict[str, dict]:
+    # Nombre -> primer registro con ese nombre
+    por_nombre = {}
+    for r in reversed(registros):
+        por_nombre[r['Nombre']] = r
+    return por_nombre
+
+
+class IndiceCatalogo:
+    __slots__ = ("registros", "grupos", "por_nombre", "por_id", "orden")
+
+    def __init__(self, df: pd.DataFrame, ids=None):
+        ordenado = df.sort_values(["Categoría", "Tipo"], kind="stable")
+        self.orden = ordenado.index.to_numpy()  # posición en df de cada registro (RangeIndex, ver compactar)
+        self.registros: List[dict] = ordenado.to_dict("records")
+        ids = self.orden if ids is None else np.asarray(ids)[self.orden]
+        for r, id_fila in zip(self.registros, ids.tolist()):
+            r['id'] = id_fila
+        self.grupos: Dict[Tuple[str, str], Grupo] = {}
+        self.por_nombre: Dict[str, dict] = _por_nombre(self.registros)
+        self.por_id: Dict[int, dict] = {r['id']: r for r in self.registros}
+        claves = list(zip(ordenado["Categoría"].tolist(), ordenado["Tipo"].tolist()))
+        inicio = 0
+        for i in range(1, len(claves) + 1):
+            if i == len(claves) or claves[i] != claves[inicio]:
+                self.grupos[claves[inicio]] = _grupo(self.registros, inicio, i)
+                inicio = i
+
+    def grupo(self, categoria, tipo) -> Grupo:
+        return self.grupos.get((categoria, tipo), _VACIO)
+
+    def ids(self) -> np.ndarray:
+        # Id de cada fila del df, por posición
+        ids = np.empty(len(self.orden), dtype=np.int64)
+        ids[self.orden] = [r['id'] for r in self.registros]
+        return ids
+
+    def actualizado(self, df: pd.DataFrame, posiciones: List[int]) -> "IndiceCatalogo":
+        # Índice de una versión nueva del catálogo con las mismas filas en las que
+        # solo cambiaron `posiciones` (ver Catalogo.heredar)
+        if not posiciones:
+            return self
+        lugar = np.empty(len(self.orden), dtype=np.int64)
+        lugar[self.orden] = np.arange(len(self.orden))
+        registros = list(self.registros)
+        cambiados = {}
+        for p, r in zip(posiciones, df.iloc[list(posiciones)].to_dict("records")):
+            i = int(lugar[p])
+            previo = registros[i]
+            if (r['Categoría'], r['Tipo']) != (previo['Categoría'], previo['Tipo']):
+                return IndiceCatalogo(df, self.ids())  # cambia el orden: índice nuevo
+            r['id'] = previo['id']
+            registros[i] = r
+            cambiados[i] = previo
+        nuevo = IndiceCatalogo.__new__(IndiceCatalogo)
+        nuevo.orden, nuevo.registros = self.orden, registros
+        nuevo.grupos = dict(self.grupos)
+        for clave, g in self.grupos.items():
+            if any(g.inicio <= i < g.fin for i in cambiados):
+                nuevo.grupos[clave] = _grupo(registros, g.inicio, g.fin)
+        nuevo.por_id = dict(self.por_id)
+        for i in cambiados:
+            nuevo.por_id[registros[i]['id']] = registros[i]
+        if any(registros[i]['Nombre'] != previo['Nombre'] for i, previo in cambiados.items()):
+            nuevo.por_nombre = _por_nombre(registros)
+        else:
+            nuevo.por_nombre = dict(self.por_nombre)
+            for i, previo in cambiados.items():
+                if nuevo.por_nombre.get(previo['Nombre']) is previo:
+                    nuevo.por_nombre[previo['Nombre']] = registros[i]
+        return nuevo
+
+
+def indice_catalogo(catalogo) -> IndiceCatalogo:
+    return catalogo.derivar("indice", lambda df: IndiceCatalogo(df, catalogo.ids), actualizar=IndiceCatalogo.actualizado)
+
+
+def posiciones_filtradas(df: pd.DataFrame, categoria=None, tipo=None) -> List[int]:
+    # Posiciones (iloc) de las filas que cumplen el filtro; None = sin filtro
+    mascara = np.ones(len(df), dtype=bool)
+    if categoria is not None:
+        mascara &= (df["Categoría"] == categoria).to_numpy(dtype=bool, na_value=False)
+    if tipo is not None:
+        mascara &= (df["Tipo"] == tipo).to_numpy(dtype=bool, na_value=False)
+    return np.flatnonzero(mascara).tolist()
+
+
+def posiciones_catalogo(catalogo, categoria=None, tipo=None) -> List[int]:
+    # posiciones_filtradas memorizado en la instantánea (una vez por versión y filtro)
+    return catalogo.derivar(("posiciones", categoria, tipo),
+                            lambda df: posiciones_filtradas(df, categoria, tipo), columnas=("Categoría", "Tipo"))
@@ -0,0 +1,84 @@
+import csv
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+
+from neozinc.pdf import generar_pdf_bytes
+
+# ------------------------------------------------------
+# EXPORTACIÓN MASIVA (UNA CANASTA, MUCHOS CLIENTES) A ZIP
+# ------------------------------------------------------
+# Cada PDF se genera en un pool de procesos y se escribe al ZIP en cuanto
+# termina. Nunca hay más de POR_PROCESO * procesos documentos en vuelo, así la
+# memoria no crece con el número de clientes.
+
+POR_PROCESO = 2
+
+
+def leer_clientes_csv(archivo):
+    # CSV con columna "Cliente" y, opcionalmente, "Sistema" y "Servicio" por fila
+    if isinstance(archivo, (bytes, bytearray)):
+        archivo = io.StringIO(archivo.decode("utf-8-sig"))
+    elif hasattr(archivo, "read") and not isinstance(archivo, io.TextIOBase):
+        archivo = io.TextIOWrapper(archivo, encoding="utf-8-sig")
+    lector = csv.DictReader(archivo)
+    if not lector.fieldnames or "Cliente" not in lector.fieldnames:
+        raise ValueError("El CSV debe tener una columna 'Cliente'.")
+    return [fila for fila in lector if (fila.get("Cliente") or "").strip()]
+
+
+def nombre_archivo(cliente, usados):
+    base = re.sub(r'[\\/:*?"<>|]+', "_", str(cliente)).strip() or "cliente"
+    nombre = f"Cotizacion_{base}.pdf"
+    n = 2
+    while nombre in usados:
+        nombre = f"Cotizacion_{base}_{n}.pdf"
+        n += 1
+    usados.add(nombre)
+    return nombre
+
+
+def _render(args):
+    return generar_pdf_bytes(*args)
+
+
+def exportar_zip(destino, clientes, fecha, area, servicio, materiales, mano_obra, gg, margen, total,
+                 procesos=None, progreso=None, pool=None):
+    """Escribe en ``destino`` (ruta o archivo binario) un ZIP con un PDF por cliente.
+
+    ``progreso(hechos, total)`` se llama cada vez que un PDF entra al ZIP.
+    ``pool`` permite usar un pool de procesos ya abierto (de ``procesos``
+    procesos, p.ej. el de neozinc/exportaciones.py); si no, se abre uno propio.
+    Devuelve la lista de nombres de archivo en el orden en que se escribieron.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    usados, escritos = set(), []
+    pendientes = iter(clientes)
+    total_clientes = len(clientes)
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zf, \
+            (ProcessPoolExecutor(max_workers=procesos) if pool is None else nullcontext(pool)) as pool:
+        en_vuelo = {}
+
+        def encolar():
+            for fila in pendientes:
+                cliente = fila["Cliente"].strip()
+                args = (cliente, fecha, fila.get("Sistema") or area, fila.get("Servicio") or servicio,
+                        materiales, mano_obra, gg, margen, total)
+                en_vuelo[pool.submit(_render, args)] = nombre_archivo(cliente, usados)
+                if len(en_vuelo) >= procesos * POR_PROCESO:
+                    return
+
+        encolar()
+        while en_vuelo:
+            listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                nombre = en_vuelo.pop(futuro)
+                zf.writestr(nombre, futuro.result())
+                escritos.append(nombre)
+                if progreso:
+                    progreso(len(escritos), total_clientes)
+            encolar()
+    return escritos
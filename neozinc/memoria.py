@@ -0,0 +1,107 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from neozinc.canasta import Canasta
+from neozinc.catalogo import compactar
+from neozinc.deshacer import Historia
+from neozinc.indice import IndiceCatalogo
+
+# ------------------------------------------------------
+# REPORTE DE MEMORIA: CATÁLOGO Y CANASTA
+# ------------------------------------------------------
+# Compara la representación anterior (columnas object, una línea = un dict con
+# sus propias claves y valores) con la compacta (category, líneas con __slots__
+# que apuntan al registro compartido del catálogo). También mide cuánto ocupa
+# cada paso de deshacer (cambiar la cantidad de una línea) frente a guardar una
+# copia de las líneas por paso.
+#
+#   python -m neozinc.memoria [filas_catalogo] [lineas_canasta] [pasos]
+
+
+def tamano(obj, excluir=frozenset()) -> int:
+    """Bytes de ``obj`` y todo lo que alcanza, sin contar los ids de ``excluir``."""
+    vistos = set(excluir)
+    pendientes, total = [obj], 0
+    while pendientes:
+        o = pendientes.pop()
+        if id(o) in vistos:
+            continue
+        vistos.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            pendientes.extend(o.keys())
+            pendientes.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            pendientes.extend(o)
+        elif hasattr(type(o), "__slots__"):
+            pendientes.extend(getattr(o, s) for s in type(o).__slots__ if hasattr(o, s))
+        elif hasattr(o, "__dict__"):
+            pendientes.append(vars(o))
+    return total
+
+
+def catalogo_sintetico(filas: int, semilla=0) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        "Nombre": [f"Ítem {i} de prueba" for i in range(filas)],
+        "Tipo": rng.choice(["Equipo", "Material", "Herramienta"], filas).astype(object),
+        "Categoría": rng.choice(["DACI", "ACI", "BCI"], filas).astype(object),
+        "Unidad": rng.choice(["und", "m", "kg", "glb", "día"], filas).astype(object),
+        "Costo Unitario": rng.uniform(1, 1000, filas).round(2),
+    })
+
+
+def _linea_dict(r, cantidad):
+    # Formato anterior: un dict nuevo por línea (ver agregar_item en APP4.py)
+    return {"Nombre": r['Nombre'], "Tipo": r['Tipo'], "Unidad": r['Unidad'],
+            "Precio Unit.": r['Costo Unitario'], "Cantidad": float(cantidad),
+            "Subtotal": r['Costo Unitario'] * float(cantidad)}
+
+
+def reporte(filas_catalogo=50_000, lineas_canasta=500, pasos=300):
+    df = catalogo_sintetico(filas_catalogo)
+    compacto = compactar(df)
+    registros = IndiceCatalogo(compacto).registros  # compartidos por todas las sesiones
+    compartidos = {id(r) for r in registros}
+    for r in registros:
+        compartidos.update(id(v) for v in r.values())
+    elegidos = np.random.default_rng(1).choice(len(registros), lineas_canasta, replace=False)
+
+    antes = [_linea_dict(registros[i], 1 + i % 7) for i in elegidos]
+    canasta = Canasta()
+    for i in elegidos:
+        canasta.agregar_recurso(registros[i], float(1 + i % 7))
+
+    historia = Historia()
+    historia.registrar(canasta, 50.0, 30, {})
+    inicial = tamano(historia, compartidos)
+    for paso, i in enumerate(np.random.default_rng(2).integers(0, lineas_canasta, pasos)):
+        canasta.actualizar_cantidad(int(i), float(paso + 10))
+        historia.registrar(canasta, 50.0, 30, {})
+    # Las líneas vigentes ya están en la canasta: no cuentan como costo de la historia
+    vigentes = {id(l) for l in canasta.lineas}
+
+    return {
+        "catalogo_filas": filas_catalogo,
+        "catalogo_bytes_antes": int(df.memory_usage(deep=True).sum()),
+        "catalogo_bytes_despues": int(compacto.memory_usage(deep=True).sum()),
+        "canasta_lineas": lineas_canasta,
+        "sesion_bytes_antes": tamano(antes, compartidos),
+        "sesion_bytes_despues": tamano(canasta, compartidos),
+        "historia_pasos": pasos,
+        "paso_bytes_copia": tamano([l.como_dict() for l in canasta.lineas], compartidos),
+        "paso_bytes_compartido": (tamano(historia, compartidos | vigentes) - inicial) // pasos,
+    }
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    r = reporte(*args)
+    print(f"Catálogo ({r['catalogo_filas']} filas): {r['catalogo_bytes_antes'] / 1e6:.2f} MB -> "
+          f"{r['catalogo_bytes_despues'] / 1e6:.2f} MB")
+    print(f"Canasta por sesión ({r['canasta_lineas']} líneas): {r['sesion_bytes_antes'] / 1e3:.1f} KB -> "
+          f"{r['sesion_bytes_despues'] / 1e3:.1f} KB")
+    print(f"Deshacer ({r['historia_pasos']} pasos): {r['paso_bytes_copia'] / 1e3:.1f} KB por paso copiando "
+          f"las líneas -> {r['paso_bytes_compartido'] / 1e3:.2f} KB compartiéndolas")
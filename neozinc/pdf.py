@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from fpdf import FPDF
+
+# ------------------------------------------------------
+# 1. CLASE PDF (REPORTE COMPLETO)
+# ------------------------------------------------------
+LOGO = "logo.png"
+ALTO_FILA = 8
+TAM_BLOQUE = 64 * 1024  # bytes por escritura al volcar el PDF a un archivo
+
+# (Tipo, título de sección, color de cabecera)
+SECCIONES_MATERIALES = (
+    ("Equipo", "1. SUMINISTRO DE EQUIPOS (ACTIVOS)", (220, 240, 255)),
+    ("Material", "2. SUMINISTRO DE MATERIALES", (235, 255, 235)),
+    ("Herramienta", "3. HERRAMIENTAS Y EQUIPOS MENORES", (255, 250, 230)),
+)
+COLUMNAS_MATERIALES = ((100, "Descripción"), (30, "Cant."), (30, "P.Unit"), (30, "Total"))
+COLUMNAS_MANO_OBRA = ((100, "Rol / Cargo"), (30, "Pers."), (30, "Hrs."), (30, "Total"))
+
+
+class PDF(FPDF):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Se comprueba una vez por documento; FPDF ya reutiliza la imagen entre páginas
+        self.con_logo = os.path.exists(LOGO)
+
+    def header(self):
+        if self.con_logo:
+            self.image(LOGO, 10, 8, 25)
+            self.set_font('Arial', 'B', 15)
+            self.cell(35) 
+            self.cell(0, 8, 'NEOZINC SYSTEMS', 0, 1, 'L')
+            self.set_font('Arial', 'I', 9)
+            self.cell(35)
+            self.cell(0, 5, 'Ingeniería - Detección y Extinción de Incendios', 0, 1, 'L')
+            self.set_font('Arial', 'B', 9)
+            self.cell(35)
+            self.cell(0, 5, 'Contacto: 925 940 657', 0, 1, 'L') 
+        else:
+            self.set_font('Arial', 'B', 16)
+            self.cell(0, 10, 'NEOZINC SYSTEMS', 0, 1, 'C')
+        
+        self.ln(8)
+        self.set_draw_color(0, 229, 255) # Cyan Neón
+        self.line(10, 35, 200, 35)
+        self.set_draw_color(0, 0, 0)
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Página {self.page_no()} - Generado por Neozinc Systems', 0, 0, 'C')
+
+    def ajustar(self, texto, ancho):
+        # Recorta el texto para que quepa en la celda (el 60 fijo de antes se desbordaba)
+        texto = str(texto)
+        limite = ancho - 2 * self.c_margin
+        if self.get_string_width(texto) <= limite:
+            return texto
+        while texto and self.get_string_width(texto + "...") > limite:
+            texto = texto[:-1]
+        return texto + "..."
+
+    def encabezado_tabla(self, columnas, color_rgb):
+        self.set_fill_color(*color_rgb)
+        self.set_font("Arial", 'B', 10)
+        for i, (ancho, texto) in enumerate(columnas):
+            self.cell(ancho, ALTO_FILA, texto, 1, 1 if i == len(columnas) - 1 else 0, 'C', fill=True)
+        self.set_font("Arial", size=9)
+
+    def tabla(self, titulo, columnas, color_rgb, filas):
+        # filas: iterable de tuplas (texto, alineación) por columna. Si una fila no
+        # entra en la página se salta a la siguiente y se repite la cabecera.
+        if self.get_y() + 10 + 2 * ALTO_FILA > self.page_break_trigger:
+            self.add_page()
+        self.set_font("Arial", 'B', 10)
+        self.cell(0, 10, titulo, ln=True)
+        self.encabezado_tabla(columnas, color_rgb)
+        for celdas in filas:
+            if self.get_y() + ALTO_FILA > self.page_break_trigger:
+                self.add_page()
+                self.encabezado_tabla(columnas, color_rgb)
+            for i, ((ancho, _), (texto, alinea)) in enumerate(zip(columnas, celdas)):
+                self.cell(ancho, ALTO_FILA, texto, 1, 1 if i == len(columnas) - 1 else 0, alinea)
+
+
+def armar_pdf(cliente, fecha, area, servicio, materiales, mano_obra, gg, margen, total) -> PDF:
+    pdf = PDF()
+    pdf.add_page()
+    
+    pdf.set_font("Arial", size=11)
+    pdf.cell(0, 6, f"Cliente: {cliente}", ln=True)
+    pdf.cell(0, 6, f"Fecha: {fecha}", ln=True)
+    pdf.cell(0, 6, f"Referencia: {servicio} - {area}", ln=True)
+    pdf.ln(5)
+    
+    # Una sola pasada para repartir las líneas por Tipo
+    grupos = {tipo: [] for tipo, _, _ in SECCIONES_MATERIALES}
+    for m in materiales:
+        lista = grupos.get(m['Tipo'])
+        if lista is not None:
+            lista.append(m)
+
+    ancho_desc = COLUMNAS_MATERIALES[0][0]
+    for tipo, titulo, color_rgb in SECCIONES_MATERIALES:
+        if grupos[tipo]:
+            pdf.tabla(titulo, COLUMNAS_MATERIALES, color_rgb, (
+                ((pdf.ajustar(m['Nombre'], ancho_desc), ''),
+                 (f"{m['Cantidad']} {m['Unidad']}", 'C'),
+                 (f"{m['Precio Unit.']:.2f}", 'R'),
+                 (f"{m['Subtotal']:.2f}", 'R'))
+                for m in grupos[tipo]
+            ))
+            pdf.ln(5)
+
+    if mano_obra:
+        pdf.tabla("4. MANO DE OBRA ESPECIALIZADA", COLUMNAS_MANO_OBRA, (255, 240, 240), (
+            ((pdf.ajustar(mo['Cargo'], ancho_desc), ''),
+             (str(mo['Personas']), 'C'),
+             (str(mo['Horas']), 'C'),
+             (f"{mo['Subtotal']:.2f}", 'R'))
+            for mo in mano_obra
+        ))
+    
+    pdf.ln(5)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(130)
+    pdf.cell(30, 12, "TOTAL VENTA:", 0, 0, 'R')
+    pdf.cell(30, 12, f"S/. {total:,.2f}", 0, 1, 'R')
+    pdf.close()
+    return pdf
+
+def generar_pdf_bytes(cliente, fecha, area, servicio, materiales, mano_obra, gg, margen, total):
+    pdf = armar_pdf(cliente, fecha, area, servicio, materiales, mano_obra, gg, margen, total)
+    return pdf.output(dest='S').encode('latin-1')
+
+def escribir_pdf(destino, cliente, fecha, area, servicio, materiales, mano_obra, gg, margen, total):
+    # Vuelca el documento a un archivo/stream por bloques, sin armar una copia
+    # completa en bytes. Devuelve el número de bytes escritos.
+    buffer = armar_pdf(cliente, fecha, area, servicio, materiales, mano_obra, gg, margen, total).buffer
+    for i in range(0, len(buffer), TAM_BLOQUE):
+        destino.write(buffer[i:i + TAM_BLOQUE].encode('latin-1'))
+    return len(buffer)
+
+# ------------------------------------------------------
+# 2. CACHÉ DE PDFs (LRU POR CONTENIDO)
+# ------------------------------------------------------
+# El PDF solo se genera cuando alguien lo pide; las descargas repetidas de una
+# cotización sin cambios salen de memoria. La caché es del proceso (compartida
+# entre sesiones) y se acota por número de documentos y por bytes totales.
+class CachePDF:
+    def __init__(self, max_items=32, max_bytes=64 * 1024 * 1024):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            datos = self._datos.get(clave)
+            if datos is not None:
+                self._datos.move_to_end(clave)
+            return datos
+
+    def guardar(self, clave, datos):
+        with self._lock:
+            if clave in self._datos:
+                self._bytes -= len(self._datos.pop(clave))
+            self._datos[clave] = datos
+            self._bytes += len(datos)
+            while self._datos and (len(self._datos) > self.max_items or self._bytes > self.max_bytes):
+                _, viejo = self._datos.popitem(last=False)
+                self._bytes -= len(viejo)
+
+    def __contains__(self, clave):
+        with self._lock:
+            return clave in self._datos
+
+    def __len__(self):
+        return len(self._datos)
+
+
+CACHE_PDF = CachePDF()
+
+
+def clave_cotizacion(cliente, fecha, area, servicio, materiales, mano_obra, gg, margen, total):
+    contenido = json.dumps(
+        [cliente, fecha, area, servicio, materiales, mano_obra, gg, margen, total],
+        sort_keys=True, default=str, ensure_ascii=False,
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
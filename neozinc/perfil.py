@@ -0,0 +1,87 @@
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+# ------------------------------------------------------
+# PERFIL POR RERUN (OPCIONAL)
+# ------------------------------------------------------
+# Se activa con NEOZINC_PERFIL=1 o con ?perfil=1 en la URL. APP4.py envuelve
+# cada sección con perfil.medir("nombre"): el tiempo queda en la sesión (para
+# el panel lateral) y se agrega una línea JSONL por sección a RUTA_LOG con la
+# sesión, el número de rerun y el tamaño de la canasta y del catálogo. Sin
+# perfil activo, medir() no mide nada.
+#
+#   python -m neozinc.perfil [perfil.jsonl]     # p50/p95 por sección
+
+RUTA_LOG = os.environ.get("NEOZINC_PERFIL_LOG", "perfil.jsonl")
+_LOG_LOCK = threading.Lock()  # varias sesiones escriben al mismo archivo
+
+
+def perfil_activo(parametro=None) -> bool:
+    valor = parametro if parametro is not None else os.environ.get("NEOZINC_PERFIL", "")
+    return str(valor).strip().lower() in ("1", "true", "si", "sí", "on")
+
+
+class Perfil:
+    def __init__(self, sesion: str, tamanos: Callable[[], Tuple[int, int]], ruta: Optional[str] = RUTA_LOG):
+        self.sesion = sesion
+        self.tamanos = tamanos  # () -> (líneas de la canasta, filas del catálogo)
+        self.ruta = ruta
+        self.rerun = 0
+        self.secciones: Dict[str, float] = {}  # sección -> ms, del rerun completo más reciente
+        self._inicio = time.perf_counter()
+
+    def nuevo_rerun(self):
+        self.rerun += 1
+        self.secciones = {}
+        self._inicio = time.perf_counter()
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._inicio) * 1000
+
+    @contextmanager
+    def medir(self, seccion: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(seccion, (time.perf_counter() - t) * 1000)
+
+    def registrar(self, seccion: str, ms: float):
+        # Las secciones que corren varias veces por rerun (fragmentos) se acumulan
+        self.secciones[seccion] = self.secciones.get(seccion, 0.0) + ms
+        if not self.ruta:
+            return
+        canasta, catalogo = self.tamanos()
+        linea = json.dumps({"ts": datetime.datetime.now().isoformat(timespec="milliseconds"),
+                            "sesion": self.sesion, "rerun": self.rerun, "seccion": seccion,
+                            "ms": round(ms, 3), "canasta": canasta, "catalogo": catalogo}, ensure_ascii=False)
+        with _LOG_LOCK, open(self.ruta, "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+
+    def tabla(self) -> pd.DataFrame:
+        df = pd.DataFrame({"Sección": list(self.secciones), "ms": list(self.secciones.values())})
+        return df.sort_values("ms", ascending=False, ignore_index=True)
+
+
+def resumen(ruta=RUTA_LOG) -> pd.DataFrame:
+    df = pd.read_json(ruta, lines=True)
+    por_seccion = df.groupby("seccion")["ms"]
+    return pd.DataFrame({
+        "n": por_seccion.size(),
+        "p50_ms": por_seccion.median(),
+        "p95_ms": por_seccion.quantile(0.95),
+        "max_ms": por_seccion.max(),
+        "canasta_max": df.groupby("seccion")["canasta"].max(),
+    }).sort_values("p95_ms", ascending=False).round(2)
+
+
+if __name__ == "__main__":
+    print(resumen(sys.argv[1] if len(sys.argv) > 1 else RUTA_LOG).to_string())
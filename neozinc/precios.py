@@ -0,0 +1,160 @@
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+# ------------------------------------------------------
+# MOTOR DE PRECIOS (SIN STREAMLIT)
+# ------------------------------------------------------
+# Mismas reglas que APP4.py:
+#   costo_dir    = materiales + mano de obra + gastos generales
+#   precio_final = costo_dir * (1 + margen / 100)
+#   utilidad     = precio_final - costo_dir
+# La canasta se guarda en columnas (arrays de numpy) y todos los subtotales
+# por Tipo salen de un único np.bincount.
+
+TIPOS = ("Equipo", "Material", "Herramienta")
+OTROS = len(TIPOS)  # índice para tipos fuera de TIPOS (p.ej. "Servicio")
+_IDX_TIPO = {t: i for i, t in enumerate(TIPOS)}
+
+
+def indice_tipo(tipo) -> int:
+    return _IDX_TIPO.get(tipo, OTROS)
+
+
+def formatear_moneda(val) -> str:
+    return f"S/. {val:,.2f}"
+
+
+class Partidas:
+    """Líneas de materiales de una canasta en formato columnar."""
+
+    __slots__ = ("precio", "cantidad", "tipo")
+
+    def __init__(self, precio, cantidad, tipo):
+        self.precio = np.asarray(precio, dtype=np.float64)
+        self.cantidad = np.asarray(cantidad, dtype=np.float64)
+        self.tipo = np.asarray(tipo, dtype=np.intp)
+
+    @classmethod
+    def desde_items(cls, items: List[Dict]) -> "Partidas":
+        n = len(items)
+        precio = np.fromiter((m['Precio Unit.'] for m in items), np.float64, n)
+        cantidad = np.fromiter((m['Cantidad'] for m in items), np.float64, n)
+        tipo = np.fromiter((indice_tipo(m['Tipo']) for m in items), np.intp, n)
+        return cls(precio, cantidad, tipo)
+
+    @property
+    def subtotal(self) -> np.ndarray:
+        return self.precio * self.cantidad
+
+    def __len__(self):
+        return len(self.precio)
+
+
+class Totales(NamedTuple):
+    t_mat: float
+    t_mo: float
+    t_eq: float
+    t_mt: float
+    t_he: float
+    t_otros: float
+    gg: float
+    costo_dir: float
+    precio_final: float
+    utilidad: float
+
+    def desglose(self) -> Dict[str, float]:
+        return {"Equipo": self.t_eq, "Material": self.t_mt, "Herramienta": self.t_he, "Otros": self.t_otros}
+
+
+class TotalesLote(NamedTuple):
+    # Mismos campos que Totales, cada uno como array de longitud n_canastas
+    t_mat: np.ndarray
+    t_mo: np.ndarray
+    t_eq: np.ndarray
+    t_mt: np.ndarray
+    t_he: np.ndarray
+    t_otros: np.ndarray
+    gg: np.ndarray
+    costo_dir: np.ndarray
+    precio_final: np.ndarray
+    utilidad: np.ndarray
+
+    def __len__(self):
+        return len(self.t_mat)
+
+    def fila(self, i) -> Totales:
+        return Totales(*(float(col[i]) for col in self))
+
+
+def _finanzas(por_tipo, t_mo, gg, margen):
+    # por_tipo: (..., len(TIPOS) + 1)
+    t_mat = por_tipo.sum(axis=-1)
+    costo_dir = t_mat + t_mo + gg
+    precio_final = costo_dir * (1 + margen / 100)
+    utilidad = precio_final - costo_dir
+    return (t_mat, t_mo, por_tipo[..., 0], por_tipo[..., 1], por_tipo[..., 2], por_tipo[..., OTROS],
+            gg, costo_dir, precio_final, utilidad)
+
+
+def totales_desde_agregados(por_tipo, t_mo, gg, margen) -> Totales:
+    # por_tipo: montos de materiales indexados con indice_tipo (longitud OTROS + 1)
+    cols = _finanzas(np.asarray(por_tipo, dtype=np.float64), np.float64(t_mo), np.float64(gg), np.float64(margen))
+    return Totales(*(float(c) for c in cols))
+
+
+def cotizar_partidas(partidas: Partidas, t_mo, gg, margen) -> Totales:
+    por_tipo = np.bincount(partidas.tipo, weights=partidas.subtotal, minlength=OTROS + 1)
+    return totales_desde_agregados(por_tipo, t_mo, gg, margen)
+
+
+def cotizar(items_mat: List[Dict], items_mo: List[Dict], gg, margen) -> Totales:
+    t_mo = np.fromiter((x['Subtotal'] for x in items_mo), np.float64, len(items_mo)).sum()
+    return cotizar_partidas(Partidas.desde_items(items_mat), t_mo, gg, margen)
+
+
+def cotizar_lote(canasta, precio, cantidad, tipo, t_mo=0.0, gg=0.0, margen=0.0, n_canastas=None) -> TotalesLote:
+    """Cotiza muchas canastas a la vez.
+
+    Las líneas de todas las canastas van concatenadas; ``canasta`` indica a qué
+    canasta (0..n-1) pertenece cada línea. ``t_mo``, ``gg`` y ``margen`` pueden
+    ser escalares o arrays de longitud ``n_canastas``.
+    """
+    canasta = np.asarray(canasta, dtype=np.intp)
+    tipo = np.asarray(tipo, dtype=np.intp)
+    subtotal = np.asarray(precio, dtype=np.float64) * np.asarray(cantidad, dtype=np.float64)
+    if n_canastas is None:
+        n_canastas = int(canasta.max()) + 1 if len(canasta) else 0
+    k = OTROS + 1
+    por_tipo = np.bincount(canasta * k + tipo, weights=subtotal, minlength=n_canastas * k)
+    por_tipo = por_tipo.reshape(n_canastas, k)
+
+    def _col(valor):
+        return np.broadcast_to(np.asarray(valor, dtype=np.float64), (n_canastas,))
+
+    return TotalesLote(*_finanzas(por_tipo, _col(t_mo), _col(gg), _col(margen)))
+
+
+class Sensibilidad(NamedTuple):
+    margenes: np.ndarray  # eje de columnas
+    ggs: np.ndarray  # eje de filas
+    precio_final: np.ndarray  # (len(ggs), len(margenes)), o (escenarios, ggs, margenes) con factores
+    utilidad: np.ndarray
+
+
+def sensibilidad(por_tipo, t_mo, margenes, ggs, factores=None) -> Sensibilidad:
+    """Precio final y utilidad para toda la grilla gg × margen en un solo cálculo.
+
+    ``factores`` (opcional) multiplica los montos de materiales por Tipo
+    (p.ej. 0.9 = 10% de descuento del proveedor); puede ser un vector de
+    longitud OTROS + 1 o una matriz (escenarios, OTROS + 1), que agrega un eje.
+    """
+    por_tipo = np.asarray(por_tipo, dtype=np.float64)
+    margenes = np.asarray(margenes, dtype=np.float64)
+    ggs = np.asarray(ggs, dtype=np.float64)
+    if factores is not None:
+        por_tipo = por_tipo * np.asarray(factores, dtype=np.float64)
+    # Ejes: (..., gg, margen, tipo); _finanzas suma el último eje
+    cols = _finanzas(por_tipo[..., None, None, :], np.float64(t_mo), ggs[:, None], margenes[None, :])
+    precio_final, utilidad = np.broadcast_arrays(cols[8], cols[9])
+    return Sensibilidad(margenes, ggs, precio_final, utilidad)
@@ -0,0 +1,93 @@
+import threading
+import weakref
+from typing import Dict, List, Optional
+
+from neozinc.almacen import almacen
+from neozinc.catalogo import store_recursos
+from neozinc.indice import indice_catalogo
+
+# ------------------------------------------------------
+# REPRECIO INCREMENTAL (ÍTEM DEL CATÁLOGO -> CANASTAS Y COTIZACIONES)
+# ------------------------------------------------------
+# Un índice invertido id de fila del catálogo -> canastas abiertas que la usan,
+# mantenido por la propia canasta (observador al sumar un ítem nuevo). Cuando el
+# catálogo publica una versión, solo se marcan las canastas que usan alguna fila
+# cuyo Costo Unitario, Tipo o Unidad cambió; cada sesión aplica lo marcado en su
+# próximo rerun (aplicar) sin recorrer el resto. Las cotizaciones guardadas se
+# actualizan en el mismo paso con Almacen.repreciar_cotizaciones, que usa el
+# índice por recurso_id de cotizacion_materiales para llegar solo a las
+# afectadas; las que cambiaron de total quedan en ultimo_reporte.
+# La clave es la fila y no el Nombre: dos ítems con el mismo nombre en
+# categorías distintas son independientes. Una fila renombrada cuenta como otro
+# ítem (no se reprecia), y un reemplazo completo del catálogo trae filas nuevas,
+# así que lo ya cotizado conserva su precio.
+#
+# El histórico (neozinc/historial.py) no se toca: guarda la cotización tal como
+# se emitió.
+
+CAMPOS_PRECIO = ("Costo Unitario", "Tipo", "Unidad")
+
+
+def repreciados(cambios) -> Dict[int, dict]:
+    # Filas cuyo precio cambió sin cambiar de nombre (un renombre es otro ítem): id -> registro nuevo
+    return {d['id']: d for a, d in cambios.modificados
+            if a['Nombre'] == d['Nombre'] and any(a[c] != d[c] for c in CAMPOS_PRECIO)}
+
+
+class IndiceReprecio:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_id: Dict[int, weakref.WeakSet] = {}
+        self.ultimo_reporte: List[Dict] = []  # cotizaciones guardadas cuyo total cambió
+        self.version_reporte: Optional[int] = None
+
+    def registrar(self, canasta):
+        if canasta.observador is not None:
+            return
+        canasta.observador = self._vincular
+        for linea in canasta.lineas:
+            self._vincular(canasta, linea.recurso.get('id'))
+
+    def _vincular(self, canasta, id_fila):
+        # Una fila que sale de la canasta queda en el índice hasta que la canasta
+        # muere: a lo sumo se marca de más y repreciar() no encuentra nada
+        if id_fila is None:  # línea sin fila del catálogo (p.ej. de una cotización antigua)
+            return
+        with self._lock:
+            self._por_id.setdefault(id_fila, weakref.WeakSet()).add(canasta)
+
+    def al_cambiar(self, catalogo, cambios):
+        # Suscriptor de store_recursos(): corre dentro del lock del store
+        if cambios.reemplazo:  # versión inicial o catálogo completo nuevo: no hay filas previas que repreciar
+            return
+        # Los precios nuevos vienen en los propios cambios: no hace falta el índice del catálogo
+        filas = repreciados(cambios)
+        if not filas:
+            return
+        ids = set(filas)
+        with self._lock:
+            canastas = {c for i in ids for c in self._por_id.get(i, ())}
+        for canasta in canastas:
+            canasta.marcar_reprecio(ids)
+        self.ultimo_reporte = almacen().repreciar_cotizaciones(
+            {i: (d['Nombre'], d['Costo Unitario'], d['Tipo']) for i, d in filas.items()})
+        self.version_reporte = catalogo.version
+
+    def aplicar(self, canasta) -> int:
+        # Llamar desde la sesión dueña de la canasta
+        if not canasta.reprecio_pendiente:
+            return 0
+        return canasta.repreciar(indice_catalogo(store_recursos().actual).por_id)
+
+
+_INDICE = None
+_INDICE_LOCK = threading.Lock()
+
+
+def indice_reprecio() -> IndiceReprecio:
+    global _INDICE
+    with _INDICE_LOCK:
+        if _INDICE is None:
+            _INDICE = IndiceReprecio()
+            store_recursos().suscribir(_INDICE.al_cambiar)
+        return _INDICE
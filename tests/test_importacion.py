@@ -0,0 +1,51 @@
+import pandas as pd
+
+from neozinc.catalogo import CatalogoStore, compactar
+from neozinc.importacion import aplicar_diferencias, calcular_diferencias, leer_bloques
+
+ENCABEZADO = "Nombre,Tipo,Categoría,Unidad,Costo Unitario\n"
+
+
+def catalogo_con_nombre_repetido():
+    # El mismo ítem en dos categorías, con precios distintos
+    return CatalogoStore(compactar(pd.DataFrame([
+        {"Nombre": "Detector de Humo", "Tipo": "Equipo", "Categoría": "DACI", "Unidad": "und", "Costo Unitario": 45.0},
+        {"Nombre": "Detector de Humo", "Tipo": "Equipo", "Categoría": "ACI", "Unidad": "und", "Costo Unitario": 47.0},
+    ])))
+
+
+def diferencias(store, filas, tam_bloque=1000, eliminar_ausentes=True):
+    csv = ENCABEZADO + "".join(f"{f}\n" for f in filas)
+    return calcular_diferencias(store.actual, leer_bloques(csv.encode(), "lista.csv", tam_bloque),
+                                eliminar_ausentes=eliminar_ausentes)
+
+
+def test_nombre_repetido_en_otra_categoria():
+    store = catalogo_con_nombre_repetido()
+    dif = diferencias(store, ["Detector de Humo,Equipo,DACI,und,45", "Detector de Humo,Equipo,ACI,und,50"])
+    assert dif.editados == {1: {"Costo Unitario": 50.0}}
+    assert dif.eliminados == [] and dif.agregados == []
+    aplicar_diferencias(store, dif)
+    assert store.actual.df[["Categoría", "Costo Unitario"]].astype(object).values.tolist() == [["DACI", 45.0], ["ACI", 50.0]]
+
+
+def test_nombre_repetido_entre_bloques():
+    # Cada bloque empareja por su clave: la fila de ACI en el segundo bloque no pisa a la de DACI
+    store = catalogo_con_nombre_repetido()
+    dif = diferencias(store, ["Detector de Humo,Equipo,DACI,und,46", "Detector de Humo,Equipo,ACI,und,47"], tam_bloque=1)
+    assert dif.editados == {0: {"Costo Unitario": 46.0}}
+    assert dif.eliminados == []
+
+
+def test_nombre_nuevo_en_otra_categoria_se_agrega():
+    store = catalogo_con_nombre_repetido()
+    dif = diferencias(store, ["Detector de Humo,Material,ACI,und,5"], eliminar_ausentes=False)
+    assert [(a["Categoría"], a["Tipo"]) for a in dif.agregados] == [("ACI", "Material")]
+    assert dif.editados == {} and dif.eliminados == []
+
+
+def test_fila_con_errores_conserva_los_items_con_su_nombre():
+    store = catalogo_con_nombre_repetido()
+    dif = diferencias(store, ["Detector de Humo,Equipo,ACI,und,"])
+    assert dif.n_errores == 1
+    assert dif.eliminados == [] and dif.editados == {}